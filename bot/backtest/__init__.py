@@ -0,0 +1,10 @@
+# This file makes the 'backtest' directory a Python package. 
+import sys
+
+# The backtests trade through the order and retcode constants of MetaTrader5;
+# without the package (it is Windows-only) they come from backtest.mt5_constants
+try:
+    import MetaTrader5
+except ImportError:
+    from backtest import mt5_constants
+    sys.modules['MetaTrader5'] = mt5_constants
@@ -0,0 +1,242 @@
+import argparse
+import logging
+import time
+import numpy as np
+import pandas as pd
+from utils.logger import log
+from config import settings
+from strategies.xauusd_m5_strategy import XauUsdM5Strategy
+from strategies.decision_trace import record_from_history, render as render_decision
+from risk_management.position_sizer import calculate_lot_size, calculate_trade_levels
+from risk_management.batch_manager import BatchTradeManager
+from backtest.simulated_broker import SimulatedBroker
+from storage.bar_store import BarStore
+import MetaTrader5 as mt5
+
+
+def load_bars_csv(path):
+    """
+    Loads bars exported from MT5 (time in epoch seconds) into a DataFrame.
+    """
+    df = pd.read_csv(path)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    return df
+
+
+def add_data_arguments(parser, default_csv=None):
+    """Adds the options selecting the bars to backtest on to a CLI parser."""
+    parser.add_argument("--csv", default=default_csv, help="Bars with time in epoch seconds.")
+    parser.add_argument("--store", help="Bar store directory; used instead of --csv when given.")
+    parser.add_argument("--symbol", default=None, help="Store symbol (default: Trading.Symbol).")
+    parser.add_argument("--timeframe", default=None, help="Store timeframe (default: Trading.Timeframe).")
+    parser.add_argument("--start", default=None, help="First bar time to load from the store.")
+    parser.add_argument("--end", default=None, help="Load store bars before this time.")
+
+
+def load_bars(args):
+    """Loads the bars selected by the add_data_arguments options."""
+    if args.store:
+        series = BarStore(args.store).open(args.symbol or settings.Trading.Symbol,
+                                           args.timeframe or settings.Trading.Timeframe)
+        return series.to_frame(args.start, args.end)
+    if not args.csv:
+        raise SystemExit("Either --csv or --store is required.")
+    return load_bars_csv(args.csv)
+
+
+class BacktestResult:
+    """
+    Outcome of a backtest run: closed trades, the per-bar equity curve,
+    summary statistics and the per-bar entry decisions.
+    """
+    def __init__(self, trades, times, equity, initial_balance, bars, seconds, requests_sent,
+                 decisions=None):
+        self.trades = trades
+        self.times = times
+        self.equity = equity
+        self.decisions = decisions
+        self.stats = self._compute_stats(initial_balance, bars, seconds, requests_sent)
+
+    def _compute_stats(self, initial_balance, bars, seconds, requests_sent):
+        pnl = self.trades['pnl'].to_numpy() if len(self.trades) else np.zeros(0)
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl <= 0]
+        equity = self.equity if len(self.equity) else np.array([initial_balance])
+        peak = np.maximum.accumulate(np.maximum(equity, initial_balance))
+        drawdown = peak - equity
+        worst = int(np.argmax(drawdown)) if len(drawdown) else 0
+        final_balance = initial_balance + pnl.sum()
+        if losses.sum() < 0:
+            profit_factor = wins.sum() / -losses.sum()
+        else:
+            profit_factor = float('inf') if len(wins) else 0.0
+        return {
+            'initial_balance': initial_balance,
+            'final_balance': final_balance,
+            'net_profit': final_balance - initial_balance,
+            'trades': len(pnl),
+            'win_rate': len(wins) / len(pnl) if len(pnl) else 0.0,
+            'profit_factor': profit_factor,
+            'expectancy': pnl.mean() if len(pnl) else 0.0,
+            'max_drawdown': float(drawdown[worst]),
+            'max_drawdown_pct': float(drawdown[worst] / peak[worst] * 100.0) if len(drawdown) else 0.0,
+            'bars': bars,
+            'seconds': seconds,
+            'bars_per_sec': bars / seconds if seconds > 0 else float('inf'),
+            'requests_sent': requests_sent,
+        }
+
+    def explain(self, time):
+        """
+        Why the candle at `time` did or did not signal, without any logging
+        having happened during the run.
+
+        :return: A strategies.decision_trace.DecisionRecord, or None if no bar
+                 has that time.
+        """
+        if self.decisions is None or not len(self.decisions):
+            return None
+        time = pd.Timestamp(time)
+        index = int(self.decisions['time'].searchsorted(time))
+        if index >= len(self.decisions) or self.decisions['time'].iloc[index] != time:
+            return None
+        return record_from_history(self.decisions, index)
+
+    def summary(self):
+        s = self.stats
+        return (f"Trades: {s['trades']} | Win rate: {s['win_rate'] * 100:.1f}% | "
+                f"Net profit: ${s['net_profit']:,.2f} | Profit factor: {s['profit_factor']:.2f} | "
+                f"Max DD: ${s['max_drawdown']:,.2f} ({s['max_drawdown_pct']:.2f}%) | "
+                f"Final balance: ${s['final_balance']:,.2f} | "
+                f"{s['bars']:,} bars in {s['seconds']:.2f}s ({s['bars_per_sec']:,.0f} bars/sec)")
+
+
+class EventBacktester:
+    """
+    Replays a bar history through the same flow as main's entry and management
+    cycles: at every bar open the open positions are managed by the real
+    BatchTradeManager, then, below MaxOpenTrades, the signal of the candle that
+    just closed is executed like main.execute_trade. The SimulatedBroker then
+    fills SL/TP inside the bar and marks the equity.
+
+    Signals come from XauUsdM5Strategy.run_logic_on_history with lookback=0,
+    i.e. the same values as the live incremental indicators.
+    """
+    def __init__(self, data, initial_balance=10000.0, quiet=True, start_bar=None, config=None,
+                 **broker_kwargs):
+        """
+        :param start_bar: First bar at which trading starts; the bars before it
+                          only warm up the indicators. Defaults to EMASlow_Period + 2.
+        :param config: Settings to backtest with (a Config or compiled Snapshot);
+                       the global settings when None.
+        """
+        self.data = data.reset_index(drop=True)
+        self.initial_balance = initial_balance
+        self.quiet = quiet
+        self.start_bar = start_bar
+        self.broker_kwargs = broker_kwargs
+        self.config = config or settings
+        self.symbol = self.config.Trading.Symbol
+
+    def run(self):
+        previous_level = log.level
+        if self.quiet:
+            # Per-trade info logs (lot sizing, trade management) would dominate the run
+            log.setLevel(logging.WARNING)
+        try:
+            return self._run()
+        finally:
+            log.setLevel(previous_level)
+
+    def _run(self):
+        started = time.perf_counter()
+        strategy = XauUsdM5Strategy(mt5_connector=None, config=self.config)
+        history = strategy.run_logic_on_history(self.data, lookback=0)
+        signals = history['signal'].tolist()
+
+        broker = SimulatedBroker(self.data, self.initial_balance, self.symbol, config=self.config,
+                                 **self.broker_kwargs)
+        broker.connect()
+        trade_manager = BatchTradeManager(broker, self.config)
+        highs = broker.highs
+        lows = broker.lows
+        max_open_trades = self.config.Trading.MaxOpenTrades
+
+        start = self.start_bar if self.start_bar is not None else self.config.Strategy.EMASlow_Period + 2
+        start = min(start, len(self.data))
+        equity = np.empty(len(self.data) - start)
+        for i in range(start, len(self.data)):
+            broker.set_bar(i)
+            # Management runs on every bar before the entry check, as main's management cycle does
+            open_positions = broker.get_open_positions(self.symbol)
+            if open_positions:
+                trade_manager.run_management(open_positions)
+            if signals[i - 1] is not None and len(open_positions) < max_open_trades:
+                self._execute_trade(broker, signals[i - 1], {'high': highs[i - 1], 'low': lows[i - 1]})
+            equity[i - start] = broker.process_bar()
+
+        if len(self.data):
+            broker.close_all()
+            if len(equity):
+                equity[-1] = broker.balance
+        seconds = time.perf_counter() - started
+        return BacktestResult(
+            trades=broker.trades_frame(),
+            times=self.data['time'].iloc[start:].reset_index(drop=True),
+            equity=equity,
+            initial_balance=self.initial_balance,
+            bars=len(equity),
+            seconds=seconds,
+            requests_sent=broker.requests_sent,
+            decisions=history
+        )
+
+    def _execute_trade(self, broker, signal_type, signal_candle):
+        """Same steps as main.execute_trade, against the simulated broker."""
+        risk = self.config.RiskManagement
+        symbol_info = broker.get_symbol_info(self.symbol)
+        account_info = broker.get_account_info()
+        last_tick = broker.get_last_tick(self.symbol)
+
+        entry_price, sl_price, tp_price, stop_loss_pips = calculate_trade_levels(
+            signal_type=signal_type,
+            signal_candle=signal_candle,
+            bid=last_tick.bid,
+            ask=last_tick.ask,
+            point=symbol_info.point,
+            pip_value=risk.PipDecimalValue,
+            stop_loss_buffer_pips=risk.StopLossBufferPips,
+            risk_reward_ratio=risk.RiskRewardRatio
+        )
+        lot_size = calculate_lot_size(
+            account_balance=account_info.balance,
+            risk_percentage=risk.RiskPercentage,
+            stop_loss_pips=stop_loss_pips,
+            pip_value_per_lot=risk.PipValuePerLot
+        )
+        if lot_size <= 0:
+            return None
+
+        order_type = mt5.ORDER_TYPE_BUY if signal_type == "BUY" else mt5.ORDER_TYPE_SELL
+        return broker.place_order(self.symbol, order_type, lot_size, entry_price, sl_price, tp_price,
+                                  comment=f"{signal_type} by Python Bot")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event-driven backtest over a CSV of bars.")
+    add_data_arguments(parser, default_csv="test/sample_data.csv")
+    parser.add_argument("--balance", type=float, default=10000.0, help="Initial account balance.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-trade info logs.")
+    parser.add_argument("--trades-out", help="Optional CSV path for the closed trades.")
+    parser.add_argument("--explain", action="append", default=[], metavar="TIME",
+                        help="Print why the candle at TIME did or did not signal (repeatable).")
+    args = parser.parse_args()
+
+    result = EventBacktester(load_bars(args), args.balance, quiet=not args.verbose).run()
+    log.info(result.summary())
+    if args.trades_out:
+        result.trades.to_csv(args.trades_out, index=False)
+        log.info(f"Closed trades written to {args.trades_out}")
+    for when in args.explain:
+        record = result.explain(when)
+        log.info(render_decision(record) if record else f"No bar at {when}.")
@@ -0,0 +1,467 @@
+import argparse
+import asyncio
+import selectors
+import signal
+import sys
+import time
+from collections import namedtuple
+import numpy as np
+from utils.logger import log
+from config import settings
+from storage.bar_store import BarStore, BAR_DTYPES, DEFAULT_ROOT
+
+# --- Offline stand-in for the MetaTrader5 package (see install()) ---
+# Constants, with the values of the real package
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_SLTP = 6
+ORDER_TIME_GTC = 0
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_NO_CHANGES = 10025
+TRADE_RETCODE_POSITION_CLOSED = 10036
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+ORDER_STATE_PARTIAL = 3
+ORDER_STATE_FILLED = 4
+
+RES_S_OK = 1
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL_INIT = -10003
+
+TIMEFRAMES = {
+    TIMEFRAME_M1: ("M1", 60), TIMEFRAME_M5: ("M5", 300), TIMEFRAME_M15: ("M15", 900),
+    TIMEFRAME_M30: ("M30", 1800), TIMEFRAME_H1: ("H1", 3600), TIMEFRAME_H4: ("H4", 14400),
+    TIMEFRAME_D1: ("D1", 86400),
+}
+DEFAULT_SPEED = 1000.0
+# Bars before the default start, so the strategy's warmup fetch finds history
+DEFAULT_START_BAR = 1000
+
+SymbolInfo = namedtuple('SymbolInfo', [
+    'name', 'point', 'digits', 'trade_stops_level', 'trade_contract_size',
+    'volume_min', 'volume_max', 'volume_step', 'filling_mode'
+])
+TradeDeal = namedtuple('TradeDeal', [
+    'ticket', 'order', 'time', 'time_msc', 'type', 'entry', 'magic', 'position_id', 'volume',
+    'price', 'commission', 'swap', 'profit', 'fee', 'symbol', 'comment'
+])
+TradeOrder = namedtuple('TradeOrder', [
+    'ticket', 'time_setup', 'time_done', 'time_done_msc', 'type', 'state', 'magic', 'position_id',
+    'volume_initial', 'volume_current', 'price_open', 'price_current', 'symbol', 'comment'
+])
+OrderCheckResult = namedtuple('OrderCheckResult', [
+    'retcode', 'balance', 'equity', 'profit', 'margin', 'margin_free', 'margin_level', 'comment', 'request'
+])
+
+_real_monotonic = time.monotonic
+_real_sleep = time.sleep
+
+
+class VirtualClock:
+    """Broker time that starts at `start` (epoch seconds) and runs `speed` times faster than real time."""
+    def __init__(self, start, speed=DEFAULT_SPEED):
+        self.start = float(start)
+        self.speed = speed
+        self._origin = _real_monotonic()
+
+    def now(self):
+        return self.start + (_real_monotonic() - self._origin) * self.speed
+
+    def sleep(self, seconds):
+        _real_sleep(max(0.0, seconds) / self.speed)
+
+
+class _ScaledSelector:
+    # asyncio computes select() timeouts in loop time, which is virtual: shrink them to real time
+    def __init__(self, selector, speed):
+        self._selector = selector
+        self._speed = speed
+
+    def select(self, timeout=None):
+        return self._selector.select(None if timeout is None else timeout / self._speed)
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class _AcceleratedLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def __init__(self, speed):
+        super().__init__()
+        self.speed = speed
+
+    def new_event_loop(self):
+        return asyncio.SelectorEventLoop(_ScaledSelector(selectors.DefaultSelector(), self.speed))
+
+
+class OfflineTerminal:
+    """
+    The terminal behind the module functions: one symbol, one timeframe of
+    stored bars, and a TickBroker holding the account and the positions.
+
+    Quotes move through each bar along open -> low -> high -> close (open ->
+    high -> low -> close for a down bar) as the clock advances; orders fill
+    at the current quote, and stops trigger at their level wherever the path
+    crosses it. Once the data (or `end`) is reached it sends the process a
+    SIGINT, which main handles as a normal shutdown.
+    """
+    def __init__(self, bars, symbol, timeframe, clock, end=None, initial_balance=10000.0, **broker_kwargs):
+        """
+        :param bars: DataFrame of the stored bars ('time' as datetime, 'spread' in points).
+        :param timeframe: The MetaTrader5 timeframe constant of the bars.
+        :param end: Epoch seconds at which the run stops; default the end of the last bar.
+        """
+        # The broker imports MetaTrader5, which has to resolve to this module
+        register()
+        from backtest.tick_replay import TickBroker
+
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.period = TIMEFRAMES[timeframe][1]
+        self.clock = clock
+        self.broker = TickBroker(bars, initial_balance, symbol, **broker_kwargs)
+        self.broker.connect()
+        self.rates = {col: bars[col].to_numpy() for col in BAR_DTYPES if col in bars}
+        self.rates['time'] = bars['time'].to_numpy().astype('datetime64[s]').astype(np.int64)
+        last = int(self.rates['time'][-1]) + self.period
+        self.end = min(end, last) if end is not None else last
+        self.error = (RES_S_OK, "Success")
+        self.walked_to = None
+        self.finished = False
+        info = self.broker.symbol_info
+        self.symbol_info = SymbolInfo(*info, filling_mode=SYMBOL_FILLING_IOC | SYMBOL_FILLING_FOK)
+
+    # --- Price path ---
+    def _vertices(self, i):
+        t = float(self.rates['time'][i])
+        o, h, l, c = (float(self.rates[col][i]) for col in ('open', 'high', 'low', 'close'))
+        middle = (l, h) if c >= o else (h, l)
+        return [(t, o), (t + self.period / 3, middle[0]), (t + self.period * 2 / 3, middle[1]), (t + self.period, c)]
+
+    def _bar_index(self, now):
+        return int(np.searchsorted(self.rates['time'], now, side='right')) - 1
+
+    def _bid_at(self, i, now):
+        points = self._vertices(i)
+        if now >= points[-1][0]:
+            return points[-1][1]    # Between the bar's end and the next bar: no quotes
+        for (t0, p0), (t1, p1) in zip(points, points[1:]):
+            if now < t1:
+                return p0 + (p1 - p0) * (now - t0) / (t1 - t0)
+        return points[-1][1]
+
+    def _path(self, since, now):
+        """The (time, bid) corners of the path in (since, now], ending with now itself."""
+        first, last = max(self._bar_index(since), 0), self._bar_index(now)
+        out = []
+        for i in range(first, last + 1):
+            out.extend(point for point in self._vertices(i) if since < point[0] < now)
+        out.append((now, self._bid_at(last, now)))
+        return out
+
+    def sync(self):
+        """Moves the market to the clock's time, triggering the stops the path went through."""
+        now = min(self.clock.now(), self.end)
+        if now >= self.end and not self.finished:
+            # Stop the bot the way Ctrl+C does; until it gets there the market stays at the end
+            self.finished = True
+            log.info("Offline data exhausted. Stopping the bot.")
+            signal.raise_signal(signal.SIGINT)
+
+        broker = self.broker
+        if self.walked_to is None:
+            self.walked_to = now
+            self._quote(now, self._bid_at(max(self._bar_index(now), 0), now))
+            return
+        if now <= self.walked_to:
+            return
+        for t, bid in self._path(self.walked_to, now):
+            if broker.positions:
+                # Stops inside this leg fill at their level, in the order the price meets them
+                previous = broker.tick.bid
+                spread = broker.tick.ask - broker.tick.bid
+                levels = [level for level in self._stop_bids(spread) if min(previous, bid) < level < max(previous, bid)]
+                for level in sorted(levels, reverse=bid < previous):
+                    self._quote(t, level)
+                    broker.check_stops()
+            self._quote(t, bid)
+            if broker.positions:
+                broker.check_stops()
+        self.walked_to = now
+
+    def _stop_bids(self, spread):
+        # The bid at which each level triggers: longs exit on the bid, shorts on the ask
+        for pos in self.broker.positions.values():
+            shift = 0.0 if pos['type'] == ORDER_TYPE_BUY else spread
+            for level in (pos['sl'], pos['tp']):
+                if level:
+                    yield level - shift
+
+    def _quote(self, t, bid):
+        broker = self.broker
+        broker.index = max(self._bar_index(t), 0)
+        digits = self.symbol_info.digits
+        bid = round(bid, digits)
+        broker.set_tick(int(t * 1000), bid, round(bid + broker.spreads[broker.index], digits))
+
+    # --- The MetaTrader5 functions ---
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self.sync()
+        if symbol != self.symbol or timeframe != self.timeframe:
+            self.error = (RES_E_NOT_FOUND, f"Only {self.symbol} {TIMEFRAMES[self.timeframe][0]} is available offline")
+            return None
+        now = self.walked_to
+        current = self._bar_index(now)
+        end = current + 1 - start_pos
+        begin = max(0, end - count)
+        if end <= begin:
+            return np.empty(0, dtype=list(BAR_DTYPES.items()))
+        rates = np.zeros(end - begin, dtype=list(BAR_DTYPES.items()))
+        for col, values in self.rates.items():
+            rates[col] = values[begin:end]
+        if start_pos == 0:
+            # The forming bar only shows the path so far
+            passed = [p for t, p in self._vertices(current) if t <= now] + [self.broker.tick.bid]
+            rates['high'][-1] = max(passed)
+            rates['low'][-1] = min(passed)
+            rates['close'][-1] = self.broker.tick.bid
+            rates['tick_volume'][-1] = int(rates['tick_volume'][-1] * min(1.0, (now - rates['time'][-1]) / self.period))
+        return rates
+
+    def symbol_info_tick(self, symbol):
+        self.sync()
+        return self.broker.tick if symbol == self.symbol else None
+
+    def symbol_info_fn(self, symbol):
+        return self.symbol_info if symbol == self.symbol else None
+
+    def account_info(self):
+        self.sync()
+        return self.broker.get_account_info()
+
+    def positions_get(self, symbol=None):
+        self.sync()
+        return tuple(self.broker.get_open_positions(symbol))
+
+    def _legs(self):
+        # (ticket, buy, volume, entry time, entry price, exit time, exit price, pnl, comment) of every position
+        legs = [(trade['ticket'], trade['direction'] == "BUY", trade['volume'], trade['entry_time'],
+                 trade['entry_price'], trade['exit_time'], trade['exit_price'], trade['pnl'], trade['comment'])
+                for trade in self.broker.closed_trades]
+        legs += [(pos['ticket'], pos['type'] == ORDER_TYPE_BUY, pos['volume'], pos['time'], pos['price_open'],
+                  None, None, 0.0, pos['comment']) for pos in self.broker.positions.values()]
+        return legs
+
+    def history_deals_get(self, date_from, date_to):
+        """The fills of the broker's positions, an entry and (once closed) an exit deal each."""
+        self.sync()
+        since, until = _epoch(date_from), _epoch(date_to)
+        deals = []
+        for ticket, buy, volume, entry_time, entry_price, exit_time, exit_price, pnl, comment in self._legs():
+            for entry, at, price, profit in ((DEAL_ENTRY_IN, entry_time, entry_price, 0.0),
+                                             (DEAL_ENTRY_OUT, exit_time, exit_price, pnl)):
+                if at is None:
+                    continue
+                msc = int(at.value // 1_000_000)
+                if since <= msc // 1000 < until:
+                    deals.append(TradeDeal(
+                        ticket=ticket * 2 + entry, order=ticket, time=msc // 1000, time_msc=msc,
+                        type=DEAL_TYPE_BUY if buy == (entry == DEAL_ENTRY_IN) else DEAL_TYPE_SELL,
+                        entry=entry, magic=settings.Trading.MagicNumber, position_id=ticket, volume=volume,
+                        price=price, commission=0.0, swap=0.0, profit=profit, fee=0.0,
+                        symbol=self.symbol, comment=comment if entry == DEAL_ENTRY_IN else ""))
+        return tuple(sorted(deals, key=lambda d: d.time_msc))
+
+    def history_orders_get(self, date_from, date_to):
+        """The filled market order that opened each of the broker's positions."""
+        self.sync()
+        since, until = _epoch(date_from), _epoch(date_to)
+        orders = []
+        for ticket, buy, volume, entry_time, entry_price, _, _, _, comment in self._legs():
+            msc = int(entry_time.value // 1_000_000)
+            if since <= msc // 1000 < until:
+                orders.append(TradeOrder(
+                    ticket=ticket, time_setup=msc // 1000, time_done=msc // 1000, time_done_msc=msc,
+                    type=ORDER_TYPE_BUY if buy else ORDER_TYPE_SELL, state=ORDER_STATE_FILLED,
+                    magic=settings.Trading.MagicNumber, position_id=ticket, volume_initial=volume,
+                    volume_current=0.0, price_open=entry_price, price_current=entry_price,
+                    symbol=self.symbol, comment=comment))
+        return tuple(sorted(orders, key=lambda o: o.time_done_msc))
+
+    def order_check(self, request):
+        self.sync()
+        account = self.broker.get_account_info()
+        retcode, comment = 0, "Done"
+        info = self.symbol_info
+        if request.get("action") == TRADE_ACTION_DEAL:
+            tick = self.broker.tick
+            price = tick.ask if request["type"] == ORDER_TYPE_BUY else tick.bid
+            if not info.volume_min <= request["volume"] <= info.volume_max:
+                retcode, comment = TRADE_RETCODE_INVALID_VOLUME, "Invalid volume"
+            elif not self.broker._stops_valid(request["type"], price, request.get("sl"), request.get("tp")):
+                retcode, comment = TRADE_RETCODE_INVALID_STOPS, "Invalid stops"
+        return OrderCheckResult(retcode=retcode, balance=account.balance, equity=account.equity,
+                                profit=account.profit, margin=0.0, margin_free=account.equity,
+                                margin_level=0.0, comment=comment, request=request)
+
+    def order_send(self, request):
+        self.sync()
+        action = request.get("action")
+        if action == TRADE_ACTION_DEAL:
+            return self.broker.place_order(request["symbol"], request["type"], request["volume"],
+                                           request["price"], request.get("sl", 0.0), request.get("tp", 0.0),
+                                           request.get("comment", ""))
+        if action == TRADE_ACTION_SLTP:
+            return self.broker.modify_position(request["position"], request.get("sl", 0.0), request.get("tp", 0.0))
+        self.error = (TRADE_RETCODE_INVALID, f"Unsupported trade action {action}")
+        return None
+
+
+_terminal = None
+
+
+def register():
+    """Makes `import MetaTrader5` return this module."""
+    sys.modules['MetaTrader5'] = sys.modules[__name__]
+
+
+def install(terminal, speed=DEFAULT_SPEED):
+    """
+    Makes `import MetaTrader5` return this module, backed by `terminal`, and
+    moves time.time/monotonic/sleep and asyncio's loop onto its virtual clock,
+    so the unmodified main.main() runs offline at `speed` times real time.
+    Must run before the bot's modules are imported.
+    """
+    global _terminal
+    _terminal = terminal
+    register()
+    time.time = terminal.clock.now
+    time.monotonic = terminal.clock.now
+    time.sleep = terminal.clock.sleep
+    asyncio.set_event_loop_policy(_AcceleratedLoopPolicy(speed))
+
+
+def initialize(*args, **kwargs):
+    if _terminal is None:
+        return False
+    _terminal.error = (RES_S_OK, "Success")
+    return True
+
+
+def shutdown():
+    return True
+
+
+def last_error():
+    return _terminal.error if _terminal is not None else (RES_E_INTERNAL_FAIL_INIT, "No offline terminal installed")
+
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    return _terminal.copy_rates_from_pos(symbol, timeframe, start_pos, count)
+
+
+def symbol_info(symbol):
+    return _terminal.symbol_info_fn(symbol)
+
+
+def symbol_info_tick(symbol):
+    return _terminal.symbol_info_tick(symbol)
+
+
+def account_info():
+    return _terminal.account_info()
+
+
+def positions_get(symbol=None, **kwargs):
+    return _terminal.positions_get(symbol)
+
+
+def history_deals_get(date_from, date_to, **kwargs):
+    return _terminal.history_deals_get(date_from, date_to)
+
+
+def history_orders_get(date_from, date_to, **kwargs):
+    return _terminal.history_orders_get(date_from, date_to)
+
+
+def order_check(request):
+    return _terminal.order_check(request)
+
+
+def order_send(request):
+    return _terminal.order_send(request)
+
+
+def _epoch(value):
+    return value.timestamp() if hasattr(value, 'timestamp') else float(value)
+
+
+def load_terminal(root, symbol, timeframe_name, start=None, end=None, speed=DEFAULT_SPEED,
+                  initial_balance=10000.0, **broker_kwargs):
+    """
+    Builds an OfflineTerminal over the stored bars of symbol/timeframe_name.
+
+    :param start: Epoch seconds the clock starts at; default DEFAULT_START_BAR bars in.
+    """
+    timeframe = next(tf for tf, (name, _) in TIMEFRAMES.items() if name == timeframe_name)
+    bars = BarStore(root).open(symbol, timeframe_name).to_frame()
+    if not len(bars):
+        raise SystemExit(f"No stored bars for {symbol} {timeframe_name} under {root}.")
+    times = bars['time'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    if start is None:
+        start = int(times[min(DEFAULT_START_BAR, len(times) - 1)])
+    clock = VirtualClock(start, speed)
+    return OfflineTerminal(bars, symbol, timeframe, clock, end, initial_balance, **broker_kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the unmodified bot (main.main) against stored bars on a virtual clock.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Bar store directory.")
+    parser.add_argument("--symbol", default=settings.Trading.Symbol)
+    parser.add_argument("--timeframe", default=settings.Trading.Timeframe)
+    parser.add_argument("--start", type=int, default=None, help="Start time, epoch seconds.")
+    parser.add_argument("--end", type=int, default=None, help="End time, epoch seconds.")
+    parser.add_argument("--speed", type=float, default=DEFAULT_SPEED, help="Multiple of real time.")
+    parser.add_argument("--balance", type=float, default=10000.0)
+    parser.add_argument("--point", type=float, default=0.01)
+    parser.add_argument("--digits", type=int, default=2)
+    parser.add_argument("--trades-out", help="Optional CSV path for the closed trades.")
+    args = parser.parse_args()
+
+    terminal = load_terminal(args.root, args.symbol, args.timeframe, args.start, args.end, args.speed,
+                             args.balance, point=args.point, digits=args.digits)
+    install(terminal, args.speed)
+    import main as bot
+    started = _real_monotonic()
+    bot.main()
+
+    broker = terminal.broker
+    broker.close_all()
+    trades = broker.trades_frame()
+    log.info(f"Offline run: {(terminal.walked_to - terminal.clock.start) / 3600:.1f} market hours in "
+             f"{_real_monotonic() - started:.1f}s, {len(trades)} trades, balance {broker.balance:,.2f}, "
+             f"{broker.requests_sent} trade requests.")
+    if args.trades_out:
+        trades.to_csv(args.trades_out, index=False)
+        log.info(f"Closed trades written to {args.trades_out}")
@@ -0,0 +1,242 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from utils.logger import log
+from config import settings, merge_config
+from backtest.engine import EventBacktester, add_data_arguments, load_bars
+
+# Only these config blocks may be swept; everything else stays as loaded
+TUNABLE_SECTIONS = ("Strategy", "RiskManagement", "TradeManagement", "CandlePatterns")
+BAR_COLUMNS = ("time", "open", "high", "low", "close", "tick_volume", "spread", "real_volume")
+
+# Per-process state of a pool worker, set once by _init_worker
+_worker = {}
+
+
+def build_candidates(space):
+    """
+    Expands a search space into the list of parameter sets to evaluate.
+
+    :param space: Dict with "method" ("grid" or "random"), "params" mapping dotted
+                  config keys (e.g. "Strategy.EMAFast_Period") to a list of values or
+                  to a {"min", "max"[, "step"]} range, and for random search
+                  "samples" and an optional "seed".
+    :return: A list of {dotted_key: value} dicts, invalid EMA pairs removed.
+    """
+    params = space["params"]
+    for key in params:
+        if key.split(".")[0] not in TUNABLE_SECTIONS:
+            raise ValueError(f"'{key}' is not in a tunable section {TUNABLE_SECTIONS}")
+
+    if space.get("method", "grid") == "grid":
+        values = [_expand_values(spec) for spec in params.values()]
+        candidates = [dict(zip(params, combo)) for combo in itertools.product(*values)]
+    else:
+        rng = random.Random(space.get("seed", 0))
+        candidates = []
+        seen = set()
+        for _ in range(space.get("samples", 100) * 20):
+            if len(candidates) >= space.get("samples", 100):
+                break
+            candidate = {key: _sample_value(spec, rng) for key, spec in params.items()}
+            if _is_valid(candidate) and candidate_key(candidate) not in seen:
+                seen.add(candidate_key(candidate))
+                candidates.append(candidate)
+
+    return [c for c in candidates if _is_valid(c)]
+
+
+def _expand_values(spec):
+    if isinstance(spec, list):
+        return spec
+    step = spec.get("step", 1)
+    if all(isinstance(v, int) for v in (spec["min"], spec["max"], step)):
+        return list(range(spec["min"], spec["max"] + 1, step))
+    values = np.arange(spec["min"], spec["max"] + step / 2.0, step)
+    return [round(v.item(), 10) for v in values]
+
+
+def _sample_value(spec, rng):
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    if "step" in spec or (isinstance(spec["min"], int) and isinstance(spec["max"], int)):
+        return rng.choice(_expand_values(spec))
+    return rng.uniform(spec["min"], spec["max"])
+
+
+def _is_valid(candidate):
+    fast = candidate.get("Strategy.EMAFast_Period", settings.Strategy.EMAFast_Period)
+    slow = candidate.get("Strategy.EMASlow_Period", settings.Strategy.EMASlow_Period)
+    return fast < slow
+
+
+def candidate_key(candidate):
+    """Stable identity of a parameter set, used to resume interrupted sweeps."""
+    return json.dumps(candidate, sort_keys=True)
+
+
+def candidate_config(candidate, base=None):
+    """
+    The settings a candidate runs with: base (the global settings by default)
+    with the candidate's dotted config keys applied. base is left unchanged.
+    """
+    overrides = {}
+    for key, value in candidate.items():
+        *path, name = key.split(".")
+        node = overrides
+        for part in path:
+            node = node.setdefault(part, {})
+        node[name] = value
+    return merge_config(base or settings, overrides)
+
+
+def _share_bars(data):
+    """Copies the bar columns once into a shared memory block for the workers."""
+    columns = [c for c in BAR_COLUMNS if c in data]
+    matrix = np.empty((len(data), len(columns)))
+    for j, col in enumerate(columns):
+        if col == "time":
+            matrix[:, j] = data["time"].astype("datetime64[s]").astype("int64")
+        else:
+            matrix[:, j] = data[col]
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)[:] = matrix
+    return shm, matrix.shape, columns
+
+
+def _init_worker(shm_name, shape, columns, log_level):
+    """
+    Attaches to the shared bars once per process. The DataFrame columns are
+    read-only views on the shared block, so no task ever pickles the bars.
+    """
+    log.setLevel(log_level)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    matrix.flags.writeable = False
+    data = {col: matrix[:, j] for j, col in enumerate(columns)}
+    data["time"] = pd.to_datetime(data["time"].astype("int64"), unit="s")
+    _worker["shm"] = shm
+    _worker["data"] = pd.DataFrame(data, copy=False)
+
+
+@contextmanager
+def bar_pool(data, workers=None):
+    """
+    Process pool whose workers all see `data` through one shared memory block
+    (read it in a task with worker_data()). The block is freed on exit.
+    """
+    shm, shape, columns = _share_bars(data)
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(shm.name, shape, columns, logging.WARNING)) as pool:
+            yield pool
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def worker_data():
+    """The shared bars, inside a bar_pool task."""
+    return _worker["data"]
+
+
+def _run_candidate(candidate, initial_balance):
+    result = EventBacktester(worker_data(), initial_balance, quiet=True,
+                             config=candidate_config(candidate)).run()
+    return {"params": candidate, "stats": result.stats}
+
+
+def load_results(path):
+    """Reads the results written so far, keyed by candidate_key."""
+    results = {}
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    results[candidate_key(row["params"])] = row
+    return results
+
+
+def rank_results(results, rank_by=("net_profit",), min_trades=0):
+    """
+    Sorts results by one or more stats. A leading '-' ranks that metric
+    lower-is-better (e.g. "-max_drawdown_pct").
+    """
+    def sort_key(row):
+        key = []
+        for metric in rank_by:
+            if metric.startswith("-"):
+                key.append(row["stats"][metric[1:]])
+            else:
+                key.append(-row["stats"][metric])
+        return key
+    eligible = [r for r in results if r["stats"]["trades"] >= min_trades]
+    return sorted(eligible, key=sort_key)
+
+
+def run_sweep(data, space, results_path, workers=None, initial_balance=10000.0):
+    """
+    Runs every candidate of the search space across a process pool.
+
+    Each finished backtest is appended to `results_path` straight away, so an
+    interrupted sweep resumes where it stopped when run again with the same file.
+
+    :return: All results (previous and new) as a list of {"params", "stats"} dicts.
+    """
+    candidates = build_candidates(space)
+    done = load_results(results_path)
+    pending = [c for c in candidates if candidate_key(c) not in done]
+    workers = workers or os.cpu_count()
+    log.info(f"Sweep: {len(candidates)} candidates, {len(candidates) - len(pending)} already done, "
+             f"{len(pending)} to run on {workers} worker(s).")
+    if not pending:
+        return list(done.values())
+
+    started = time.perf_counter()
+    with bar_pool(data, workers) as pool, open(results_path, "a") as out:
+        futures = [pool.submit(_run_candidate, c, initial_balance) for c in pending]
+        for n, future in enumerate(as_completed(futures), start=1):
+            row = future.result()
+            done[candidate_key(row["params"])] = row
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+            if n % max(1, len(pending) // 20) == 0 or n == len(pending):
+                elapsed = time.perf_counter() - started
+                log.info(f"Sweep progress: {n}/{len(pending)} in {elapsed:.1f}s "
+                         f"({n / elapsed:.2f} backtests/sec)")
+    return list(done.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep over the backtest.")
+    add_data_arguments(parser)
+    parser.add_argument("--space", required=True, help="JSON file describing the search space.")
+    parser.add_argument("--results", default="optimizer_results.jsonl", help="Append-only results file.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--balance", type=float, default=10000.0, help="Initial account balance.")
+    parser.add_argument("--rank-by", default="net_profit,-max_drawdown_pct",
+                        help="Comma-separated stats; prefix '-' for lower-is-better.")
+    parser.add_argument("--min-trades", type=int, default=0, help="Ignore results with fewer trades.")
+    parser.add_argument("--top", type=int, default=10, help="How many ranked results to print.")
+    args = parser.parse_args()
+
+    with open(args.space, "r") as f:
+        search_space = json.load(f)
+    all_results = run_sweep(load_bars(args), search_space, args.results,
+                            args.workers, args.balance)
+    ranked = rank_results(all_results, args.rank_by.split(","), args.min_trades)
+    for place, row in enumerate(ranked[:args.top], start=1):
+        stats = row["stats"]
+        log.info(f"#{place}: net=${stats['net_profit']:,.2f} trades={stats['trades']} "
+                 f"win={stats['win_rate'] * 100:.1f}% pf={stats['profit_factor']:.2f} "
+                 f"dd={stats['max_drawdown_pct']:.2f}% | {json.dumps(row['params'], sort_keys=True)}")
@@ -0,0 +1,276 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from utils.logger import log
+from config import settings
+from backtest.engine import EventBacktester, add_data_arguments, load_bars
+from backtest.optimizer import (build_candidates, candidate_config, rank_results, bar_pool, worker_data,
+                                candidate_key)
+
+# Bars of indicator warm-up put in front of every window, in slow EMA periods
+WARMUP_PERIODS = 10
+# Simulations handed to one worker at a time
+MC_CHUNK_SIMULATIONS = 1000
+
+
+# --- Walk-forward ---
+def walk_forward_windows(bars, train_bars, test_bars, step=None, anchored=False):
+    """
+    Splits a history into consecutive (train, test) windows.
+
+    :param step: Bars each window moves forward; the test length by default, so
+                 the test windows tile the history without overlapping.
+    :param anchored: Keep every training window starting at bar 0.
+    :return: List of (train_start, train_end, test_end) bar indexes; the test
+             window is [train_end, test_end).
+    """
+    step = step or test_bars
+    windows = []
+    train_start = 0
+    while train_start + train_bars + test_bars <= bars:
+        train_end = train_start + train_bars
+        windows.append((0 if anchored else train_start, train_end, train_end + test_bars))
+        train_start += step
+    return windows
+
+
+def _run_slice(candidate, initial_balance, begin, end, warmup):
+    """
+    Backtests bars [begin, end) of the shared history with a candidate's
+    settings, trading only after `warmup` bars of indicator warm-up.
+    """
+    first = max(0, begin - warmup)
+    data = worker_data().iloc[first:end]
+    result = EventBacktester(data, initial_balance, quiet=True, start_bar=begin - first,
+                             config=candidate_config(candidate)).run()
+    trades = result.trades[['entry_time', 'direction', 'volume', 'entry_price', 'initial_sl', 'pnl']]
+    return {"params": candidate, "stats": result.stats, "trades": trades.to_dict("list")}
+
+
+def run_walk_forward(data, space, train_bars, test_bars, step=None, anchored=False,
+                     rank_by=("net_profit",), min_trades=0, workers=None, initial_balance=10000.0):
+    """
+    Walk-forward analysis: in every window the search space is optimized on the
+    training bars, and the best parameter set is then run, untouched, on the
+    following test bars. Every backtest of every window runs on one process pool.
+
+    :return: Dict with "windows" (per window: bounds, chosen params, train and
+             test stats), "trades" (all out-of-sample trades as a DataFrame) and
+             "stats" (out-of-sample totals and walk-forward efficiency).
+    """
+    data = data.reset_index(drop=True)
+    windows = walk_forward_windows(len(data), train_bars, test_bars, step, anchored)
+    if not windows:
+        raise ValueError(f"{len(data)} bars cannot hold a {train_bars}-bar training "
+                         f"and a {test_bars}-bar test window.")
+    candidates = build_candidates(space)
+    warmup = settings.Strategy.EMASlow_Period * WARMUP_PERIODS
+    log.info(f"Walk-forward: {len(windows)} window(s) x {len(candidates)} candidate(s) "
+             f"on {workers or os.cpu_count()} worker(s).")
+
+    started = time.perf_counter()
+    report = []
+    with bar_pool(data, workers) as pool:
+        # Every training run of every window at once, so the pool never idles between windows
+        futures = {pool.submit(_run_slice, c, initial_balance, start, end, warmup): w
+                   for w, (start, end, _) in enumerate(windows) for c in candidates}
+        train_results = [[] for _ in windows]
+        for n, future in enumerate(as_completed(futures), start=1):
+            train_results[futures[future]].append(future.result())
+            if n % max(1, len(futures) // 20) == 0 or n == len(futures):
+                log.info(f"Walk-forward training: {n}/{len(futures)} in {time.perf_counter() - started:.1f}s")
+
+        tests = {}
+        for w, (start, end, test_end) in enumerate(windows):
+            ranked = rank_results(train_results[w], rank_by, min_trades)
+            if not ranked:
+                log.warning(f"Window {w}: no candidate with {min_trades}+ trades. Skipped.")
+                continue
+            best = ranked[0]
+            report.append({"window": w, "train": [start, end], "test": [end, test_end],
+                           "params": best["params"], "train_stats": best["stats"]})
+            tests[pool.submit(_run_slice, best["params"], initial_balance, end, test_end, warmup)] = report[-1]
+        for future in as_completed(tests):
+            row = future.result()
+            tests[future]["test_stats"] = row["stats"]
+            tests[future]["test_trades"] = pd.DataFrame(row["trades"])
+
+    report.sort(key=lambda r: r["window"])
+    trades = [r.pop("test_trades") for r in report]
+    trades = pd.concat(trades, ignore_index=True) if trades else pd.DataFrame()
+    return {"windows": report, "trades": trades, "stats": _walk_forward_stats(report)}
+
+
+def _walk_forward_stats(report):
+    if not report:
+        return {}
+    train_per_bar = sum(r["train_stats"]["net_profit"] / max(r["train_stats"]["bars"], 1) for r in report)
+    test_per_bar = sum(r["test_stats"]["net_profit"] / max(r["test_stats"]["bars"], 1) for r in report)
+    return {
+        "windows": len(report),
+        "oos_net_profit": float(sum(r["test_stats"]["net_profit"] for r in report)),
+        "oos_trades": int(sum(r["test_stats"]["trades"] for r in report)),
+        "oos_profitable_windows": int(sum(r["test_stats"]["net_profit"] > 0 for r in report)),
+        "oos_worst_drawdown_pct": float(max(r["test_stats"]["max_drawdown_pct"] for r in report)),
+        # Out-of-sample profit per bar as a share of what the optimization promised
+        "walk_forward_efficiency": float(test_per_bar / train_per_bar) if train_per_bar > 0 else float("nan"),
+        "distinct_params": len({candidate_key(r["params"]) for r in report}),
+    }
+
+
+# --- Monte Carlo ---
+def trade_units(trades, pip_value=None):
+    """
+    Turns backtest trades into what is needed to re-size them: the profit per
+    lot and the stop loss distance in pips at entry.
+
+    :param trades: Closed trades with volume, entry_price, initial_sl and pnl columns.
+    :return: (pnl_per_lot, stop_loss_pips) arrays.
+    """
+    pip_value = pip_value or settings.RiskManagement.PipDecimalValue
+    volume = trades['volume'].to_numpy(dtype=float)
+    stop_loss_pips = np.abs(trades['entry_price'].to_numpy(dtype=float) -
+                            trades['initial_sl'].to_numpy(dtype=float)) / pip_value
+    return trades['pnl'].to_numpy(dtype=float) / volume, stop_loss_pips
+
+
+def _lot_sizes(balance, risk_percentage, stop_loss_pips, pip_value_per_lot):
+    # position_sizer.calculate_lot_size over arrays (stop losses already checked > 0)
+    return np.round(balance * (risk_percentage / 100.0) / (stop_loss_pips * pip_value_per_lot), 2)
+
+
+def _simulate(pnl_per_lot, stop_loss_pips, simulations, method, seed, initial_balance,
+              risk_percentage, pip_value_per_lot, ruin_balance):
+    """
+    One chunk of Monte Carlo paths, each trade re-sized on the balance of its path.
+
+    :return: (final balances, max drawdowns in %, ruined flags) of the chunk.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(pnl_per_lot)
+    if method == "bootstrap":
+        order = rng.integers(0, n, size=(simulations, n))
+    else:
+        order = np.argsort(rng.random((simulations, n)), axis=1)
+
+    balance = np.full(simulations, float(initial_balance))
+    peak = balance.copy()
+    max_drawdown = np.zeros(simulations)
+    ruined = np.zeros(simulations, dtype=bool)
+    for k in range(n):
+        trade = order[:, k]
+        lots = _lot_sizes(balance, risk_percentage, stop_loss_pips[trade], pip_value_per_lot)
+        # A ruined account stops trading
+        balance = balance + np.where(ruined, 0.0, lots * pnl_per_lot[trade])
+        np.maximum(peak, balance, out=peak)
+        np.maximum(max_drawdown, (peak - balance) / peak * 100.0, out=max_drawdown)
+        ruined |= balance <= ruin_balance
+    return balance, max_drawdown, ruined
+
+
+def run_monte_carlo(trades, simulations=10000, method="shuffle", seed=0, initial_balance=10000.0,
+                    risk_percentage=None, pip_value_per_lot=None, ruin_drawdown_pct=50.0, workers=None):
+    """
+    Monte Carlo over a trade sequence: every path reorders ("shuffle") or
+    resamples with replacement ("bootstrap") the trades and re-sizes each one
+    with the RiskPercentage rule of calculate_lot_size on that path's balance.
+    Chunks of paths run in parallel on a process pool.
+
+    :param ruin_drawdown_pct: Drawdown from the starting balance counted as ruin.
+    :return: Dict of distributions (percentiles of the final balance and of the
+             max drawdown) and the risk of ruin.
+    """
+    risk_percentage = risk_percentage if risk_percentage is not None else settings.RiskManagement.RiskPercentage
+    pip_value_per_lot = pip_value_per_lot or settings.RiskManagement.PipValuePerLot
+    pnl_per_lot, stop_loss_pips = trade_units(trades)
+    valid = stop_loss_pips > 0
+    pnl_per_lot, stop_loss_pips = pnl_per_lot[valid], stop_loss_pips[valid]
+    if not len(pnl_per_lot):
+        raise ValueError("No trades with a stop loss to simulate.")
+    ruin_balance = initial_balance * (1.0 - ruin_drawdown_pct / 100.0)
+
+    chunks = [min(MC_CHUNK_SIMULATIONS, simulations - i) for i in range(0, simulations, MC_CHUNK_SIMULATIONS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        parts = list(pool.map(_simulate, *zip(*[
+            (pnl_per_lot, stop_loss_pips, size, method, chunk_seed, initial_balance,
+             risk_percentage, pip_value_per_lot, ruin_balance)
+            for size, chunk_seed in zip(chunks, seeds)])))
+    final = np.concatenate([p[0] for p in parts])
+    drawdown = np.concatenate([p[1] for p in parts])
+    ruined = np.concatenate([p[2] for p in parts])
+
+    percentiles = (5, 25, 50, 75, 95)
+    return {
+        "simulations": simulations,
+        "trades": len(pnl_per_lot),
+        "method": method,
+        "seconds": time.perf_counter() - started,
+        "final_balance": {f"p{q}": float(v) for q, v in zip(percentiles, np.percentile(final, percentiles))},
+        "max_drawdown_pct": {f"p{q}": float(v) for q, v in zip(percentiles, np.percentile(drawdown, percentiles))},
+        "probability_of_loss": float((final < initial_balance).mean()),
+        "risk_of_ruin": float(ruined.mean()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward and Monte Carlo robustness analysis.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    wf = sub.add_parser("walk-forward", help="Roll optimization and out-of-sample test windows.")
+    add_data_arguments(wf)
+    wf.add_argument("--space", required=True, help="JSON search space (see backtest.optimizer).")
+    wf.add_argument("--train-bars", type=int, required=True)
+    wf.add_argument("--test-bars", type=int, required=True)
+    wf.add_argument("--step", type=int, default=None, help="Bars between windows (default: --test-bars).")
+    wf.add_argument("--anchored", action="store_true", help="Grow the training window from bar 0.")
+    wf.add_argument("--rank-by", default="net_profit,-max_drawdown_pct")
+    wf.add_argument("--min-trades", type=int, default=0)
+    wf.add_argument("--monte-carlo", type=int, default=0, metavar="N",
+                    help="Also run N Monte Carlo paths over the out-of-sample trades.")
+    wf.add_argument("--output", help="Write the report as JSON here.")
+
+    mc = sub.add_parser("monte-carlo", help="Monte Carlo over a trades CSV (engine --trades-out).")
+    mc.add_argument("--trades", required=True)
+    mc.add_argument("--simulations", type=int, default=10000)
+    mc.add_argument("--output", help="Write the report as JSON here.")
+
+    for p in (wf, mc):
+        p.add_argument("--method", choices=("shuffle", "bootstrap"), default="shuffle")
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--ruin-drawdown", type=float, default=50.0, help="Drawdown %% counted as ruin.")
+        p.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+        p.add_argument("--balance", type=float, default=10000.0, help="Initial account balance.")
+    args = parser.parse_args()
+
+    output = {}
+    if args.mode == "walk-forward":
+        with open(args.space, "r") as f:
+            search_space = json.load(f)
+        result = run_walk_forward(load_bars(args), search_space, args.train_bars, args.test_bars, args.step,
+                                  args.anchored, args.rank_by.split(","), args.min_trades,
+                                  args.workers, args.balance)
+        for row in result["windows"]:
+            test = row["test_stats"]
+            log.info(f"Window {row['window']} test bars {row['test'][0]}-{row['test'][1]}: "
+                     f"net=${test['net_profit']:,.2f} trades={test['trades']} "
+                     f"dd={test['max_drawdown_pct']:.2f}% | {json.dumps(row['params'], sort_keys=True)}")
+        log.info(f"Out of sample: {result['stats']}")
+        output = {"windows": result["windows"], "stats": result["stats"]}
+        trades, simulations = result["trades"], args.monte_carlo
+    else:
+        trades, simulations = pd.read_csv(args.trades), args.simulations
+
+    if simulations and len(trades):
+        output["monte_carlo"] = run_monte_carlo(trades, simulations, args.method, args.seed, args.balance,
+                                                ruin_drawdown_pct=args.ruin_drawdown, workers=args.workers)
+        log.info(f"Monte Carlo: {output['monte_carlo']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2, default=str)
+        log.info(f"Report written to {args.output}")
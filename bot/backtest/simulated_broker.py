@@ -0,0 +1,272 @@
+from collections import namedtuple
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pandas as pd
+from utils.logger import log
+from config import settings
+import MetaTrader5 as mt5
+
+# --- Broker objects, shaped like the ones the MetaTrader5 package returns ---
+SymbolInfo = namedtuple('SymbolInfo', [
+    'name', 'point', 'digits', 'trade_stops_level', 'trade_contract_size',
+    'volume_min', 'volume_max', 'volume_step'
+])
+Tick = namedtuple('Tick', ['time', 'bid', 'ask', 'last'])
+AccountInfo = namedtuple('AccountInfo', ['login', 'balance', 'equity', 'profit', 'currency'])
+TradePosition = namedtuple('TradePosition', [
+    'ticket', 'time', 'type', 'magic', 'volume', 'price_open', 'sl', 'tp',
+    'price_current', 'profit', 'symbol', 'comment'
+])
+OrderSendResult = namedtuple('OrderSendResult', [
+    'retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment', 'request'
+])
+
+
+class SimulatedBroker:
+    """
+    A simulated broker that implements the MT5Connector interface over a
+    history of bars, so the real strategy and BatchTradeManager code can trade it.
+
+    Bars are bid prices (as returned by copy_rates_from_pos) and the 'spread'
+    column, in points, gives the ask. The clock only moves through set_bar():
+    the current bar is the one forming, quoted at its open, and process_bar()
+    then walks it to trigger SL/TP and mark the equity at its close.
+    """
+    def __init__(self, data, initial_balance=10000.0, symbol=None, point=0.01, digits=2,
+                 trade_stops_level=0, trade_contract_size=100.0, volume_min=0.01,
+                 volume_max=100.0, volume_step=0.01, default_spread=0, config=None):
+        """
+        :param config: Settings for the pip values and magic number; the global
+                       settings when None.
+        """
+        config = config or settings
+        self.data = data.reset_index(drop=True)
+        self.symbol = symbol or config.Trading.Symbol
+        self.symbol_info = SymbolInfo(
+            name=self.symbol, point=point, digits=digits, trade_stops_level=trade_stops_level,
+            trade_contract_size=trade_contract_size, volume_min=volume_min,
+            volume_max=volume_max, volume_step=volume_step
+        )
+        self.pip_value = config.RiskManagement.PipDecimalValue
+        self.pip_value_per_lot = config.RiskManagement.PipValuePerLot
+        self.magic = config.Trading.MagicNumber
+        self.connected = False
+
+        # Plain lists are much faster than pandas/NumPy scalars in the bar loop
+        self.times = list(self.data['time'])
+        self.opens = self.data['open'].astype(float).tolist()
+        self.highs = self.data['high'].astype(float).tolist()
+        self.lows = self.data['low'].astype(float).tolist()
+        self.closes = self.data['close'].astype(float).tolist()
+        if 'spread' in self.data:
+            self.spreads = (self.data['spread'].astype(float) * point).tolist()
+        else:
+            self.spreads = [default_spread * point] * len(self.data)
+
+        self.index = 0
+        self.balance = float(initial_balance)
+        self.initial_balance = float(initial_balance)
+        self.positions = {}
+        self.closed_trades = []
+        self.next_ticket = 1
+        self.requests_sent = 0
+
+    # --- MT5Connector interface ---
+    def connect(self):
+        self.connected = True
+        return True
+
+    def disconnect(self):
+        self.connected = False
+
+    @contextmanager
+    def snapshot(self):
+        # Every read is already a list lookup; nothing to cache per tick
+        yield self
+
+    def get_market_data(self, symbol, timeframe, count):
+        """
+        The last `count` bars up to the forming one, whose high/low/close are
+        still its open price so nothing from the future leaks through.
+        """
+        start = max(0, self.index - count + 1)
+        df = self.data.iloc[start:self.index + 1].copy()
+        price = self.opens[self.index]
+        df.loc[df.index[-1], ['high', 'low', 'close']] = price
+        return df.reset_index(drop=True)
+
+    def get_last_bar_time(self, symbol, timeframe):
+        return int(pd.Timestamp(self.times[self.index]).timestamp())
+
+    def get_symbol_info(self, symbol):
+        return self.symbol_info
+
+    def get_account_info(self):
+        floating = sum(self._floating_pnl(pos, self.opens[self.index]) for pos in self.positions.values())
+        return AccountInfo(login=0, balance=self.balance, equity=self.balance + floating,
+                           profit=floating, currency="USD")
+
+    def get_last_tick(self, symbol):
+        bid = self.opens[self.index]
+        return Tick(time=self.times[self.index], bid=bid, ask=bid + self.spreads[self.index], last=bid)
+
+    def get_open_positions(self, symbol=None):
+        bid = self.opens[self.index]
+        return [self._snapshot(pos, bid) for pos in self.positions.values()
+                if symbol is None or pos['symbol'] == symbol]
+
+    def place_order(self, symbol, order_type, volume, price, sl, tp, comment=""):
+        """
+        Fills a market order at the current bid/ask; the requested price is ignored
+        like a market execution account would.
+        """
+        self.requests_sent += 1
+        request = SimpleNamespace(action=mt5.TRADE_ACTION_DEAL, symbol=symbol, volume=volume,
+                                  type=order_type, price=price, sl=sl, tp=tp,
+                                  magic=self.magic, comment=comment)
+        tick = self.get_last_tick(symbol)
+        fill = tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
+
+        if not (self.symbol_info.volume_min <= volume <= self.symbol_info.volume_max):
+            return self._result(mt5.TRADE_RETCODE_INVALID_VOLUME, "Invalid volume", request)
+        if not self._stops_valid(order_type, fill, sl, tp):
+            return self._result(mt5.TRADE_RETCODE_INVALID_STOPS, "Invalid stops", request)
+
+        ticket = self.next_ticket
+        self.next_ticket += 1
+        self.positions[ticket] = {
+            'ticket': ticket, 'time': self.times[self.index], 'type': order_type,
+            'magic': request.magic, 'volume': volume, 'price_open': fill, 'sl': sl, 'tp': tp,
+            'symbol': symbol, 'comment': comment, 'bar_open': self.index, 'initial_sl': sl,
+        }
+        return self._result(mt5.TRADE_RETCODE_DONE, "Request executed", request,
+                            order=ticket, volume=volume, price=fill, tick=tick)
+
+    def modify_position(self, ticket, sl, tp):
+        self.requests_sent += 1
+        request = SimpleNamespace(action=mt5.TRADE_ACTION_SLTP, position=ticket, sl=sl, tp=tp,
+                                  magic=self.magic)
+        pos = self.positions.get(ticket)
+        if pos is None:
+            return self._result(mt5.TRADE_RETCODE_POSITION_CLOSED, "Position closed", request)
+        if pos['sl'] == sl and pos['tp'] == tp:
+            return self._result(mt5.TRADE_RETCODE_NO_CHANGES, "No changes", request)
+        tick = self.get_last_tick(pos['symbol'])
+        exit_price = tick.bid if pos['type'] == mt5.ORDER_TYPE_BUY else tick.ask
+        if not self._stops_valid(pos['type'], exit_price, sl, tp):
+            return self._result(mt5.TRADE_RETCODE_INVALID_STOPS, "Invalid stops", request)
+        pos['sl'] = sl
+        pos['tp'] = tp
+        return self._result(mt5.TRADE_RETCODE_DONE, "Request executed", request, order=ticket)
+
+    # --- Simulation clock ---
+    def set_bar(self, index):
+        """Moves the clock to the open of bar `index`."""
+        self.index = index
+
+    def process_bar(self):
+        """
+        Walks the current bar: closes positions whose SL or TP lies inside it and
+        returns the equity marked at its close. A gap through a level fills at the
+        open; when both levels are inside one bar the stop loss is assumed first.
+        """
+        i = self.index
+        for ticket in list(self.positions):
+            pos = self.positions[ticket]
+            # Longs exit on the bid, shorts on the ask
+            spread = 0.0 if pos['type'] == mt5.ORDER_TYPE_BUY else self.spreads[i]
+            exit_price, reason = self._find_exit(pos, self.opens[i] + spread, self.highs[i] + spread,
+                                                 self.lows[i] + spread)
+            if exit_price is not None:
+                self._close(ticket, exit_price, reason)
+
+        close = self.closes[i]
+        return self.balance + sum(self._floating_pnl(pos, close) for pos in self.positions.values())
+
+    def close_all(self, reason="end_of_data"):
+        """Closes every open position at the current bar's close."""
+        for ticket in list(self.positions):
+            pos = self.positions[ticket]
+            spread = 0.0 if pos['type'] == mt5.ORDER_TYPE_BUY else self.spreads[self.index]
+            self._close(ticket, self.closes[self.index] + spread, reason)
+
+    # --- Internals ---
+    def _find_exit(self, pos, bar_open, bar_high, bar_low):
+        sl, tp = pos['sl'], pos['tp']
+        if pos['type'] == mt5.ORDER_TYPE_BUY:
+            if sl and bar_open <= sl: return bar_open, "sl"
+            if tp and bar_open >= tp: return bar_open, "tp"
+            if sl and bar_low <= sl: return sl, "sl"
+            if tp and bar_high >= tp: return tp, "tp"
+        else:
+            if sl and bar_open >= sl: return bar_open, "sl"
+            if tp and bar_open <= tp: return bar_open, "tp"
+            if sl and bar_high >= sl: return sl, "sl"
+            if tp and bar_low <= tp: return tp, "tp"
+        return None, None
+
+    def _close(self, ticket, exit_price, reason):
+        pos = self.positions.pop(ticket)
+        pnl = self._floating_pnl(pos, exit_price, exit_is_quote=True)
+        if reason == "sl" and pos['sl'] != pos['initial_sl']:
+            reason = "managed_sl" # Breakeven or trailing stop moved it
+        self.balance += pnl
+        self.closed_trades.append({
+            'ticket': ticket,
+            'direction': "BUY" if pos['type'] == mt5.ORDER_TYPE_BUY else "SELL",
+            'volume': pos['volume'],
+            'entry_time': pos['time'],
+            'entry_price': pos['price_open'],
+            'exit_time': self.times[self.index],
+            'exit_price': exit_price,
+            'sl': pos['sl'],
+            'tp': pos['tp'],
+            'initial_sl': pos['initial_sl'],
+            'exit_reason': reason,
+            'bars_held': self.index - pos['bar_open'],
+            'pnl': pnl,
+            'comment': pos['comment'],
+        })
+
+    def _floating_pnl(self, pos, price, exit_is_quote=False):
+        if pos['type'] == mt5.ORDER_TYPE_BUY:
+            move = price - pos['price_open']
+        else:
+            # Shorts are marked on the ask unless the exit price already is one
+            ask = price if exit_is_quote else price + self._spread()
+            move = pos['price_open'] - ask
+        return move / self.pip_value * self.pip_value_per_lot * pos['volume']
+
+    def _spread(self):
+        return self.spreads[self.index]
+
+    def _stops_valid(self, order_type, price, sl, tp):
+        min_distance = self.symbol_info.trade_stops_level * self.symbol_info.point
+        if order_type == mt5.ORDER_TYPE_BUY:
+            return (not sl or sl <= price - min_distance) and (not tp or tp >= price + min_distance)
+        return (not sl or sl >= price + min_distance) and (not tp or tp <= price - min_distance)
+
+    def _snapshot(self, pos, bid):
+        price = bid if pos['type'] == mt5.ORDER_TYPE_BUY else bid + self._spread()
+        return TradePosition(
+            ticket=pos['ticket'], time=pos['time'], type=pos['type'], magic=pos['magic'],
+            volume=pos['volume'], price_open=pos['price_open'], sl=pos['sl'], tp=pos['tp'],
+            price_current=price, profit=self._floating_pnl(pos, bid), symbol=pos['symbol'],
+            comment=pos['comment']
+        )
+
+    def _result(self, retcode, comment, request, order=0, volume=0.0, price=0.0, tick=None):
+        if retcode != mt5.TRADE_RETCODE_DONE:
+            log.warning(f"SIM: request rejected: {comment} (retcode: {retcode})")
+        return OrderSendResult(
+            retcode=retcode, deal=order, order=order, volume=volume, price=price,
+            bid=tick.bid if tick else 0.0, ask=tick.ask if tick else 0.0,
+            comment=comment, request=request
+        )
+
+    def trades_frame(self):
+        """Closed trades as a DataFrame."""
+        return pd.DataFrame(self.closed_trades, columns=[
+            'ticket', 'direction', 'volume', 'entry_time', 'entry_price', 'exit_time',
+            'exit_price', 'sl', 'tp', 'initial_sl', 'exit_reason', 'bars_held', 'pnl'
+        ])
@@ -0,0 +1,289 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.logger import log
+from config import settings
+from strategies.xauusd_m5_strategy import XauUsdM5Strategy
+from risk_management.batch_manager import BatchTradeManager
+from backtest.engine import EventBacktester, BacktestResult, add_data_arguments, load_bars
+from backtest.simulated_broker import SimulatedBroker, Tick
+from storage.tick_file import read_ticks, bars_from_ticks, DEFAULT_CHUNK_TICKS
+from utils.bar_scheduler import TIMEFRAME_SECONDS
+import MetaTrader5 as mt5
+
+# Ticks in the first window searched for the next event; each empty window quadruples it
+SCAN_WINDOW = 64
+
+
+class TickBroker(SimulatedBroker):
+    """
+    SimulatedBroker quoted by a tick stream instead of bar opens. The bars
+    still drive the entries and bars_held; set_tick() moves the quote and
+    check_stops() closes a position at the first tick reaching its SL or TP,
+    at that tick's price, so gaps through a level cost what they would live.
+    """
+    def __init__(self, data, initial_balance=10000.0, symbol=None, **kwargs):
+        super().__init__(data, initial_balance, symbol, **kwargs)
+        self.tick = Tick(time=0, bid=0.0, ask=0.0, last=0.0)
+        self.time_msc = 0
+
+    def set_tick(self, time_msc, bid, ask):
+        self.tick = Tick(time=time_msc // 1000, bid=bid, ask=ask, last=bid)
+        self.time_msc = time_msc
+
+    def get_last_tick(self, symbol):
+        return self.tick
+
+    def get_account_info(self):
+        floating = sum(self._floating_pnl(pos, self.tick.bid) for pos in self.positions.values())
+        return super().get_account_info()._replace(equity=self.balance + floating, profit=floating)
+
+    def get_open_positions(self, symbol=None):
+        return [self._snapshot(pos, self.tick.bid) for pos in self.positions.values()
+                if symbol is None or pos['symbol'] == symbol]
+
+    def place_order(self, symbol, order_type, volume, price, sl, tp, comment=""):
+        result = super().place_order(symbol, order_type, volume, price, sl, tp, comment)
+        if result.retcode == mt5.TRADE_RETCODE_DONE:
+            self.positions[result.order]['time'] = self._timestamp()
+        return result
+
+    def check_stops(self):
+        bid, ask = self.tick.bid, self.tick.ask
+        for ticket in list(self.positions):
+            pos = self.positions[ticket]
+            sl, tp = pos['sl'], pos['tp']
+            if pos['type'] == mt5.ORDER_TYPE_BUY:
+                if sl and bid <= sl:
+                    self._close(ticket, bid, "sl")
+                elif tp and bid >= tp:
+                    self._close(ticket, bid, "tp")
+            elif sl and ask >= sl:
+                self._close(ticket, ask, "sl")
+            elif tp and ask <= tp:
+                self._close(ticket, ask, "tp")
+
+    def stop_levels(self):
+        """
+        The quotes that close a position: (bid at or below, bid at or above,
+        ask at or above, ask at or below), infinite when nothing is there.
+        """
+        bid_floor, bid_ceiling, ask_ceiling, ask_floor = -np.inf, np.inf, np.inf, -np.inf
+        for pos in self.positions.values():
+            sl, tp = pos['sl'], pos['tp']
+            if pos['type'] == mt5.ORDER_TYPE_BUY:
+                if sl: bid_floor = max(bid_floor, sl)
+                if tp: bid_ceiling = min(bid_ceiling, tp)
+            else:
+                if sl: ask_ceiling = min(ask_ceiling, sl)
+                if tp: ask_floor = max(ask_floor, tp)
+        return bid_floor, bid_ceiling, ask_ceiling, ask_floor
+
+    def equity(self):
+        return self.balance + sum(self._floating_pnl(pos, self.tick.bid) for pos in self.positions.values())
+
+    def close_all(self, reason="end_of_data"):
+        for ticket in list(self.positions):
+            buy = self.positions[ticket]['type'] == mt5.ORDER_TYPE_BUY
+            self._close(ticket, self.tick.bid if buy else self.tick.ask, reason)
+
+    def _close(self, ticket, exit_price, reason):
+        super()._close(ticket, exit_price, reason)
+        self.closed_trades[-1]['exit_time'] = self._timestamp()
+
+    def _spread(self):
+        return self.tick.ask - self.tick.bid
+
+    def _timestamp(self):
+        return pd.Timestamp(self.time_msc, unit='ms')
+
+
+class TickReplayBacktester(EventBacktester):
+    """
+    Replays a tick stream through the live flow: entries on the first tick of
+    each bar from the signal of the bar that just closed (same signals as
+    EventBacktester), stop management by the real BatchTradeManager on the
+    ticks themselves, and SL/TP filled at the tick that reaches them.
+
+    Ticks are streamed chunk by chunk, so memory is bounded whatever the file
+    size. Within a chunk nothing runs per tick: NumPy finds the next tick that
+    can change anything (a bar open, a stop or target hit, or a price beyond
+    BatchTradeManager.wake_levels), and only those ticks reach Python. With
+    no position open the replay jumps straight from bar open to bar open.
+    """
+    def __init__(self, data, ticks, initial_balance=10000.0, quiet=True, start_bar=None,
+                 management_interval=0.0, speed=None, chunk_ticks=DEFAULT_CHUNK_TICKS, config=None,
+                 **broker_kwargs):
+        """
+        :param data: The bars the signals come from, on the same clock as the ticks.
+        :param ticks: A tick file path (see storage.tick_file.read_ticks) or an
+                      iterable of TickChunks.
+        :param management_interval: Seconds between two management passes, like
+                                    Trading.ManagementIntervalSeconds live; 0
+                                    manages on every tick.
+        :param speed: Pace the replay at this multiple of real time (60 = one
+                      market hour per minute); None replays as fast as possible.
+        """
+        super().__init__(data, initial_balance, quiet, start_bar, config, **broker_kwargs)
+        self.ticks = ticks
+        self.management_interval = management_interval
+        self.speed = speed
+        self.chunk_ticks = chunk_ticks
+        self._clock = None
+
+    def _run(self):
+        started = time.perf_counter()
+        strategy = XauUsdM5Strategy(mt5_connector=None, config=self.config)
+        history = strategy.run_logic_on_history(self.data, lookback=0)
+        signals = history['signal'].tolist()
+
+        broker = TickBroker(self.data, self.initial_balance, self.symbol, config=self.config,
+                        **self.broker_kwargs)
+        broker.connect()
+        trade_manager = BatchTradeManager(broker, self.config)
+        symbol_info = broker.get_symbol_info(self.symbol)
+        max_open_trades = self.config.Trading.MaxOpenTrades
+        bar_times = pd.to_datetime(self.data['time']).to_numpy().astype('datetime64[ms]').astype(np.int64)
+        bar_count = len(bar_times)
+
+        start = self.start_bar if self.start_bar is not None else self.config.Strategy.EMASlow_Period + 2
+        start = min(start, bar_count)
+        equity = np.full(bar_count - start, np.nan)
+        interval_ms = int(self.management_interval * 1000)
+        next_bar = start
+        last_bucket = None
+        levels = None
+        tick_count = events = 0
+
+        chunks = read_ticks(self.ticks, self.chunk_ticks) if isinstance(self.ticks, str) else self.ticks
+        for times, bids, asks in chunks:
+            n = len(times)
+            tick_count += n
+            grid = None
+            if interval_ms and n:
+                # Management runs on the first tick of each interval, as the live loop's cadence
+                buckets = times // interval_ms
+                grid = np.r_[buckets[0] != last_bucket, buckets[1:] != buckets[:-1]]
+                last_bucket = buckets[-1]
+
+            position = 0
+            while position < n:
+                bar_open = (int(np.searchsorted(times, bar_times[next_bar], side='left'))
+                            if next_bar < bar_count else n)
+                bar_open = max(bar_open, position)
+                if broker.positions:
+                    j = _next_event(bids, asks, grid, position, bar_open, levels)
+                else:
+                    j = bar_open
+                if j >= n:
+                    break
+                if self.speed:
+                    self._pace(int(times[j]))
+                events += 1
+                broker.set_tick(int(times[j]), float(bids[j]), float(asks[j]))
+                if broker.positions:
+                    broker.check_stops()
+
+                if j == bar_open and next_bar < bar_count:
+                    while next_bar < bar_count and bar_times[next_bar] <= times[j]:
+                        if next_bar > start:
+                            equity[next_bar - 1 - start] = broker.equity()
+                        next_bar += 1
+                    broker.index = next_bar - 1
+                    signal = signals[broker.index - 1] if broker.index >= start else None
+                    if signal is not None and len(broker.positions) < max_open_trades:
+                        self._execute_trade(broker, signal, {'high': broker.highs[broker.index - 1],
+                                                             'low': broker.lows[broker.index - 1]})
+
+                if broker.positions:
+                    if levels is not None and (grid is None or grid[j]) and \
+                            (asks[j] >= levels[4] or bids[j] <= levels[5]):
+                        trade_manager.run_management(broker.get_open_positions(self.symbol))
+                    levels = broker.stop_levels() + trade_manager.wake_levels(
+                        broker.get_open_positions(self.symbol), symbol_info)
+                position = j + 1
+
+        if bar_count:
+            broker.close_all()
+        equity = pd.Series(equity).ffill().fillna(self.initial_balance).to_numpy(copy=True)
+        if len(equity):
+            equity[-1] = broker.balance
+        seconds = time.perf_counter() - started
+        result = BacktestResult(
+            trades=broker.trades_frame(),
+            times=self.data['time'].iloc[start:].reset_index(drop=True),
+            equity=equity,
+            initial_balance=self.initial_balance,
+            bars=len(equity),
+            seconds=seconds,
+            requests_sent=broker.requests_sent,
+            decisions=history
+        )
+        result.stats.update({
+            'ticks': tick_count,
+            'tick_events': events,
+            'ticks_per_sec': tick_count / seconds if seconds > 0 else float('inf'),
+            'management': trade_manager.stats(),
+        })
+        return result
+
+    def _pace(self, time_msc):
+        if self._clock is None:
+            self._clock = (time.monotonic(), time_msc)
+        due = self._clock[0] + (time_msc - self._clock[1]) / 1000.0 / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _next_event(bids, asks, grid, lo, hi, levels):
+    """
+    Index of the first tick in [lo, hi) that hits a stop or target or wakes
+    the trade manager; hi if there is none.
+    """
+    bid_floor, bid_ceiling, ask_ceiling, ask_floor, buy_wake, sell_wake = levels
+    size = SCAN_WINDOW
+    while lo < hi:
+        end = min(hi, lo + size)
+        bid, ask = bids[lo:end], asks[lo:end]
+        hit = (bid <= bid_floor) | (bid >= bid_ceiling) | (ask >= ask_ceiling) | (ask <= ask_floor)
+        wake = (ask >= buy_wake) | (bid <= sell_wake)
+        if grid is not None:
+            wake &= grid[lo:end]
+        found = np.flatnonzero(hit | wake)
+        if len(found):
+            return lo + int(found[0])
+        lo = end
+        size *= 4
+    return hi
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tick-level backtest: entries from bars, stops managed per tick.")
+    parser.add_argument("--ticks", required=True, help="Tick file (.ticks[.gz|.bz2|.xz] or CSV).")
+    add_data_arguments(parser)
+    parser.add_argument("--balance", type=float, default=10000.0, help="Initial account balance.")
+    parser.add_argument("--management-interval", type=float, default=0.0,
+                        help="Seconds between management passes (0 = every tick).")
+    parser.add_argument("--speed", type=float, default=None, help="Replay at this multiple of real time.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-trade info logs.")
+    parser.add_argument("--trades-out", help="Optional CSV path for the closed trades.")
+    args = parser.parse_args()
+
+    if args.csv or args.store:
+        bars = load_bars(args)
+    else:
+        # No bars given: build them from the ticks (a first pass over the file)
+        log.info("Building bars from the ticks...")
+        bars = bars_from_ticks(read_ticks(args.ticks), TIMEFRAME_SECONDS.get(settings.Trading.Timeframe, 300))
+
+    result = TickReplayBacktester(bars, args.ticks, args.balance, quiet=not args.verbose,
+                                  management_interval=args.management_interval, speed=args.speed).run()
+    s = result.stats
+    log.info(result.summary())
+    log.info(f"{s['ticks']:,} ticks, {s['tick_events']:,} handled ({s['ticks_per_sec']:,.0f} ticks/sec). "
+             f"Management: {s['management']}")
+    if args.trades_out:
+        result.trades.to_csv(args.trades_out, index=False)
+        log.info(f"Closed trades written to {args.trades_out}")
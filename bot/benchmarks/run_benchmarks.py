@@ -0,0 +1,309 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.logger import log
+from utils import trade_logger
+from config import settings
+from strategies.xauusd_m5_strategy import XauUsdM5Strategy
+from risk_management.position_sizer import calculate_lot_size
+from benchmarks.synthetic_data import generate_bars
+
+DEFAULT_TOLERANCE = 0.15
+# Peak memory differences below this are noise, whatever the ratio
+MIN_MEMORY_DELTA_MB = 1.0
+# Directory the bot runs from, where a fresh interpreter resolves its imports
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cold starts timed per run: what a restart of main.py and a process-pool worker import
+STARTUP_SCRIPTS = {
+    "startup_main": "import main; from config import settings; bool(settings)",
+    "startup_backtest_worker": "import backtest.optimizer",
+}
+
+
+class Stage:
+    """
+    One benchmarked step. `setup` prepares its inputs outside the timing and
+    returns the callable to measure, which processes `units` of `unit`
+    (bars or calls) per run. Stages whose work happens in another process
+    set trace_memory False: tracemalloc cannot see it.
+    """
+    def __init__(self, name, setup, units, unit, trace_memory=True):
+        self.name = name
+        self.setup = setup
+        self.units = units
+        self.unit = unit
+        self.trace_memory = trace_memory
+
+
+def _time_stage(stage, repeats):
+    timings = []
+    for _ in range(repeats):
+        run = stage.setup()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _peak_memory_mb(stage):
+    # Separate pass: tracing allocations slows the code down too much to time it
+    run = stage.setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def _windows(data, size, calls):
+    """`calls` consecutive trailing slices of `size` bars, like the live fetches."""
+    last = len(data) - size
+    return [data.iloc[i:i + size].reset_index(drop=True) for i in range(last - calls + 1, last + 1)]
+
+
+def build_stages(data, calls):
+    """The stages to benchmark over `data`, in run order."""
+    strategy = XauUsdM5Strategy(mt5_connector=None)
+    lookback = strategy.get_lookback_bars()
+    calls = max(1, min(calls, len(data) - strategy.get_warmup_bars() - 2))
+
+    def indicators_per_window():
+        windows = _windows(data, lookback, calls)
+        return lambda: [strategy._calculate_indicators(w) for w in windows]
+
+    def indicators_full():
+        frame = data.copy()
+        return lambda: strategy._calculate_indicators(frame)
+
+    def logic_per_window():
+        windows = _windows(data, lookback, calls)
+        return lambda: [strategy.run_logic_on_data(w) for w in windows]
+
+    def candle_signals():
+        windows = [strategy._calculate_indicators(w) for w in _windows(data, lookback, calls)]
+        return lambda: [(strategy._is_bullish_signal(w), strategy._is_bearish_signal(w)) for w in windows]
+
+    def candle_patterns():
+        return lambda: strategy.patterns.detect_frame(data)
+
+    def lot_size():
+        stops = np.linspace(5.0, 60.0, calls).tolist()
+        return lambda: [calculate_lot_size(10000.0, settings.RiskManagement.RiskPercentage, sl,
+                                           settings.RiskManagement.PipValuePerLot) for sl in stops]
+
+    def history(lookback_bars):
+        def setup():
+            return lambda: strategy.run_logic_on_history(data, lookback=lookback_bars)
+        return setup
+
+    def indicator_state_updates():
+        warmup = strategy.get_warmup_bars()
+        state = strategy.indicators
+        deltas = [data.iloc[i - 1:i + 1] for i in range(warmup, warmup + calls)]
+
+        def run():
+            state.seed(data.iloc[:warmup])
+            for delta in deltas:
+                state.update(delta)
+        return run
+
+    stages = [
+        Stage("calculate_indicators_window", indicators_per_window, calls, "calls"),
+        Stage("calculate_indicators_full", indicators_full, len(data), "bars"),
+        Stage("run_logic_on_data", logic_per_window, calls, "calls"),
+        Stage("candle_signals", candle_signals, calls, "calls"),
+        Stage("candle_patterns_history", candle_patterns, len(data), "bars"),
+        Stage("calculate_lot_size", lot_size, calls, "calls"),
+        Stage("run_logic_on_history_windowed", history(None), len(data), "bars"),
+        Stage("run_logic_on_history_converged", history(0), len(data), "bars"),
+        Stage("indicator_state_update", indicator_state_updates, calls, "calls"),
+    ]
+
+    try:
+        from backtest.engine import EventBacktester
+        stages.append(Stage("event_backtest", lambda: EventBacktester(data).run, len(data), "bars"))
+        stages.append(Stage("bot_cycles", lambda: _bot_cycles_run(data, calls), calls, "calls"))
+    except ImportError as e:
+        log.warning(f"Skipping the backtest and bot cycle stages: {e}")
+    return stages + startup_stages(calls)
+
+
+def _cold_start(script):
+    """Runs `script` in a fresh interpreter from the bot directory."""
+    command = [sys.executable, "-c", script]
+    return subprocess.run(command, cwd=BOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+def startup_stages(calls):
+    """
+    Cold start of the bot and of a backtest worker: interpreter start, imports
+    and settings load, timed over a few fresh processes per run. A script
+    that fails (e.g. MetaTrader5 not installed) is skipped.
+    """
+    starts = max(1, min(calls, 5))
+    stages = []
+    for name, script in STARTUP_SCRIPTS.items():
+        failed = _cold_start(script)
+        if failed.returncode != 0:
+            reason = failed.stderr.strip().splitlines()[-1] if failed.stderr.strip() else failed.returncode
+            log.warning(f"Skipping the {name} stage: {reason}")
+            continue
+
+        def setup(script=script):
+            return lambda: [_cold_start(script) for _ in range(starts)]
+        stages.append(Stage(name, setup, starts, "starts", trace_memory=False))
+    return stages
+
+
+def _bot_cycles_run(data, calls):
+    """
+    A run of `calls` consecutive bars through main.run_management_cycle and
+    main.run_entry_cycle against a SimulatedBroker, starting once the warm-up
+    history is available.
+    """
+    import main
+    from backtest.simulated_broker import SimulatedBroker
+    from risk_management.batch_manager import BatchTradeManager
+
+    broker = SimulatedBroker(data)
+    broker.connect()
+    main.mt5_connector = broker
+    main.strategy = XauUsdM5Strategy(broker)
+    main.trade_manager = BatchTradeManager(broker)
+    first = main.strategy.get_warmup_bars() + 1
+
+    def run():
+        for i in range(first, first + calls):
+            broker.set_bar(i)
+            main.run_management_cycle()
+            main.run_entry_cycle()
+            broker.process_bar()
+    return run
+
+
+def run_benchmarks(bars=200_000, calls=200, seed=42, repeats=3):
+    """
+    Generates the synthetic history and benchmarks every stage on it.
+
+    :return: A JSON-serialisable dict with run metadata and, per stage, the
+             median seconds, microseconds per unit, throughput and peak memory.
+    """
+    previous_level = log.level
+    previous_journal = trade_logger.trade_journal
+    # Keep the journal writes but not the rows: they would pollute the real journal
+    journal_dir = tempfile.TemporaryDirectory()
+    trade_logger.trade_journal = trade_logger.TradeJournal(journal_dir.name)
+    log.setLevel(logging.WARNING)
+    try:
+        started = time.perf_counter()
+        data = generate_bars(bars, seed=seed)
+        results = {"generate_bars": _stage_result(time.perf_counter() - started, bars, "bars", None)}
+
+        for stage in build_stages(data, calls):
+            seconds = _time_stage(stage, repeats)
+            peak_mb = _peak_memory_mb(stage) if stage.trace_memory else None
+            results[stage.name] = _stage_result(seconds, stage.units, stage.unit, peak_mb)
+    finally:
+        trade_logger.trade_journal.close()
+        trade_logger.trade_journal = previous_journal
+        journal_dir.cleanup()
+        log.setLevel(previous_level)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "bars": bars,
+            "calls": calls,
+            "seed": seed,
+            "repeats": repeats,
+        },
+        "stages": results,
+    }
+
+
+def _stage_result(seconds, units, unit, peak_mb):
+    return {
+        "seconds": seconds,
+        "units": units,
+        "unit": unit,
+        "per_unit_us": seconds / units * 1e6 if units else 0.0,
+        "throughput": units / seconds if seconds > 0 else float("inf"),
+        "peak_mb": peak_mb,
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares the per-unit time and peak memory of each stage with a baseline
+    report. Per-unit figures keep runs with a different --bars comparable.
+
+    :return: A list of (stage, metric, baseline value, current value, ratio)
+             for every metric that got worse by more than `tolerance`.
+    """
+    regressions = []
+    for name, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous:
+            continue
+        if previous["per_unit_us"] > 0:
+            ratio = current["per_unit_us"] / previous["per_unit_us"]
+            if ratio > 1.0 + tolerance:
+                regressions.append((name, "per_unit_us", previous["per_unit_us"], current["per_unit_us"], ratio))
+        if previous.get("peak_mb") and current.get("peak_mb") is not None:
+            ratio = current["peak_mb"] / previous["peak_mb"]
+            if ratio > 1.0 + tolerance and current["peak_mb"] - previous["peak_mb"] > MIN_MEMORY_DELTA_MB:
+                regressions.append((name, "peak_mb", previous["peak_mb"], current["peak_mb"], ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the strategy, risk and backtest hot paths.")
+    parser.add_argument("--bars", type=int, default=200_000, help="Synthetic bars to generate.")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per run of the per-call stages.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per stage; the median is kept.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument("--baseline", help="Baseline report to compare against.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown/memory growth before flagging a regression.")
+    parser.add_argument("--save-baseline", help="Also write the report here as the new baseline.")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.bars, args.calls, args.seed, args.repeats)
+    for name, stage in report["stages"].items():
+        memory = f"{stage['peak_mb']:.1f} MB" if stage['peak_mb'] is not None else "n/a"
+        log.info(f"{name:32s} {stage['per_unit_us']:12.2f} us/{stage['unit'][:-1]} "
+                 f"{stage['throughput']:14,.0f} {stage['unit']}/sec  peak {memory}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            log.info(f"Report written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        for name, metric, before, after, ratio in regressions:
+            log.warning(f"REGRESSION {name}.{metric}: {before:.2f} -> {after:.2f} ({(ratio - 1) * 100:+.1f}%)")
+        if regressions:
+            sys.exit(1)
+        log.info(f"No regressions beyond {args.tolerance * 100:.0f}% against {args.baseline}.")
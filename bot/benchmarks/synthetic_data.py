@@ -0,0 +1,140 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.logger import log
+from storage.bar_store import BarStore
+
+BAR_SECONDS = 300
+# 1970-01-01 was a Thursday; this turns epoch days into Monday=0 weekdays
+_EPOCH_WEEKDAY = 3
+
+
+class SyntheticXauUsd:
+    """
+    Seeded generator of M5 gold bars with the features that matter to the
+    strategy: alternating up/down trends and ranges, clustered volatility with
+    fat tails, an intraday volatility cycle, weekend gaps, a variable spread
+    and tick volume that follows the bar range.
+
+    Bars are produced in chunks that continue each other, so arbitrarily long
+    histories can be generated in bounded memory. The same seed and chunk
+    sizes always give the same bars.
+    """
+    def __init__(self, seed=42, start="2015-01-05", start_price=1200.0, point=0.01):
+        self.rng = np.random.default_rng(seed)
+        self.point = point
+        self.next_time = int(pd.Timestamp(start).timestamp())
+        self.price = start_price
+        self.log_vol = 0.0
+        self.regime_drift = 0.0
+        self.regime_left = 0
+
+    def _times(self, count):
+        # Enough calendar slots to hold `count` weekday bars, weekends dropped
+        slots = self.next_time + BAR_SECONDS * np.arange(int(count * 7 / 5) + 2 * 288 + 1, dtype=np.int64)
+        weekday = (slots // 86400 + _EPOCH_WEEKDAY) % 7
+        times = slots[weekday < 5][:count]
+        self.next_time = int(times[-1]) + BAR_SECONDS
+        return times
+
+    def _regime_drifts(self, count):
+        drifts = np.empty(count)
+        filled = 0
+        while filled < count:
+            if self.regime_left == 0:
+                self.regime_left = int(self.rng.geometric(1.0 / 600))
+                # Per-bar log drift: up trend, down trend or range
+                self.regime_drift = self.rng.choice([1.5e-5, -1.5e-5, 0.0], p=[0.35, 0.35, 0.3])
+            take = min(self.regime_left, count - filled)
+            drifts[filled:filled + take] = self.regime_drift
+            self.regime_left -= take
+            filled += take
+        return drifts
+
+    def next_chunk(self, count):
+        """
+        Generates the next `count` bars.
+
+        :return: DataFrame with the MT5 rates columns (time in epoch seconds).
+        """
+        rng = self.rng
+        times = self._times(count)
+
+        # Clustered volatility: AR(1) on log volatility
+        shocks = rng.normal(0.0, 0.08, count)
+        log_vol = np.empty(count)
+        level = self.log_vol
+        for start in range(0, count, 1024):
+            block = shocks[start:start + 1024]
+            decay = 0.98 ** np.arange(1, len(block) + 1)
+            # Closed form of level = 0.98 * level + shock over the block
+            weights = np.cumsum(block / decay) * decay
+            log_vol[start:start + len(block)] = level * decay + weights
+            level = log_vol[start + len(block) - 1]
+        self.log_vol = level
+
+        hour = (times // 3600) % 24
+        session = np.where((hour >= 12) & (hour < 17), 1.6, np.where((hour >= 7) & (hour < 12), 1.2, 0.7))
+        vol = 4.5e-4 * session * np.exp(log_vol)
+        returns = self._regime_drifts(count) + vol * rng.standard_t(4, count) / np.sqrt(2.0)
+
+        # Weekend (and any other) gaps open away from the previous close
+        gaps = np.diff(times, prepend=times[0] - BAR_SECONDS) > BAR_SECONDS
+        gap_moves = np.where(gaps, rng.normal(0.0, 2.5e-3, count), 0.0)
+        open_moves = gap_moves + rng.normal(0.0, 0.05, count) * vol
+
+        log_close = np.log(self.price) + np.cumsum(open_moves + returns)
+        close = np.exp(log_close)
+        open_ = close * np.exp(-returns)
+        self.price = close[-1]
+
+        wick = np.abs(rng.normal(0.0, 0.6, (2, count))) * vol * close
+        high = np.maximum(open_, close) + wick[0]
+        low = np.minimum(open_, close) - wick[1]
+
+        digits = int(round(-np.log10(self.point)))
+        open_, high, low, close = (np.round(a, digits) for a in (open_, high, low, close))
+        spread = np.round(15 + rng.gamma(2.0, 4.0, count) / session + gaps * 40).astype(np.int32)
+        tick_volume = np.maximum(1, (high - low) / self.point * rng.uniform(0.5, 1.5, count)).astype(np.uint64)
+
+        return pd.DataFrame({
+            'time': times, 'open': open_, 'high': high, 'low': low, 'close': close,
+            'tick_volume': tick_volume, 'spread': spread, 'real_volume': np.zeros(count, dtype=np.uint64),
+        })
+
+
+def generate_bars(count, seed=42, chunk_size=1_000_000, **kwargs):
+    """
+    Generates `count` synthetic M5 gold bars in one DataFrame, with 'time'
+    converted to datetime like MT5Connector.get_market_data returns it.
+    """
+    generator = SyntheticXauUsd(seed=seed, **kwargs)
+    chunks = [generator.next_chunk(min(chunk_size, count - done)) for done in range(0, count, chunk_size)]
+    df = pd.concat(chunks, ignore_index=True) if chunks else generator.next_chunk(0)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic XAUUSD M5 bars.")
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--csv", help="Write the bars to this CSV file.")
+    parser.add_argument("--store", help="Append the bars to this bar store directory instead.")
+    parser.add_argument("--symbol", default="XAUUSD_SYN")
+    parser.add_argument("--timeframe", default="M5")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generator = SyntheticXauUsd(seed=args.seed)
+    store = BarStore(args.store) if args.store else None
+    for n, done in enumerate(range(0, args.bars, args.chunk_size)):
+        chunk = generator.next_chunk(min(args.chunk_size, args.bars - done))
+        if store:
+            store.append(args.symbol, args.timeframe, chunk)
+        elif args.csv:
+            chunk.to_csv(args.csv, mode='w' if n == 0 else 'a', header=n == 0, index=False)
+    elapsed = time.perf_counter() - started
+    log.info(f"Generated {args.bars:,} bars in {elapsed:.2f}s ({args.bars / elapsed:,.0f} bars/sec).")
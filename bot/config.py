@@ -1,4 +1,5 @@
 import json
+from types import MappingProxyType
 from utils.logger import log
 
 class Config:
@@ -14,7 +15,205 @@ class Config:
             else:
                 setattr(self, key, value)
 
-def load_config(path='config.json'):
+    def to_dict(self):
+        """The settings as plain nested dictionaries."""
+        return {key: value.to_dict() if isinstance(value, Config) else value
+                for key, value in vars(self).items()}
+
+def merge_config(base, overrides):
+    """
+    Returns a new Config holding base with the nested `overrides` dict applied
+    on top (e.g. {"Strategy": {"EMAFast_Period": 13}}). base is left unchanged.
+    """
+    def deep_update(target, changes):
+        for key, value in changes.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                deep_update(target[key], value)
+            else:
+                target[key] = value
+    data = base.to_dict()
+    deep_update(data, overrides)
+    return Config(data)
+
+class ConfigError(ValueError):
+    """Raised when settings fail validation; the message lists every problem found."""
+
+# Parameters read by the strategy and trade management, with the type the snapshot holds.
+# int values are accepted for float parameters; booleans must be true or false.
+PARAMETER_TYPES = {
+    'Trading': {'Symbol': str, 'Timeframe': str, 'MaxOpenTrades': int},
+    'Strategy': {
+        'EMAFast_Period': int, 'EMASlow_Period': int, 'RSI_Period': int, 'ADX_Period': int,
+        'RSI_Overbought': float, 'RSI_Oversold': float, 'ADX_Threshold': float,
+        'EnableADXFilter': bool, 'EnableCandlePatternFilter': bool, 'EnableRSIFilter': bool,
+    },
+    'RiskManagement': {
+        'RiskPercentage': float, 'RiskRewardRatio': float, 'StopLossBufferPips': float,
+        'PipValuePerLot': float, 'PipDecimalValue': float,
+    },
+    'TradeManagement': {
+        'EnableBreakeven': bool, 'EnableTrailingStop': bool,
+        'TrailingStop_ActivationPips': float, 'TrailingStop_DistancePips': float,
+    },
+    'CandlePatterns': {
+        'PinBar': {'BodyMaxPercent': float, 'WickMinPercent': float, 'OppositeWickMaxPercent': float},
+    },
+}
+
+# Cross-field rules checked once the types are right: (description, check on the snapshot)
+PARAMETER_RULES = (
+    ("Trading.MaxOpenTrades must be at least 1", lambda c: c.Trading.MaxOpenTrades >= 1),
+    ("Strategy periods must be at least 1",
+     lambda c: min(c.Strategy.EMAFast_Period, c.Strategy.EMASlow_Period,
+                   c.Strategy.RSI_Period, c.Strategy.ADX_Period) >= 1),
+    ("Strategy.EMAFast_Period must be below EMASlow_Period",
+     lambda c: c.Strategy.EMAFast_Period < c.Strategy.EMASlow_Period),
+    ("Strategy RSI levels must satisfy 0 <= RSI_Oversold < RSI_Overbought <= 100",
+     lambda c: 0 <= c.Strategy.RSI_Oversold < c.Strategy.RSI_Overbought <= 100),
+    ("RiskManagement.RiskPercentage, RiskRewardRatio, PipValuePerLot and PipDecimalValue must be positive",
+     lambda c: min(c.RiskManagement.RiskPercentage, c.RiskManagement.RiskRewardRatio,
+                   c.RiskManagement.PipValuePerLot, c.RiskManagement.PipDecimalValue) > 0),
+    ("TradeManagement trailing distances must not be negative",
+     lambda c: min(c.TradeManagement.TrailingStop_ActivationPips, c.TradeManagement.TrailingStop_DistancePips) >= 0),
+    ("CandlePatterns.PinBar percentages must be between 0 and 1",
+     lambda c: all(0 <= value <= 1 for value in (c.CandlePatterns.PinBar.BodyMaxPercent,
+                                                 c.CandlePatterns.PinBar.WickMinPercent,
+                                                 c.CandlePatterns.PinBar.OppositeWickMaxPercent))),
+)
+
+# Keys whose values never appear in a snapshot's repr (and so in logs or tracebacks)
+SECRET_KEYS = frozenset({'Password'})
+
+class Snapshot:
+    """
+    Base of the compiled settings sections (see compile_config): read-only
+    attributes in slots, compared by value.
+    """
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Settings snapshots are read-only; cannot set '{name}'.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Settings snapshots are read-only; cannot delete '{name}'.")
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __reduce__(self):
+        return _restore_snapshot, (type(self).__name__, self.to_dict())
+
+    def __repr__(self):
+        fields = ', '.join(f"{k}={_masked_repr(k, v)}" for k, v in zip(self.__slots__, self._values()))
+        return f"{type(self).__name__}({fields})"
+
+    def _values(self):
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def to_dict(self):
+        """The snapshot as plain nested dictionaries and lists, like Config.to_dict()."""
+        return {key: _thaw(value) for key, value in zip(self.__slots__, self._values())}
+
+def _masked_repr(key, value):
+    # Also reaches the mappings in lists, e.g. the Password of each MultiAccount.Accounts entry
+    if key in SECRET_KEYS:
+        return '***'
+    if isinstance(value, MappingProxyType):
+        return '{' + ', '.join(f"{k!r}: {_masked_repr(k, v)}" for k, v in value.items()) + '}'
+    if isinstance(value, tuple):
+        items = [_masked_repr(None, item) for item in value]
+        return '(' + ', '.join(items) + (',)' if len(items) == 1 else ')')
+    return repr(value)
+
+_snapshot_types = {}
+
+def _snapshot_type(name, fields):
+    key = (name, fields)
+    if key not in _snapshot_types:
+        _snapshot_types[key] = type(name, (Snapshot,), {'__slots__': fields})
+    return _snapshot_types[key]
+
+def _restore_snapshot(name, data):
+    return _freeze(data, name, None, '', [])
+
+def _thaw(value):
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+def _freeze(value, name, types, path, problems):
+    if isinstance(value, dict):
+        types = types if isinstance(types, dict) else {}
+        for key in types:
+            if key not in value:
+                problems.append(f"{path}{key} is missing")
+        items = {key: _freeze(item, key, types.get(key), f"{path}{key}.", problems)
+                 for key, item in value.items()}
+        try:
+            return _snapshot_type(name, tuple(items))(**items)
+        except (TypeError, ValueError) as e:
+            problems.append(f"{path.rstrip('.') or name}: {e}")
+            return None
+    if isinstance(value, list):
+        return tuple(_freeze_item(item) for item in value)
+    if types is None:
+        return value
+    path = path.rstrip('.')
+    if types is bool:
+        if not isinstance(value, bool):
+            problems.append(f"{path} must be true or false, not {value!r}")
+        return value
+    if types is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, types) or isinstance(value, bool):
+        problems.append(f"{path} must be of type {types.__name__}, not {value!r}")
+    return value
+
+def _freeze_item(value):
+    # Entries of lists (e.g. Portfolio.Instruments) stay mappings, read-only
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze_item(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze_item(item) for item in value)
+    return value
+
+def compile_config(config):
+    """
+    Compiles settings into an immutable, validated snapshot: nested Snapshot
+    objects read with the same attribute paths as Config (snapshot.Strategy.ADX_Threshold),
+    lists turned into tuples, and every parameter of PARAMETER_TYPES checked
+    and converted to its type. Components bind a snapshot once and are handed
+    a new one when the settings are reloaded, instead of reading the live
+    Config on every check.
+
+    :param config: A Config, the settings, another snapshot or a plain dict.
+    :raises ConfigError: Listing every missing, mistyped or inconsistent parameter.
+    """
+    data = config if isinstance(config, dict) else config.to_dict()
+    problems = []
+    for section in PARAMETER_TYPES:
+        if not isinstance(data.get(section), dict):
+            problems.append(f"Section {section} is missing")
+    snapshot = _freeze(data, 'Settings', PARAMETER_TYPES, '', problems)
+    if not problems:
+        for description, check in PARAMETER_RULES:
+            if not check(snapshot):
+                problems.append(description)
+    if problems:
+        raise ConfigError("Invalid settings: " + "; ".join(problems))
+    return snapshot
+
+DEFAULT_CONFIG_PATH = 'config.json'
+
+def load_config(path=DEFAULT_CONFIG_PATH):
     """
     Loads the configuration from a JSON file and returns a Config object.
     """
@@ -30,5 +229,59 @@ def load_config(path='config.json'):
         log.error(f"FATAL: Error decoding JSON from '{path}'. Please check for syntax errors.")
         return None
 
-# Load the configuration upon module import, making it accessible application-wide
-settings = load_config()
\ No newline at end of file
+class LazySettings:
+    """
+    The application-wide settings, read from the config file on first use
+    instead of at import, so importing a module does no file I/O and logs
+    nothing. Attributes are those of the loaded Config; bool(settings) loads
+    it and is False when loading failed, like a None from load_config().
+    """
+    def __init__(self, path=DEFAULT_CONFIG_PATH):
+        self.__dict__['_path'] = path
+        self.__dict__['_config'] = None
+        self.__dict__['_loaded'] = False
+
+    @property
+    def path(self):
+        """The file the settings are loaded from."""
+        return self._path
+
+    def load(self, path=None):
+        """
+        Loads (or reloads) the settings now, e.g. from another file.
+
+        :return: The Config, or None if the file could not be loaded.
+        """
+        config = load_config(path or self._path)
+        if path:
+            self.__dict__['_path'] = path
+        for key in list(self.__dict__):
+            if not key.startswith('_'):
+                del self.__dict__[key]
+        self.__dict__['_config'] = config
+        self.__dict__['_loaded'] = True
+        if config is not None:
+            # Copied over so later lookups are plain attribute reads, not __getattr__ calls
+            self.__dict__.update(vars(config))
+        return config
+
+    def __getattr__(self, name):
+        # Private and dunder lookups (copy, pickle) must not trigger a load
+        if name.startswith('_'):
+            raise AttributeError(name)
+        config = self._config if self._loaded else self.load()
+        if config is None:
+            raise AttributeError(f"No settings loaded from '{self._path}'; cannot read '{name}'.")
+        return getattr(config, name)
+
+    def __setattr__(self, name, value):
+        if not self._loaded:
+            self.load()
+        setattr(self._config, name, value)
+        self.__dict__[name] = value
+
+    def __bool__(self):
+        return (self._config if self._loaded else self.load()) is not None
+
+# Application-wide settings; config.json is read the first time they are used
+settings = LazySettings()
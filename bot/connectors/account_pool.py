@@ -0,0 +1,324 @@
+import multiprocessing
+import pickle
+import time
+from collections import namedtuple
+from multiprocessing.connection import wait
+from utils.logger import log
+from utils.histogram import Histogram
+from utils.metrics import account_fill_seconds, fill_spread_seconds
+from utils import trade_logger
+from config import merge_config, compile_config, ConfigError
+from connectors.mt5_connector import MT5Connector
+from connectors.order_execution import LATENCY_BOUNDS_MS
+from risk_management.batch_manager import BatchTradeManager
+import MetaTrader5 as mt5
+
+# Defaults for the optional MultiAccount config section
+DEFAULT_START_TIMEOUT_SECONDS = 60.0     # For a terminal to start and log in
+DEFAULT_REPLY_TIMEOUT_SECONDS = 10.0     # For every account to answer one trade request
+# For every account to answer one management request. The scheduler waits for it on the
+# event loop, so it stays short; a later reply is skipped by the next request
+DEFAULT_MANAGE_TIMEOUT_SECONDS = 1.0
+DEFAULT_MAX_FILL_SPREAD_MS = 50.0        # First to last fill of one signal; wider spreads are logged
+
+# The outcome of one signal on one account. queued_ms is dispatch to the worker
+# picking the signal up, execution_ms from there to the fill (or rejection).
+FillReport = namedtuple('FillReport', ['account', 'status', 'retcode', 'order', 'volume', 'price',
+                                       'queued_ms', 'execution_ms', 'filled_at'])
+
+
+def account_name(spec):
+    return str(spec.get("Name", spec["Account"]))
+
+
+def _account_worker(spec, config, conn):
+    """
+    Body of an account's process: connects the account's own terminal (the
+    MetaTrader5 package binds one per process), then serves the requests of
+    the AccountPool until told to stop. Every reply carries the request's
+    sequence number, so the pool can drop the late answer of a timed-out request.
+    """
+    # The bot's order flow, imported in the worker only: the pool itself never trades
+    from main import execute_trade
+
+    name = account_name(spec)
+    connector = MT5Connector(spec["Account"], spec["Password"], spec["Server"], path=spec.get("Path"))
+    if not connector.connect():
+        conn.send((0, ("failed", f"MT5 initialization failed: {mt5.last_error()}")))
+        return
+    symbol = config.Trading.Symbol
+    # Symbol info is cached for an hour: fetched now, the first trade needs no extra round trip
+    connector.get_symbol_info(symbol)
+    trade_manager = BatchTradeManager(connector, config)
+    conn.send((0, ("ready", None)))
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            seq, kind, args = message
+            if kind == "trade":
+                conn.send((seq, _trade(name, connector, config, execute_trade, *args)))
+            elif kind == "manage":
+                with connector.snapshot():
+                    conn.send((seq, trade_manager.run_management(connector.get_open_positions(symbol))))
+            elif kind == "configure":
+                config = args[0]
+                trade_manager.configure(config)
+                conn.send((seq, True))
+    finally:
+        log.info(f"Account {name}: position management stats: {trade_manager.stats()}; "
+                 f"order execution stats: {connector.execution_stats()}")
+        trade_logger.trade_journal.close()
+        connector.disconnect()
+
+
+def _trade(name, connector, config, execute_trade, signal_type, signal_candle, dispatched_at):
+    # perf_counter is system-wide (CLOCK_MONOTONIC, QueryPerformanceCounter), so it is
+    # comparable with the pool's dispatch time and with the other accounts' fills
+    received_at = time.perf_counter()
+    with connector.snapshot():
+        open_positions = connector.get_open_positions(config.Trading.Symbol)
+        if len(open_positions) >= config.Trading.MaxOpenTrades:
+            log.info(f"Account {name}: {len(open_positions)} position(s) open. Signal not taken.")
+            return FillReport(name, "skipped", None, None, 0.0, None,
+                              (received_at - dispatched_at) * 1000.0, 0.0, None)
+        result = execute_trade(signal_type, signal_candle, config=config, connector=connector)
+    done_at = time.perf_counter()
+    filled = result is not None and result.retcode == mt5.TRADE_RETCODE_DONE
+    return FillReport(
+        account=name,
+        status="filled" if filled else "rejected",
+        retcode=result.retcode if result is not None else None,
+        order=result.order if filled else None,
+        volume=result.volume if filled else 0.0,
+        price=result.price if filled else None,
+        queued_ms=(received_at - dispatched_at) * 1000.0,
+        execution_ms=(done_at - received_at) * 1000.0,
+        filled_at=done_at if filled else None,
+    )
+
+
+class AccountPool:
+    """
+    Copies one signal to several trading accounts, each served by its own
+    worker process and terminal.
+
+    The signal is computed once, by the caller; dispatch() pickles it once and
+    writes it to every worker's pipe back to back, so all accounts start on it
+    within microseconds. Each worker then sizes the trade from its own balance
+    (calculate_lot_size, through main.execute_trade) and sends it in parallel
+    with the others. The workers stay connected between signals and keep the
+    symbol info cached, so a dispatch costs each account only its own tick,
+    account, order_check and order_send round trips.
+
+    Every dispatch returns one FillReport per account; latency per account and
+    the spread between the first and last fill are kept in histograms, exported
+    as metrics, and a spread over max_fill_spread_ms is logged.
+    """
+    def __init__(self, accounts, config, reply_timeout=DEFAULT_REPLY_TIMEOUT_SECONDS,
+                 max_fill_spread_ms=DEFAULT_MAX_FILL_SPREAD_MS, manage_timeout=DEFAULT_MANAGE_TIMEOUT_SECONDS):
+        """
+        :param accounts: Account specs (dicts): Account, Password, Server, and
+                         optionally Name, Path (the terminal executable of that
+                         account) and Overrides applied on top of `config`
+                         (e.g. its own RiskManagement.RiskPercentage).
+        :param config: The settings every account starts from.
+        :param manage_timeout: Seconds manage() waits for the accounts; far
+                               below reply_timeout, as it blocks the event loop.
+        :raises ConfigError: When the settings of an account do not validate.
+        """
+        self.specs = {account_name(spec): spec for spec in accounts}
+        self.configs = self._compile(config)
+        self.reply_timeout = reply_timeout
+        self.manage_timeout = manage_timeout
+        self.max_fill_spread_ms = max_fill_spread_ms
+        self.workers = {}   # name -> (process, connection)
+        self.seq = 0
+        self.latency_ms = {name: Histogram(LATENCY_BOUNDS_MS) for name in self.specs}
+        self.spread_ms = Histogram(LATENCY_BOUNDS_MS)
+        self.outcomes = {name: {} for name in self.specs}
+
+    def _compile(self, config):
+        return {name: compile_config(merge_config(config, spec.get("Overrides", {})))
+                for name, spec in self.specs.items()}
+
+    def start(self, timeout=DEFAULT_START_TIMEOUT_SECONDS):
+        """
+        Starts one worker per account and waits for their terminals to log in.
+        Accounts that fail to connect are logged and left out.
+
+        :return: The names of the accounts ready to trade.
+        """
+        context = multiprocessing.get_context("spawn")
+        pending = {}
+        for name, spec in self.specs.items():
+            parent_end, child_end = context.Pipe()
+            process = context.Process(target=_account_worker, args=(spec, self.configs[name], child_end),
+                                      name=f"Account-{name}", daemon=True)
+            process.start()
+            child_end.close()
+            self.workers[name] = (process, parent_end)
+            pending[parent_end] = name
+
+        deadline = time.monotonic() + timeout
+        while pending:
+            ready = wait(list(pending), max(0.0, deadline - time.monotonic()))
+            if not ready:
+                break
+            for conn in ready:
+                name = pending.pop(conn)
+                try:
+                    _, (status, error) = conn.recv()
+                except EOFError:
+                    status, error = "failed", "the worker exited"
+                if status != "ready":
+                    log.error(f"Account {name} not started: {error}")
+                    self._drop(name)
+        for name in pending.values():
+            log.error(f"Account {name} not started within {timeout}s.")
+            self._drop(name)
+        log.info(f"Account pool: {len(self.workers)} of {len(self.specs)} account(s) ready "
+                 f"({', '.join(self.workers) or 'none'}).")
+        return list(self.workers)
+
+    def _drop(self, name):
+        process, conn = self.workers.pop(name)
+        conn.close()
+        if process.is_alive():
+            process.terminate()
+
+    def _request(self, kind, *args, timeout=None):
+        """
+        Sends one request to every worker and waits up to timeout (reply_timeout
+        by default); returns {name: reply}, None for those that did not answer.
+        """
+        timeout = timeout if timeout is not None else self.reply_timeout
+        self.seq += 1
+        seq = self.seq
+        payload = pickle.dumps((seq, kind, args), protocol=pickle.HIGHEST_PROTOCOL)
+        pending = {}
+        for name, (_, conn) in list(self.workers.items()):
+            try:
+                conn.send_bytes(payload)
+                pending[conn] = name
+            except (BrokenPipeError, OSError):
+                log.error(f"Account {name}: worker is gone. Dropping it.")
+                self._drop(name)
+
+        replies = {name: None for name in pending.values()}
+        deadline = time.monotonic() + timeout
+        while pending:
+            ready = wait(list(pending), max(0.0, deadline - time.monotonic()))
+            if not ready:
+                break
+            for conn in ready:
+                name = pending[conn]
+                try:
+                    reply_seq, reply = conn.recv()
+                except EOFError:
+                    log.error(f"Account {name}: worker exited. Dropping it.")
+                    del pending[conn]
+                    self._drop(name)
+                    continue
+                if reply_seq == seq:
+                    replies[name] = reply
+                    del pending[conn]
+        for name in pending.values():
+            log.error(f"Account {name}: no answer to '{kind}' within {timeout}s.")
+        return replies
+
+    def dispatch(self, signal_type, signal_candle):
+        """
+        Executes one signal on every account.
+
+        :param signal_candle: The signal candle, as returned by the strategy.
+        :return: One FillReport per account.
+        """
+        dispatched_at = time.perf_counter()
+        replies = self._request("trade", signal_type, signal_candle, dispatched_at)
+        reports = [reply if reply is not None else
+                   FillReport(name, "no_answer", None, None, 0.0, None, None, None, None)
+                   for name, reply in replies.items()]
+        self._record(reports, dispatched_at)
+        return reports
+
+    def _record(self, reports, dispatched_at):
+        fills = [r.filled_at for r in reports if r.filled_at is not None]
+        for report in reports:
+            outcomes = self.outcomes.setdefault(report.account, {})
+            outcomes[report.status] = outcomes.get(report.status, 0) + 1
+            if report.filled_at is not None:
+                seconds = report.filled_at - dispatched_at
+                self.latency_ms.setdefault(report.account, Histogram(LATENCY_BOUNDS_MS)).observe(seconds * 1000.0)
+                account_fill_seconds.labels(account=report.account).observe(seconds)
+            log.info(f"Account {report.account}: {report.status} "
+                     f"{report.volume} lots @ {report.price} (order {report.order}, retcode {report.retcode}) | "
+                     f"queued {_ms(report.queued_ms)}, execution {_ms(report.execution_ms)}")
+        if len(fills) >= 2:
+            spread = max(fills) - min(fills)
+            self.spread_ms.observe(spread * 1000.0)
+            fill_spread_seconds.observe(spread)
+            if spread * 1000.0 > self.max_fill_spread_ms:
+                log.warning(f"First to last fill took {spread * 1000.0:.1f} ms "
+                            f"(limit {self.max_fill_spread_ms:.0f} ms).")
+            else:
+                log.info(f"{len(fills)} fills within {spread * 1000.0:.1f} ms.")
+
+    def manage(self):
+        """
+        Runs breakeven / trailing stop management on every account at once.
+
+        :return: {account: modifications sent}, None for accounts that did not
+                 answer within manage_timeout (they finish their pass regardless).
+        """
+        return self._request("manage", timeout=self.manage_timeout)
+
+    def configure(self, config):
+        """
+        Rebinds every account to reloaded settings, with its overrides reapplied.
+        All or nothing: if one account's settings do not validate, none change.
+        """
+        try:
+            configs = self._compile(config)
+        except ConfigError as e:
+            log.error(f"Config reload not applied to the accounts: {e}")
+            return False
+        self.configs = configs
+        for name, (_, conn) in list(self.workers.items()):
+            self.seq += 1
+            try:
+                conn.send((self.seq, "configure", (configs[name],)))
+            except (BrokenPipeError, OSError):
+                log.error(f"Account {name}: worker is gone. Dropping it.")
+                self._drop(name)
+        return True
+
+    def stats(self):
+        return {
+            'accounts': {name: {'outcomes': self.outcomes.get(name, {}),
+                                'latency_ms': self.latency_ms[name].summary()}
+                         for name in self.specs},
+            'fill_spread_ms': self.spread_ms.summary(),
+        }
+
+    def shutdown(self, timeout=10.0):
+        """Stops the workers, which disconnect their terminals."""
+        for _, conn in self.workers.values():
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        deadline = time.monotonic() + timeout
+        for name in list(self.workers):
+            process, _ = self.workers[name]
+            process.join(max(0.0, deadline - time.monotonic()))
+            self._drop(name)
+
+
+def _ms(value):
+    return f"{value:.1f} ms" if value is not None else "n/a"
@@ -1,24 +1,117 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 import MetaTrader5 as mt5
 from utils.logger import log
-import pandas as pd
 from config import settings
+from utils.metrics import (instrument, orders_sent, orders_failed, positions_modified,
+                           terminal_cache_hit_ratio, market_data_bars)
+from storage.bar_buffer import BarBuffer, DEFAULT_CAPACITY
+from connectors.order_execution import (OrderExecutor, DEFAULT_DEADLINE_SECONDS, DEFAULT_MAX_ATTEMPTS,
+                                        DEFAULT_RETRY_DELAY_SECONDS)
+
+# Seconds a symbol specification (point, digits, volume limits...) is reused
+SYMBOL_INFO_TTL = 3600.0
+# Newest bars kept in memory per symbol/timeframe by get_market_data
+BAR_BUFFER_CAPACITY = DEFAULT_CAPACITY
+
+_ORDERS_SENT = {
+    mt5.TRADE_ACTION_DEAL: orders_sent.labels(action="deal"),
+    mt5.TRADE_ACTION_SLTP: orders_sent.labels(action="sltp"),
+}
 
 class MT5Connector:
     """
     Handles the connection and data exchange with the MetaTrader 5 terminal.
+
+    Every terminal call is an IPC round trip, so inside a snapshot() block the
+    last tick, account info and open positions are fetched at most once and
+    shared by every caller. Symbol specifications are cached for
+    SYMBOL_INFO_TTL seconds. cache_stats() reports hits, misses and round trips.
     """
-    def __init__(self, account, password, server):
+    def __init__(self, account, password, server, symbol_info_ttl=SYMBOL_INFO_TTL, path=None,
+                 bar_buffer_capacity=BAR_BUFFER_CAPACITY):
+        """
+        :param path: Optional terminal executable (terminal64.exe) to start or
+                     attach to, for machines running one terminal per account.
+        :param bar_buffer_capacity: Bars kept per symbol and timeframe for get_market_data.
+        """
         self.account = account
         self.password = password
         self.server = server
+        self.path = path
         self.connected = False
+        self.symbol_info_ttl = symbol_info_ttl
+        self._symbol_info = {}   # symbol -> (fetched_at, info)
+        self.bar_buffer_capacity = bar_buffer_capacity
+        self._bar_buffers = {}   # (symbol, timeframe) -> BarBuffer
+        self._snapshot = None    # Per-tick cache, only set inside snapshot()
+        self.hits = 0
+        self.misses = 0
+        self.round_trips = 0
+        execution = getattr(settings.Trading, "Execution", None)
+        self.executor = OrderExecutor(
+            self,
+            magic=settings.Trading.MagicNumber,
+            deviation=settings.Trading.Slippage,
+            deadline=getattr(execution, "DeadlineSeconds", DEFAULT_DEADLINE_SECONDS),
+            max_attempts=getattr(execution, "MaxAttempts", DEFAULT_MAX_ATTEMPTS),
+            retry_delay=getattr(execution, "RetryDelaySeconds", DEFAULT_RETRY_DELAY_SECONDS)
+        )
+        terminal_cache_hit_ratio.set_function(lambda: self.cache_stats()['hit_rate'])
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Scope of one bot tick: tick, account and position reads inside it hit
+        the terminal once each. Trade requests drop the account and positions
+        so they are read again after a fill or modification.
+        """
+        self._snapshot = {}
+        try:
+            yield self
+        finally:
+            self._snapshot = None
+
+    def cache_stats(self):
+        """Cache hits, misses and terminal round trips since the connector was created."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'round_trips': self.round_trips,
+        }
+
+    def _cached(self, key, fetch):
+        # Serves key from the per-tick snapshot when one is open
+        if self._snapshot is not None and key in self._snapshot:
+            self.hits += 1
+            return self._snapshot[key]
+        self.misses += 1
+        self.round_trips += 1
+        value = fetch()
+        if self._snapshot is not None and value is not None:
+            self._snapshot[key] = value
+        return value
 
+    def execution_stats(self):
+        """Order counts, requotes, and the latency and slippage histograms of the executor."""
+        return self.executor.stats()
+
+    def _invalidate_trading_state(self):
+        if self._snapshot is not None:
+            for key in [k for k in self._snapshot if k[0] in ('account', 'positions')]:
+                del self._snapshot[key]
+
+    @instrument
     def connect(self):
         """
         Initialize connection to the MetaTrader 5 terminal.
         """
         log.info("Initializing connection to MetaTrader 5...")
-        if not mt5.initialize(login=self.account, password=self.password, server=self.server):
+        terminal = (self.path,) if self.path else ()
+        if not mt5.initialize(*terminal, login=self.account, password=self.password, server=self.server):
             log.error(f"MT5 initialization failed. Error code: {mt5.last_error()}")
             self.connected = False
             return False
@@ -36,35 +129,91 @@ class MT5Connector:
             log.info("MetaTrader 5 connection shut down.")
         self.connected = False
 
+    @instrument
     def get_market_data(self, symbol, timeframe, count):
         """
         Fetch historical candle data.
-        
+
+        The bars are kept in a BarBuffer per symbol and timeframe: once loaded,
+        a call only transfers the bars from the newest stored one on (the
+        forming bar and any new ones). A fetch that does not reach back to the
+        stored bars is widened until it does, which backfills the gap; a full
+        fetch is left for the first call, a larger count, or a terminal whose
+        history no longer lines up.
+
         :param symbol: The financial instrument's symbol (e.g., "XAUUSD").
         :param timeframe: The timeframe for the candles (e.g., mt5.TIMEFRAME_M5).
         :param count: The number of candles to retrieve.
         :return: A pandas DataFrame with the candle data or None on failure.
+                 Its columns are views on the buffer, valid until the next
+                 call for the same symbol and timeframe: copy it to keep it.
         """
         if not self.connected:
             log.error("Not connected to MT5. Cannot fetch market data.")
             return None
             
         try:
-            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+            buffer = self._bar_buffers.get((symbol, timeframe))
+            if buffer is None or count > buffer.capacity:
+                buffer = self._bar_buffers[(symbol, timeframe)] = BarBuffer(max(self.bar_buffer_capacity, count))
+            if count <= buffer.loaded and self._fetch_new_bars(buffer, symbol, timeframe):
+                return buffer.frame(count)
+
+            rates = self._copy_rates(symbol, timeframe, count)
             if rates is None:
-                log.error(f"Failed to get rates for {symbol}. Error: {mt5.last_error()}")
                 return None
-            
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            return df
+            market_data_bars.labels(fetch="full").inc(len(rates))
+            buffer.load(rates, count)
+            return buffer.frame(count)
         except Exception as e:
             log.error(f"An exception occurred while fetching market data: {e}")
             return None
 
+    def _fetch_new_bars(self, buffer, symbol, timeframe):
+        # The stored forming bar and the next one; a wider fetch only after a gap
+        bars = 2
+        while bars < len(buffer):
+            rates = self._copy_rates(symbol, timeframe, bars)
+            if rates is None:
+                return False
+            market_data_bars.labels(fetch="delta").inc(len(rates))
+            added = buffer.merge(rates)
+            if added is not None:
+                if bars > 2:
+                    log.info(f"Backfilled {added} bar(s) of {symbol} missed since the last fetch.")
+                return True
+            if len(rates) < bars:
+                return False
+            bars *= 4
+        return False
+
+    def _copy_rates(self, symbol, timeframe, count):
+        self.round_trips += 1
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        if rates is None:
+            log.error(f"Failed to get rates for {symbol}. Error: {mt5.last_error()}")
+        return rates
+
+    @instrument
+    def get_last_bar_time(self, symbol, timeframe):
+        """
+        Broker-time open (epoch seconds) of the newest, still forming bar,
+        or None on failure. A single one-bar fetch: cheap enough to poll.
+        """
+        if not self.connected:
+            log.error("Not connected to MT5. Cannot fetch the last bar.")
+            return None
+        self.round_trips += 1
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, 1)
+        if rates is None or len(rates) == 0:
+            return None
+        return int(rates['time'][0])
+
+    @instrument
     def place_order(self, symbol, order_type, volume, price, sl, tp, comment=""):
         """
-        Place a new market order.
+        Place a new market order through the execution pipeline (pre-flight
+        check, filling mode from the symbol, requote retries; see OrderExecutor).
         
         :param symbol: Symbol to trade.
         :param order_type: mt5.ORDER_TYPE_BUY or mt5.ORDER_TYPE_SELL.
@@ -72,36 +221,56 @@ class MT5Connector:
         :param price: The execution price.
         :param sl: The stop loss price.
         :param tp: The take profit price.
-        :param comment: A comment for the order.
-        :return: The result of the order request.
+        :param comment: A comment for the order, unique per signal so a retried
+                        order is never opened twice.
+        :return: The result of the order request, or None if none was sent.
         """
         if not self.connected:
             log.error("Not connected to MT5. Cannot place order.")
             return None
-        
-        request = {
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": symbol,
-            "volume": volume,
-            "type": order_type,
-            "price": price,
-            "sl": sl,
-            "tp": tp,
-            "deviation": settings.Trading.Slippage,
-            "magic": settings.Trading.MagicNumber,
-            "comment": comment,
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC, # Or FOK depending on broker
-        }
-        
-        result = mt5.order_send(request)
-        if result.retcode != mt5.TRADE_RETCODE_DONE:
+
+        result = self.executor.execute(symbol, order_type, volume, price, sl, tp, comment)
+        if result is None:
+            orders_failed.inc()
+            log.error("Order failed: nothing was sent.")
+        elif result.retcode != mt5.TRADE_RETCODE_DONE:
+            orders_failed.inc()
             log.error(f"Order failed: {result.comment} (retcode: {result.retcode})")
         else:
             log.info(f"Order placed successfully: {result.comment}")
-            
         return result
 
+    @instrument
+    def check_order(self, request):
+        """
+        Validates a trade request with order_check without sending it.
+
+        :return: The check result, or None if the terminal gave no answer.
+        """
+        self.round_trips += 1
+        result = mt5.order_check(request)
+        if result is None:
+            log.error(f"order_check returned nothing. Error: {mt5.last_error()}")
+        return result
+
+    @instrument
+    def send_order(self, request):
+        """
+        Sends a raw trade request. Account and positions are read again afterwards.
+
+        :return: The order_send result, or None if the terminal gave no answer.
+        """
+        self.round_trips += 1
+        _ORDERS_SENT[request["action"]].inc()
+        try:
+            result = mt5.order_send(request)
+        finally:
+            self._invalidate_trading_state()
+        if result is None:
+            log.error(f"order_send returned nothing. Error: {mt5.last_error()}")
+        return result
+
+    @instrument
     def get_account_info(self):
         """
         Retrieves account information like balance and equity.
@@ -109,17 +278,29 @@ class MT5Connector:
         if not self.connected:
             log.error("Not connected to MT5. Cannot get account info.")
             return None
-        return mt5.account_info()
+        return self._cached(('account',), mt5.account_info)
 
+    @instrument
     def get_symbol_info(self, symbol):
         """
-        Retrieves symbol properties.
+        Retrieves symbol properties, cached for symbol_info_ttl seconds.
         """
         if not self.connected:
             log.error(f"Not connected to MT5. Cannot get info for {symbol}.")
             return None
-        return mt5.symbol_info(symbol)
+        cached = self._symbol_info.get(symbol)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.symbol_info_ttl:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        self.round_trips += 1
+        info = mt5.symbol_info(symbol)
+        if info is not None:
+            self._symbol_info[symbol] = (now, info)
+        return info
         
+    @instrument
     def get_last_tick(self, symbol):
         """
         Retrieves the latest tick data (bid/ask prices).
@@ -127,8 +308,15 @@ class MT5Connector:
         if not self.connected:
             log.error(f"Not connected to MT5. Cannot get last tick for {symbol}.")
             return None
-        return mt5.symbol_info_tick(symbol)
+        return self._cached(('tick', symbol), lambda: mt5.symbol_info_tick(symbol))
 
+    def get_fresh_tick(self, symbol):
+        """The latest tick straight from the terminal, replacing the snapshot's copy."""
+        if self._snapshot is not None:
+            self._snapshot.pop(('tick', symbol), None)
+        return self.get_last_tick(symbol)
+
+    @instrument
     def get_open_positions(self, symbol=None):
         """
         Retrieves all open positions, optionally filtered by symbol.
@@ -137,13 +325,55 @@ class MT5Connector:
             log.error("Not connected to MT5. Cannot get open positions.")
             return []
             
-        positions = mt5.positions_get(symbol=symbol)
+        positions = self._cached(('positions', symbol),
+                                 lambda: mt5.positions_get(symbol=symbol) if symbol else mt5.positions_get())
         if positions is None:
             return []
         
         # Return as a list of position objects
         return list(positions)
 
+    @instrument
+    def get_deals(self, since, until):
+        """
+        Retrieves the account's deal history (fills of every order, closes included).
+
+        :param since: Inclusive start, epoch seconds.
+        :param until: Exclusive end, epoch seconds.
+        :return: A list of deals, or None on failure.
+        """
+        if not self.connected:
+            log.error("Not connected to MT5. Cannot get the deal history.")
+            return None
+        self.round_trips += 1
+        deals = mt5.history_deals_get(datetime.fromtimestamp(since, tz=timezone.utc),
+                                      datetime.fromtimestamp(until, tz=timezone.utc))
+        if deals is None:
+            log.error(f"Failed to get the deal history. Error: {mt5.last_error()}")
+            return None
+        return list(deals)
+
+    @instrument
+    def get_history_orders(self, since, until):
+        """
+        Retrieves the account's order history (filled, canceled and rejected orders).
+
+        :param since: Inclusive start, epoch seconds.
+        :param until: Exclusive end, epoch seconds.
+        :return: A list of orders, or None on failure.
+        """
+        if not self.connected:
+            log.error("Not connected to MT5. Cannot get the order history.")
+            return None
+        self.round_trips += 1
+        orders = mt5.history_orders_get(datetime.fromtimestamp(since, tz=timezone.utc),
+                                        datetime.fromtimestamp(until, tz=timezone.utc))
+        if orders is None:
+            log.error(f"Failed to get the order history. Error: {mt5.last_error()}")
+            return None
+        return list(orders)
+
+    @instrument
     def modify_position(self, ticket, sl, tp):
         """
         Modifies the stop loss and take profit of an open position.
@@ -165,10 +395,13 @@ class MT5Connector:
             "magic": settings.Trading.MagicNumber,
         }
         
-        result = mt5.order_send(request)
-        if result.retcode != mt5.TRADE_RETCODE_DONE:
+        result = self.send_order(request)
+        if result is None:
+            log.error(f"Failed to modify position {ticket}: no answer from the terminal.")
+        elif result.retcode != mt5.TRADE_RETCODE_DONE:
             log.error(f"Failed to modify position {ticket}: {result.comment} (retcode: {result.retcode})")
         else:
+            positions_modified.inc()
             log.info(f"Position {ticket} modified successfully.")
             
         return result
@@ -0,0 +1,222 @@
+import math
+import time
+from types import SimpleNamespace
+import MetaTrader5 as mt5
+from utils.logger import log
+from utils.histogram import Histogram
+
+# Defaults for the optional Trading.Execution config section
+DEFAULT_DEADLINE_SECONDS = 2.0
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY_SECONDS = 0.05
+
+# Rejections that only mean the price moved: re-price and send again
+REPRICE_RETCODES = {
+    mt5.TRADE_RETCODE_REQUOTE,
+    mt5.TRADE_RETCODE_PRICE_CHANGED,
+    mt5.TRADE_RETCODE_PRICE_OFF,
+}
+# order_check reports success as 0 (some builds use DONE)
+_CHECK_OK = {0, mt5.TRADE_RETCODE_DONE}
+# History orders that did execute
+_FILLED_STATES = {mt5.ORDER_STATE_PARTIAL, mt5.ORDER_STATE_FILLED}
+
+# How far back the history is searched for an order already sent; history times are
+# broker server time, hours off UTC, so the read is widened by a day on both sides
+HISTORY_LOOKBACK_SECONDS = 3600
+SERVER_TIME_SLACK_SECONDS = 86400
+
+# Histogram buckets: order_send round trip in ms, slippage in points (positive = against us)
+LATENCY_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+SLIPPAGE_BOUNDS_POINTS = (-100, -50, -20, -10, -5, -2, 0, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def filling_mode(symbol_info):
+    """
+    Filling policy allowed by the symbol (its filling_mode flags): IOC when
+    offered, else FOK, else RETURN (exchange execution).
+    """
+    flags = getattr(symbol_info, "filling_mode", 0)
+    if flags & mt5.SYMBOL_FILLING_IOC:
+        return mt5.ORDER_FILLING_IOC
+    if flags & mt5.SYMBOL_FILLING_FOK:
+        return mt5.ORDER_FILLING_FOK
+    return mt5.ORDER_FILLING_RETURN
+
+
+def normalize_volume(volume, symbol_info):
+    """Volume rounded down to the symbol's step and capped at its maximum; 0 below the minimum."""
+    step = symbol_info.volume_step or 0.01
+    volume = min(math.floor(volume / step + 1e-9) * step, symbol_info.volume_max)
+    return round(volume, 8) if volume >= symbol_info.volume_min else 0.0
+
+
+class OrderExecutor:
+    """
+    Sends market orders through an MT5Connector:
+
+    1. Idempotency: an open position, a recent entry deal or a filled history
+       order with the same magic number and comment means the order already
+       went through (e.g. its result was lost in a terminal hiccup, and the
+       position may even have closed since), so it is returned instead of
+       opening a second one.
+    2. Pre-flight: volume normalized to the symbol, the filling mode taken
+       from the symbol info, and the request validated with order_check.
+    3. Send: requotes and price changes are re-priced from a fresh tick and
+       sent again until the deadline or max_attempts is reached.
+
+    Every order_send round trip is recorded in a latency histogram and every
+    fill in a slippage histogram against the price first requested.
+    """
+    def __init__(self, connector, magic, deviation, deadline=DEFAULT_DEADLINE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, retry_delay=DEFAULT_RETRY_DELAY_SECONDS):
+        """
+        :param magic: Magic number of the bot's orders.
+        :param deviation: Accepted distance from the requested price, in points.
+        :param deadline: Seconds after which a requoted order is given up.
+        """
+        self.connector = connector
+        self.magic = magic
+        self.deviation = deviation
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.latency_ms = Histogram(LATENCY_BOUNDS_MS)
+        self.slippage_points = Histogram(SLIPPAGE_BOUNDS_POINTS)
+        self.orders = 0
+        self.requotes = 0
+        self.rejected = 0
+        self.duplicates = 0
+
+    def stats(self):
+        return {
+            'orders': self.orders,
+            'requotes': self.requotes,
+            'rejected': self.rejected,
+            'duplicates': self.duplicates,
+            'latency_ms': self.latency_ms.summary(),
+            'slippage_points': self.slippage_points.summary(),
+        }
+
+    def execute(self, symbol, order_type, volume, price, sl, tp, comment=""):
+        """
+        :param price: The price the signal was priced at; slippage is measured against it.
+        :param comment: Identifies the order for the idempotency check, so it
+                        should be unique per signal (e.g. include the candle time).
+        :return: The final order_send result, a stand-in result for an order
+                 found already open, or None if nothing was sent.
+        """
+        existing = self._find_existing(symbol, comment)
+        if existing is not None:
+            self.duplicates += 1
+            log.warning(f"Order '{comment}' on {symbol} was already sent (position {existing.order}). "
+                        f"Not sending it again.")
+            return existing
+
+        symbol_info = self.connector.get_symbol_info(symbol)
+        if symbol_info is None:
+            log.error(f"No symbol info for {symbol}. Order not sent.")
+            return None
+        volume = normalize_volume(volume, symbol_info)
+        if volume <= 0:
+            log.error(f"Volume below the {symbol} minimum of {symbol_info.volume_min}. Order not sent.")
+            return None
+
+        request = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": symbol,
+            "volume": volume,
+            "type": order_type,
+            "price": price,
+            "sl": sl,
+            "tp": tp,
+            "deviation": self.deviation,
+            "magic": self.magic,
+            "comment": comment,
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": filling_mode(symbol_info),
+        }
+        check = self.connector.check_order(request)
+        if check is None or check.retcode not in _CHECK_OK:
+            self.rejected += 1
+            reason = f"{check.comment} (retcode: {check.retcode})" if check is not None else "no answer"
+            log.error(f"Order pre-flight check failed: {reason}")
+            return check
+
+        self.orders += 1
+        give_up_at = time.monotonic() + self.deadline
+        result = None
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.perf_counter()
+            result = self.connector.send_order(request)
+            self.latency_ms.observe((time.perf_counter() - started) * 1000.0)
+
+            if result is None:
+                # The request may still have been executed: look before resending
+                existing = self._find_existing(symbol, comment)
+                if existing is not None:
+                    return existing
+            elif result.retcode == mt5.TRADE_RETCODE_DONE:
+                self._record_slippage(order_type, price, result.price, symbol_info.point)
+                return result
+            elif result.retcode not in REPRICE_RETCODES:
+                self.rejected += 1
+                return result
+            else:
+                self.requotes += 1
+
+            if attempt == self.max_attempts or time.monotonic() + self.retry_delay > give_up_at:
+                break
+            time.sleep(self.retry_delay)
+            tick = self.connector.get_fresh_tick(symbol)
+            if tick is not None:
+                fresh = tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
+                request["price"] = round(fresh, symbol_info.digits)
+            log.info(f"Order '{comment}' {'got no answer' if result is None else 'requoted'}; "
+                     f"retrying at {request['price']} (attempt {attempt + 1}).")
+
+        self.rejected += 1
+        log.error(f"Order '{comment}' on {symbol} not filled within {self.deadline}s / {attempt} attempt(s).")
+        return result
+
+    def _find_existing(self, symbol, comment):
+        """
+        The order with this magic number and comment if it was already sent:
+        its open position, else its entry deal or filled order in the recent
+        history, as an order_send-like result. None if it was not.
+        """
+        if not comment:
+            return None
+        for pos in self.connector.get_open_positions(symbol):
+            if pos.magic == self.magic and pos.comment == comment:
+                return _existing_result(pos.ticket, pos.volume, pos.price_open, self.magic, comment)
+
+        now = time.time()
+        since = now - HISTORY_LOOKBACK_SECONDS - SERVER_TIME_SLACK_SECONDS
+        until = now + SERVER_TIME_SLACK_SECONDS
+        for deal in self.connector.get_deals(since, until) or ():
+            if deal.entry == mt5.DEAL_ENTRY_IN and self._same_order(deal, symbol, comment):
+                return _existing_result(deal.position_id, deal.volume, deal.price, self.magic, comment)
+        for order in self.connector.get_history_orders(since, until) or ():
+            if order.state in _FILLED_STATES and self._same_order(order, symbol, comment):
+                return _existing_result(order.position_id, order.volume_initial - order.volume_current,
+                                        order.price_current, self.magic, comment)
+        return None
+
+    def _same_order(self, record, symbol, comment):
+        return record.symbol == symbol and record.magic == self.magic and record.comment == comment
+
+    def _record_slippage(self, order_type, requested, filled, point):
+        if not filled or not point:
+            return
+        slippage = (filled - requested) if order_type == mt5.ORDER_TYPE_BUY else (requested - filled)
+        self.slippage_points.observe(slippage / point)
+
+
+def _existing_result(position_ticket, volume, price, magic, comment):
+    # Shaped like an order_send result so callers need no special case
+    return SimpleNamespace(
+        retcode=mt5.TRADE_RETCODE_DONE, order=position_ticket, volume=volume,
+        price=price, comment="Already sent",
+        request=SimpleNamespace(magic=magic, comment=comment)
+    )
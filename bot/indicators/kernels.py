@@ -0,0 +1,226 @@
+import argparse
+import math
+import sys
+import numpy as np
+
+# Largest factor a block of the linear recurrence may grow its terms by before rescaling
+_MAX_BLOCK_GROWTH = 1e150
+_MAX_BLOCK_ROWS = 512
+
+
+def _as_array(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _recurrence(values, decay, gain=1.0, initial=0.0):
+    """
+    y[t] = decay * y[t - 1] + gain * values[t] with y[-1] = initial, without a
+    Python loop per element.
+
+    The series is cut into blocks short enough that decay ** -rows stays finite;
+    inside a block the recurrence is a scaled cumulative sum, and only the state
+    carried from one block to the next is computed in Python.
+    """
+    values = _as_array(values)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    if decay == 0.0:
+        return gain * values
+    rows = int(min(_MAX_BLOCK_ROWS, max(1, math.log(_MAX_BLOCK_GROWTH) / -math.log(decay))))
+    blocks = -(-n // rows)
+    padded = np.zeros(blocks * rows)
+    padded[:n] = values
+    padded = padded.reshape(blocks, rows)
+
+    powers = decay ** np.arange(rows)
+    # Each block as if it started from a zero state
+    local = np.cumsum(padded / powers, axis=1) * (powers * gain)
+
+    carries = np.empty(blocks)
+    carry = initial
+    block_decay = decay ** rows
+    for b in range(blocks):
+        carries[b] = carry
+        carry = carry * block_decay + local[b, -1]
+    return (local + carries[:, None] * (powers * decay)).ravel()[:n]
+
+
+def ema(values, span):
+    """
+    Exponential moving average as pandas' ewm(span=span, adjust=False).mean():
+    seeded with the first value, then alpha = 2 / (span + 1).
+    """
+    values = _as_array(values)
+    if len(values) == 0:
+        return values.copy()
+    alpha = 2.0 / (span + 1.0)
+    return _recurrence(values, 1.0 - alpha, alpha, values[0])
+
+
+def rma(values, length):
+    """
+    Wilder's moving average as pandas_ta's rma(): ewm(alpha=1/length,
+    adjust=True, min_periods=length). NaN inputs add no weight but still decay
+    the earlier ones; bars with fewer than `length` valid values are NaN.
+    """
+    values = _as_array(values)
+    decay = 1.0 - 1.0 / length
+    valid = ~np.isnan(values)
+    weighted = _recurrence(np.where(valid, values, 0.0), decay)
+    weights = _recurrence(valid.astype(np.float64), decay)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = weighted / weights
+    out[np.cumsum(valid) < length] = np.nan
+    return out
+
+
+def sma(values, length):
+    """Simple moving average of the last `length` values; NaN before that."""
+    values = _as_array(values)
+    out = np.full(len(values), np.nan)
+    if len(values) >= length:
+        # Summed per window rather than by a running total, so flat windows are exactly 0
+        out[length - 1:] = np.lib.stride_tricks.sliding_window_view(values, length).sum(axis=1) / length
+    return out
+
+
+def rsi(close, length=14, wilder=True):
+    """
+    Relative Strength Index.
+
+    :param wilder: True for Wilder's smoothing of the gains and losses, as
+                   pandas_ta's rsi(); False for their simple average over
+                   `length` bars, with the first bar counting as no change
+                   (what XauUsdM5Strategy has always used).
+    """
+    close = _as_array(close)
+    delta = np.empty(len(close))
+    if len(close):
+        delta[0] = np.nan if wilder else 0.0
+        np.subtract(close[1:], close[:-1], out=delta[1:])
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    if wilder:
+        if len(close):
+            gains[0] = losses[0] = np.nan
+        average_gain, average_loss = rma(gains, length), rma(losses, length)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100.0 * average_gain / (average_gain + average_loss)
+    average_gain, average_loss = sma(gains, length), sma(losses, length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 - 100.0 / (1.0 + average_gain / average_loss)
+
+
+def true_range(high, low, close):
+    """
+    True range as pandas_ta's true_range(): NaN on the first bar, and the
+    high-low range nudged by machine epsilon when any bar has none.
+    """
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    span = high - low
+    if (span == 0).any():
+        span += sys.float_info.epsilon
+    prev_close = np.empty(len(close))
+    if len(close):
+        prev_close[0] = np.nan
+        prev_close[1:] = close[:-1]
+    with np.errstate(invalid='ignore'):
+        out = np.fmax(span, np.fmax(np.abs(high - prev_close), np.abs(prev_close - low)))
+    if len(out):
+        out[0] = np.nan
+    return out
+
+
+def atr(high, low, close, length=14):
+    """Average true range, the Wilder RMA of true_range(), as pandas_ta's atr()."""
+    return rma(true_range(high, low, close), length)
+
+
+def adx(high, low, close, length=14):
+    """
+    ADX with the +DI and -DI it is built from, as pandas_ta's adx(): +DM and
+    -DM smoothed by rma() and scaled by atr(), then the rma() of DX.
+
+    :return: (adx, plus_di, minus_di), the ADX_n, DMP_n and DMN_n columns of
+             pandas_ta; all NaN when there are fewer than `length` bars.
+    """
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    n = len(close)
+    if n < length:
+        return np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+    up = np.full(n, np.nan)
+    down = np.full(n, np.nan)
+    up[1:] = high[1:] - high[:-1]
+    down[1:] = low[:-1] - low[1:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+        minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+        # pandas_ta multiplies the masks by the NaN of the first bar and zeroes values under epsilon
+        plus_dm[0] = minus_dm[0] = np.nan
+        plus_dm[np.abs(plus_dm) < sys.float_info.epsilon] = 0.0
+        minus_dm[np.abs(minus_dm) < sys.float_info.epsilon] = 0.0
+
+        scale = 100.0 / atr(high, low, close, length)
+        plus_di = scale * rma(plus_dm, length)
+        minus_di = scale * rma(minus_dm, length)
+        dx = 100.0 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return rma(dx, length), plus_di, minus_di
+
+
+def compare_with_pandas_ta(df, length=14, rsi_length=14, span=20):
+    """
+    Runs the kernels and pandas_ta on the same bars.
+
+    :return: Indicator name -> largest absolute difference, NaN placement
+             included (inf when the two disagree on which bars are NaN).
+    """
+    import pandas as pd
+    import pandas_ta as ta
+
+    high, low, close = df['high'], df['low'], df['close']
+    adx_value, plus_di, minus_di = adx(high, low, close, length)
+    reference = ta.adx(high, low, close, length=length)
+    pairs = {
+        'ema': (ema(close, span), close.ewm(span=span, adjust=False).mean()),
+        'rma': (rma(close, length), ta.rma(close, length=length)),
+        'rsi': (rsi(close, rsi_length), ta.rsi(close, length=rsi_length)),
+        'atr': (atr(high, low, close, length), ta.atr(high, low, close, length=length, talib=False)),
+        f'ADX_{length}': (adx_value, reference[f'ADX_{length}']),
+        f'DMP_{length}': (plus_di, reference[f'DMP_{length}']),
+        f'DMN_{length}': (minus_di, reference[f'DMN_{length}']),
+    }
+    differences = {}
+    for name, (ours, theirs) in pairs.items():
+        theirs = pd.Series(theirs).to_numpy(dtype=np.float64)
+        if not np.array_equal(np.isnan(ours), np.isnan(theirs)):
+            differences[name] = float('inf')
+            continue
+        both = ~np.isnan(ours)
+        differences[name] = float(np.max(np.abs(ours[both] - theirs[both]), initial=0.0))
+    return differences
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the NumPy indicator kernels against pandas_ta.")
+    parser.add_argument("--csv", help="Bars with time in epoch seconds (default: synthetic bars).")
+    parser.add_argument("--bars", type=int, default=50_000, help="Synthetic bars when no --csv is given.")
+    parser.add_argument("--length", type=int, default=14, help="ATR / ADX length.")
+    parser.add_argument("--rsi-length", type=int, default=14)
+    parser.add_argument("--tolerance", type=float, default=1e-8, help="Largest accepted absolute difference.")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from utils.logger import log
+    if args.csv:
+        bars = pd.read_csv(args.csv)
+    else:
+        from benchmarks.synthetic_data import generate_bars
+        bars = generate_bars(args.bars)
+
+    failed = False
+    for name, difference in compare_with_pandas_ta(bars, args.length, args.rsi_length).items():
+        ok = difference <= args.tolerance
+        failed |= not ok
+        log.info(f"{name:8s} max abs difference {difference:.3e} {'OK' if ok else 'MISMATCH'}")
+    sys.exit(1 if failed else 0)
@@ -1,21 +1,35 @@
-import schedule
+import asyncio
 import time
 import sys
 from utils.logger import log
 from utils.trade_logger import log_trade_event
-from config import settings
+from config import settings, compile_config, ConfigError
 from connectors.mt5_connector import MT5Connector
 from strategies.xauusd_m5_strategy import XauUsdM5Strategy
-from risk_management.position_sizer import calculate_lot_size
-from risk_management.trade_manager import TradeManager
+from risk_management.position_sizer import calculate_lot_size, calculate_trade_levels
+from risk_management.batch_manager import BatchTradeManager
+from utils.bar_scheduler import BarCloseScheduler, TIMEFRAME_SECONDS
+from utils.metrics import cycle_seconds, start_from_config as start_metrics
+from utils import profiling
+from utils.config_watcher import watcher_from_config
+from utils.trade_analytics import tracker_from_config
 import MetaTrader5 as mt5
-# Import other necessary modules like TradeManager, position_sizer etc.
+import pandas as pd
 
 # --- Global variables ---
 # We define these globally so they can be initialized once in main()
-# and used in the trading_bot_tick() function without passing them around.
+# and used in the entry and management cycles without passing them around.
 mt5_connector: MT5Connector = None
 strategy: XauUsdM5Strategy = None
+trade_manager: BatchTradeManager = None
+scheduler: BarCloseScheduler = None
+# The compiled settings the strategy and trade manager are bound to, and the
+# watcher that prepares a new snapshot when config.json changes
+active_settings = None
+config_watcher = None
+# Closed-trade statistics, fed by the journal and the broker's deal history
+performance = None
+STRATEGY_NAME = "XAUUSD_M5_EMA_RSI"
 timeframe_map = {
     "M5": mt5.TIMEFRAME_M5,
     "M15": mt5.TIMEFRAME_M15,
@@ -23,68 +37,80 @@ timeframe_map = {
     # Add other timeframes as needed
 }
 
-def execute_trade(signal_type, signal_candle):
+def execute_trade(signal_type, signal_candle, config=None, connector=None, max_lot_size=None):
     """
     Handles the entire process of executing a trade.
+
+    :param config: Settings of the traded instrument; the global settings by default.
+    :param connector: The MT5Connector to trade through; the global one by default.
+    :param max_lot_size: Optional cap on the volume, e.g. what is left under a
+                         portfolio exposure limit.
+    :return: The order_send result, or None if no order was sent.
     """
+    config = config or active_settings or settings
+    connector = connector or mt5_connector
     log.info(f"--- Executing {signal_type} Trade ---")
     
     # 1. Log the entry signal reason
     log_trade_event({
-        "symbol": settings.Trading.Symbol,
-        "strategy_name": "XAUUSD_M5_EMA_RSI",
+        "symbol": config.Trading.Symbol,
+        "strategy_name": STRATEGY_NAME,
         "event_type": "SIGNAL_DETECTED",
         "direction": signal_type,
         "reason_message": f"Signal candle at {signal_candle.name} triggered the entry."
     })
 
     # 2. Get required info
-    symbol_info = mt5_connector.get_symbol_info(settings.Trading.Symbol)
-    account_info = mt5_connector.get_account_info()
-    last_tick = mt5_connector.get_last_tick(settings.Trading.Symbol)
+    symbol_info = connector.get_symbol_info(config.Trading.Symbol)
+    account_info = connector.get_account_info()
+    last_tick = connector.get_last_tick(config.Trading.Symbol)
     
     if not all([symbol_info, account_info, last_tick]):
         log.error("Could not retrieve all necessary info for trade execution. Aborting.")
-        return
+        return None
 
     point = symbol_info.point
-    pip_value = settings.RiskManagement.PipDecimalValue
+    pip_value = config.RiskManagement.PipDecimalValue
 
     # 3. Define SL and TP prices
-    if signal_type == "BUY":
-        sl_price = signal_candle['low'] - (settings.RiskManagement.StopLossBufferPips * 10 * point)
-        stop_loss_pips = (last_tick.ask - sl_price) / pip_value
-        tp_price = last_tick.ask + (stop_loss_pips * settings.RiskManagement.RiskRewardRatio * pip_value)
-        entry_price = last_tick.ask
-        order_type = mt5.ORDER_TYPE_BUY
-    else: # SELL
-        sl_price = signal_candle['high'] + (settings.RiskManagement.StopLossBufferPips * 10 * point)
-        stop_loss_pips = (sl_price - last_tick.bid) / pip_value
-        tp_price = last_tick.bid - (stop_loss_pips * settings.RiskManagement.RiskRewardRatio * pip_value)
-        entry_price = last_tick.bid
-        order_type = mt5.ORDER_TYPE_SELL
+    entry_price, sl_price, tp_price, stop_loss_pips = calculate_trade_levels(
+        signal_type=signal_type,
+        signal_candle=signal_candle,
+        bid=last_tick.bid,
+        ask=last_tick.ask,
+        point=point,
+        pip_value=pip_value,
+        stop_loss_buffer_pips=config.RiskManagement.StopLossBufferPips,
+        risk_reward_ratio=config.RiskManagement.RiskRewardRatio
+    )
+    order_type = mt5.ORDER_TYPE_BUY if signal_type == "BUY" else mt5.ORDER_TYPE_SELL
 
     # 4. Calculate Lot Size
     lot_size = calculate_lot_size(
         account_balance=account_info.balance,
-        risk_percentage=settings.RiskManagement.RiskPercentage,
+        risk_percentage=config.RiskManagement.RiskPercentage,
         stop_loss_pips=stop_loss_pips,
-        pip_value_per_lot=settings.RiskManagement.PipValuePerLot
+        pip_value_per_lot=config.RiskManagement.PipValuePerLot
     )
 
+    if max_lot_size is not None and lot_size > max_lot_size:
+        log.info(f"Lot size {lot_size} capped to {max_lot_size:.2f} by the exposure limit.")
+        lot_size = int(max_lot_size * 100 + 1e-9) / 100.0 # Round down to the lot step
+
     if lot_size <= 0:
         log.warning(f"Calculated lot size is {lot_size}. Aborting trade.")
-        return
+        return None
 
     # 5. Place Order
-    trade_result = mt5_connector.place_order(
-        symbol=settings.Trading.Symbol,
+    trade_result = connector.place_order(
+        symbol=config.Trading.Symbol,
         order_type=order_type,
         volume=lot_size,
         price=entry_price,
         sl=sl_price,
         tp=tp_price,
-        comment=f"{signal_type} by Python Bot"
+        # Unique per signal candle, so a retried order can be recognized once open
+        comment=f"{signal_type} by Python Bot {int(pd.Timestamp(signal_candle['time']).timestamp())}"
     )
 
     # 6. Log the execution result
@@ -92,11 +118,11 @@ def execute_trade(signal_type, signal_candle):
         log_trade_event({
             "trade_id": trade_result.order,
             "magic_number": trade_result.request.magic,
-            "symbol": settings.Trading.Symbol,
-            "strategy_name": "XAUUSD_M5_EMA_RSI",
+            "symbol": config.Trading.Symbol,
+            "strategy_name": STRATEGY_NAME,
             "event_type": "ORDER_PLACED",
             "direction": signal_type,
-            "lot_size": lot_size,
+            "lot_size": trade_result.volume,
             "entry_price": trade_result.price,
             "initial_sl": sl_price,
             "initial_tp": tp_price,
@@ -104,33 +130,65 @@ def execute_trade(signal_type, signal_candle):
         })
     else:
         log_trade_event({
-            "symbol": settings.Trading.Symbol,
-            "strategy_name": "XAUUSD_M5_EMA_RSI",
+            "symbol": config.Trading.Symbol,
+            "strategy_name": STRATEGY_NAME,
             "event_type": "ORDER_FAILED",
             "direction": signal_type,
             "reason_message": f"Failed to place order. Retcode: {trade_result.retcode if trade_result else 'N/A'}"
         })
+    return trade_result
 
-def trading_bot_tick():
+def apply_config_reload():
     """
-    This function is executed at each scheduled interval.
+    Rebinds the strategy and the trade manager to the settings snapshot the
+    config watcher prepared, if any. Called at a bar boundary, on the trading
+    thread, so no cycle runs with a mix of old and new settings.
     """
-    log.info("="*50)
-    log.info("Bot tick executing...")
-    
-    open_positions = mt5_connector.get_open_positions(settings.Trading.Symbol)
-    
-    if len(open_positions) >= settings.Trading.MaxOpenTrades:
-        log.info(f"Found {len(open_positions)} open position(s). Managing them...")
-        for pos in open_positions:
-          manager = TradeManager(mt5_connector, pos)
-          manager.run_management()
-    else:
-        # If NO: Go to Entry Logic
-        log.info("No open trades. Checking for new entry signals...")
+    global active_settings
+    snapshot = config_watcher.take() if config_watcher is not None else None
+    if snapshot is None:
+        return
+    active_settings = snapshot
+    strategy.configure(snapshot)
+    trade_manager.configure(snapshot)
+
+@profiling.tick
+def run_entry_cycle(bar_time=None):
+    """
+    Checks for a new entry on the bar that just closed, unless the maximum
+    number of trades is already open.
+
+    :return: The time.time() at which an order was sent, or None.
+    """
+    apply_config_reload()
+    config = active_settings or settings
+    # One broker snapshot per cycle: tick, account and positions are read from the terminal once
+    with cycle_seconds.labels(cycle="entry").time(), mt5_connector.snapshot():
+        open_positions = mt5_connector.get_open_positions(config.Trading.Symbol)
+        if len(open_positions) >= config.Trading.MaxOpenTrades:
+            log.info(f"Found {len(open_positions)} open position(s). Skipping entry check.")
+            # The bars are still fetched, so the indicators follow them and need no reseed once the trade closes
+            strategy.sync_market_data()
+            return None
+
+        log.info("Checking for new entry signals...")
         signal_type, signal_candle = strategy.check_for_entry()
         if signal_type and not signal_candle.empty:
-            execute_trade(signal_type, signal_candle)
+            if execute_trade(signal_type, signal_candle) is not None:
+                return time.time()
+    return None
+
+@profiling.tick
+def run_management_cycle():
+    """
+    Runs breakeven and trailing stop management on every open position.
+    """
+    config = active_settings or settings
+    with cycle_seconds.labels(cycle="management").time(), mt5_connector.snapshot():
+        trade_manager.run_management(mt5_connector.get_open_positions(config.Trading.Symbol))
+    if performance is not None:
+        # Deal times are broker time; the scheduler knows the broker's offset from UTC
+        performance.maybe_sync(mt5_connector, scheduler.clock_offset)
 
 def main():
     """
@@ -142,7 +200,12 @@ def main():
     if not settings:
         sys.exit(1)
 
-    global mt5_connector, strategy
+    global mt5_connector, strategy, trade_manager, scheduler, active_settings, config_watcher, performance
+    try:
+        active_settings = compile_config(settings)
+    except ConfigError as e:
+        log.error(f"FATAL: {e}")
+        sys.exit(1)
     
     mt5_connector = MT5Connector(
         account=settings.Broker.Account,
@@ -153,29 +216,50 @@ def main():
     if not mt5_connector.connect():
         log.error("Failed to connect to MT5. Exiting application.")
         return # Exit if connection fails
+    metrics_server = start_metrics(settings)
+    profiling.install_from_config(settings)
 
     # Initialize the strategy, passing the correct timeframe enum
-    strategy = XauUsdM5Strategy(mt5_connector)
+    strategy = XauUsdM5Strategy(mt5_connector, active_settings)
     strategy.timeframe = timeframe_map.get(settings.Trading.Timeframe, mt5.TIMEFRAME_M5)
     strategy.symbol = settings.Trading.Symbol
+    trade_manager = BatchTradeManager(mt5_connector, active_settings)
+    config_watcher = watcher_from_config(active_settings)
+    performance = tracker_from_config(active_settings, STRATEGY_NAME)
     
     # --- Scheduling ---
-    log.info(f"Scheduling bot tick for every 5 minutes on the clock (e.g., xx:00, xx:05, xx:10)...")
-    # This is a more robust way to schedule for every 5th minute of the hour.
-    # We schedule a separate job for each 5-minute mark.
-    for minute in ["00", "05", "10", "15", "20", "25", "30", "35", "40", "45", "50", "55"]:
-        schedule.every().hour.at(f"{minute}:01").do(trading_bot_tick)
+    # Entries run the moment the broker opens a new bar; management has its own cadence
+    scheduler = BarCloseScheduler(
+        connector=mt5_connector,
+        symbol=settings.Trading.Symbol,
+        timeframe=strategy.timeframe,
+        timeframe_seconds=TIMEFRAME_SECONDS.get(settings.Trading.Timeframe, 300),
+        on_bar_close=run_entry_cycle,
+        on_manage=run_management_cycle,
+        management_interval=getattr(settings.Trading, "ManagementIntervalSeconds", 5)
+    )
 
     try:
-        # The first run will be handled by the scheduler at the next appropriate time.
-        log.info("Bot is running. Waiting for the next scheduled tick...")
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        log.info("Bot is running. Waiting for the next bar close...")
+        asyncio.run(scheduler.run())
     except KeyboardInterrupt:
         log.info("Bot stopped by user.")
     finally:
         # Ensure disconnection on exit
+        log.info(f"Terminal cache stats: {mt5_connector.cache_stats()}")
+        log.info(f"Order execution stats: {mt5_connector.execution_stats()}")
+        log.info(f"Entry latency: {scheduler.latency_summary()}")
+        log.info(f"Position management stats: {trade_manager.stats()}")
+        if performance is not None:
+            performance.sync(mt5_connector, clock_offset=scheduler.clock_offset)
+            log.info(f"Performance: {performance.summary()}")
+        if profiling.profiler.enabled:
+            profiling.profiler.stop()
+            profiling.profiler.dump()
+        if config_watcher is not None:
+            config_watcher.stop()
+        if metrics_server is not None:
+            metrics_server.shutdown()
         mt5_connector.disconnect()
         log.info("Bot has been shut down gracefully.")
 
@@ -0,0 +1,133 @@
+import asyncio
+import sys
+import time
+from utils.logger import log
+from config import settings, compile_config, ConfigError
+from connectors.mt5_connector import MT5Connector
+from connectors.account_pool import (AccountPool, DEFAULT_START_TIMEOUT_SECONDS, DEFAULT_REPLY_TIMEOUT_SECONDS,
+                                     DEFAULT_MAX_FILL_SPREAD_MS, DEFAULT_MANAGE_TIMEOUT_SECONDS)
+from strategies.xauusd_m5_strategy import XauUsdM5Strategy
+from utils.bar_scheduler import BarCloseScheduler, TIMEFRAME_SECONDS
+from utils.metrics import cycle_seconds, start_from_config as start_metrics
+from utils.config_watcher import watcher_from_config
+from utils import profiling
+from main import timeframe_map
+import MetaTrader5 as mt5
+
+
+class MultiAccountRunner:
+    """
+    Trades one strategy on several accounts: the signal is computed once, in
+    this process, from the market data of the Broker account's terminal, and
+    executed on every account of the AccountPool in parallel. Each account
+    also manages its own positions, all at the same cadence.
+    """
+    def __init__(self, connector, strategy, pool, config_watcher=None):
+        self.connector = connector
+        self.strategy = strategy
+        self.pool = pool
+        self.config_watcher = config_watcher
+
+    def apply_config_reload(self):
+        """Rebinds the strategy and every account to reloaded settings, at a bar boundary."""
+        snapshot = self.config_watcher.take() if self.config_watcher is not None else None
+        if snapshot is None:
+            return
+        if self.pool.configure(snapshot):
+            self.strategy.configure(snapshot)
+
+    @profiling.tick
+    def run_entry_cycle(self, bar_time=None):
+        """
+        :return: The time.time() at which the signal was dispatched, or None.
+        """
+        self.apply_config_reload()
+        with cycle_seconds.labels(cycle="entry").time(), self.connector.snapshot():
+            signal_type, signal_candle = self.strategy.check_for_entry()
+        if not signal_type or signal_candle.empty:
+            return None
+        log.info(f"--- Dispatching {signal_type} to {len(self.pool.workers)} account(s) ---")
+        dispatched_at = time.time()
+        self.pool.dispatch(signal_type, signal_candle)
+        return dispatched_at
+
+    @profiling.tick
+    def run_management_cycle(self):
+        with cycle_seconds.labels(cycle="management").time():
+            self.pool.manage()
+
+
+def main():
+    """
+    Runs the accounts of the MultiAccount config section: Accounts (each with
+    Account, Password, Server, optional Name, Path and Overrides), plus the
+    optional StartTimeoutSeconds, ReplyTimeoutSeconds, ManageTimeoutSeconds and
+    MaxFillSpreadMs.
+    """
+    log.info("Starting multi-account trading bot...")
+    if not settings or not hasattr(settings, "MultiAccount"):
+        log.error("The config has no MultiAccount section. Exiting.")
+        sys.exit(1)
+    section = settings.MultiAccount
+    try:
+        snapshot = compile_config(settings)
+        pool = AccountPool(section.Accounts, snapshot,
+                           reply_timeout=getattr(section, "ReplyTimeoutSeconds", DEFAULT_REPLY_TIMEOUT_SECONDS),
+                           max_fill_spread_ms=getattr(section, "MaxFillSpreadMs", DEFAULT_MAX_FILL_SPREAD_MS),
+                           manage_timeout=getattr(section, "ManageTimeoutSeconds", DEFAULT_MANAGE_TIMEOUT_SECONDS))
+    except ConfigError as e:
+        log.error(f"FATAL: {e}")
+        sys.exit(1)
+
+    if not pool.start(getattr(section, "StartTimeoutSeconds", DEFAULT_START_TIMEOUT_SECONDS)):
+        log.error("No account could be started. Exiting application.")
+        pool.shutdown()
+        return
+    connector = MT5Connector(
+        account=settings.Broker.Account,
+        password=settings.Broker.Password,
+        server=settings.Broker.Server,
+        path=getattr(settings.Broker, "Path", None)
+    )
+    if not connector.connect():
+        log.error("Failed to connect to MT5. Exiting application.")
+        pool.shutdown()
+        return
+    metrics_server = start_metrics(settings)
+    profiling.install_from_config(settings)
+
+    strategy = XauUsdM5Strategy(connector, snapshot)
+    strategy.timeframe = timeframe_map.get(snapshot.Trading.Timeframe, mt5.TIMEFRAME_M5)
+    runner = MultiAccountRunner(connector, strategy, pool, watcher_from_config(snapshot))
+    scheduler = BarCloseScheduler(
+        connector=connector,
+        symbol=snapshot.Trading.Symbol,
+        timeframe=strategy.timeframe,
+        timeframe_seconds=TIMEFRAME_SECONDS.get(snapshot.Trading.Timeframe, 300),
+        on_bar_close=runner.run_entry_cycle,
+        on_manage=runner.run_management_cycle,
+        management_interval=getattr(snapshot.Trading, "ManagementIntervalSeconds", 5)
+    )
+
+    try:
+        log.info("Bot is running. Waiting for the next bar close...")
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        log.info("Bot stopped by user.")
+    finally:
+        log.info(f"Account pool stats: {pool.stats()}")
+        log.info(f"Entry latency: {scheduler.latency_summary()}")
+        pool.shutdown()
+        if runner.config_watcher is not None:
+            runner.config_watcher.stop()
+        if profiling.profiler.enabled:
+            profiling.profiler.stop()
+            profiling.profiler.dump()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        connector.disconnect()
+        log.info("Bot has been shut down gracefully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import asyncio
+import sys
+import time
+from utils.logger import log
+from config import settings, merge_config, compile_config, ConfigError
+from connectors.mt5_connector import MT5Connector
+from strategies.xauusd_m5_strategy import XauUsdM5Strategy
+from risk_management.batch_manager import BatchTradeManager
+from utils.bar_scheduler import BarCloseScheduler, TIMEFRAME_SECONDS
+from utils.metrics import cycle_seconds, start_from_config as start_metrics
+from utils import profiling
+from utils.config_watcher import watcher_from_config
+from main import execute_trade, timeframe_map
+import MetaTrader5 as mt5
+
+# How long a symbol may lag the one whose bar close triggered the cycle, and how
+# often the lagging ones are polled again meanwhile
+SYMBOL_BAR_WAIT_SECONDS = 1.0
+SYMBOL_POLL_INTERVAL = 0.02
+
+
+class Instrument:
+    """
+    One traded (symbol, timeframe) with its own settings and strategy state.
+    """
+    def __init__(self, connector, config, overrides=None):
+        """
+        :param overrides: What the instrument changes on top of the global
+                          settings, reapplied when those are reloaded.
+        """
+        self.config = config
+        self.overrides = overrides or {}
+        self.symbol = config.Trading.Symbol
+        self.timeframe_name = config.Trading.Timeframe
+        self.timeframe = timeframe_map.get(self.timeframe_name, mt5.TIMEFRAME_M5)
+        self.max_open_trades = config.Trading.MaxOpenTrades
+        self.strategy = XauUsdM5Strategy(connector, config)
+        self.strategy.symbol = self.symbol
+        self.strategy.timeframe = self.timeframe
+
+    def configure(self, config):
+        """Binds a reloaded settings snapshot; symbol and timeframe stay as they are."""
+        self.config = config
+        self.max_open_trades = config.Trading.MaxOpenTrades
+        self.strategy.configure(config)
+
+
+def load_instruments(connector, portfolio=None):
+    """
+    Builds the instruments listed under Portfolio.Instruments. Each entry names
+    a Symbol and Timeframe, optionally a per-symbol MaxOpenTrades and an
+    "Overrides" dict applied on top of the global settings (e.g. the
+    RiskManagement pip values of that symbol or its own Strategy periods).
+    Each instrument is bound to its own compiled snapshot of the result.
+
+    A symbol may be listed once only: positions carry no timeframe, so two
+    instruments on one symbol could not tell their trades apart.
+
+    :raises ConfigError: When the settings of an instrument do not validate,
+                         or a symbol is listed twice.
+    """
+    portfolio = portfolio or settings.Portfolio
+    symbols = [spec["Symbol"] for spec in portfolio.Instruments]
+    duplicates = sorted({symbol for symbol in symbols if symbols.count(symbol) > 1})
+    if duplicates:
+        raise ConfigError(f"Portfolio.Instruments lists {', '.join(duplicates)} more than once; "
+                          f"each symbol can be traded on one timeframe only.")
+    instruments = []
+    for spec in portfolio.Instruments:
+        overrides = dict(spec.get("Overrides", {}))
+        overrides["Trading"] = dict(overrides.get("Trading", {}),
+                                    Symbol=spec["Symbol"],
+                                    Timeframe=spec.get("Timeframe", settings.Trading.Timeframe),
+                                    MaxOpenTrades=spec.get("MaxOpenTrades", settings.Trading.MaxOpenTrades))
+        instruments.append(Instrument(connector, compile_config(merge_config(settings, overrides)), overrides))
+    return instruments
+
+
+class PortfolioRunner:
+    """
+    Trades several instruments from one process through one connector.
+
+    On every bar close the positions of all symbols are read once and every
+    instrument brings its indicators up to date. Symbols that have not ticked
+    into the new bar yet are polled again together, from the event loop, so
+    one quiet symbol delays the others by at most SYMBOL_BAR_WAIT_SECONDS and
+    the management loop keeps running meanwhile. The entry rules of the
+    instruments below their own MaxOpenTrades are then evaluated, and the
+    signals executed in order as long as the portfolio-wide trade count and
+    volume caps allow.
+
+    Everything runs on the event loop thread, one instrument after the other:
+    the MetaTrader5 package serves one terminal call at a time, and an
+    evaluation only advances the incremental indicators by one bar, GIL-bound
+    Python that threads would not speed up. A cycle's cost grows linearly
+    with the number of instruments, dominated by their bar fetches.
+    """
+    def __init__(self, connector, instruments, max_open_trades, max_total_volume, config_watcher=None):
+        """
+        :param config_watcher: Optional utils.config_watcher.ConfigWatcher whose
+                               reloaded settings are applied to every instrument.
+        """
+        self.connector = connector
+        self.instruments = instruments
+        self.by_symbol = {i.symbol: i for i in instruments}
+        self.max_open_trades = max_open_trades
+        self.max_total_volume = max_total_volume
+        self.schedulers = []
+        self.trade_manager = BatchTradeManager(connector)
+        self.configs = {i.symbol: i.config for i in instruments}
+        self.config_watcher = config_watcher
+
+    def apply_config_reload(self):
+        """
+        Rebinds every instrument, with its overrides reapplied, and the trade
+        manager to the settings the config watcher prepared, if any. All or
+        nothing: if one instrument's settings do not validate, none change.
+        """
+        snapshot = self.config_watcher.take() if self.config_watcher is not None else None
+        if snapshot is None:
+            return
+        configs = {}
+        for instrument in self.instruments:
+            try:
+                configs[instrument.symbol] = compile_config(merge_config(snapshot, instrument.overrides))
+            except ConfigError as e:
+                log.error(f"Config reload not applied: {instrument.symbol}: {e}")
+                return
+        for instrument in self.instruments:
+            instrument.configure(configs[instrument.symbol])
+        self.configs = configs
+        self.trade_manager.configure(snapshot)
+
+    def _exposure(self, positions):
+        return len(positions), sum(p.volume for p in positions)
+
+    async def run_entry_cycle(self, instruments, bar_time):
+        """
+        Entry cycle for the instruments whose bar just closed.
+
+        :return: The time.time() at which the first order was sent, or None.
+        """
+        with cycle_seconds.labels(cycle="entry").time():
+            ready, lagging = self.sync_instruments(instruments, bar_time)
+            # A quiet symbol may not have ticked into the new bar yet; poll it again without blocking the loop
+            deadline = time.monotonic() + SYMBOL_BAR_WAIT_SECONDS
+            while lagging and time.monotonic() < deadline:
+                await asyncio.sleep(SYMBOL_POLL_INTERVAL)
+                ready, lagging = self.sync_instruments(lagging, bar_time, ready)
+            for instrument in lagging:
+                log.warning(f"{instrument.symbol} has no bar at {bar_time} yet. Skipping it this bar.")
+            return self.enter(ready)
+
+    @profiling.tick
+    def sync_instruments(self, instruments, bar_time, ready=None):
+        """
+        Brings the instruments' market data up to the bar that just closed. On
+        the first pass (ready None) the settings are reloaded and the
+        instruments with no entry possible this bar are only kept in step.
+
+        :return: (ready, lagging): ready holds (instrument, forming bar) pairs to
+                 evaluate; lagging the instruments whose new bar is not in yet.
+        """
+        first_pass = ready is None
+        ready = [] if first_pass else ready
+        lagging = []
+        if first_pass:
+            self.apply_config_reload()
+        with self.connector.snapshot():
+            if first_pass:
+                positions = self.connector.get_open_positions()
+                open_trades, volume = self._exposure(positions)
+                at_cap = open_trades >= self.max_open_trades or volume >= self.max_total_volume
+                if at_cap:
+                    log.info(f"Portfolio at its cap ({open_trades} trades, {volume:.2f} lots). Skipping entries.")
+                per_symbol = {}
+                for pos in positions:
+                    per_symbol[pos.symbol] = per_symbol.get(pos.symbol, 0) + 1
+            for instrument in instruments:
+                if first_pass and (at_cap or per_symbol.get(instrument.symbol, 0) >= instrument.max_open_trades):
+                    # No entry on it this bar, but its indicators still follow the bars and need no reseed later
+                    instrument.strategy.sync_market_data()
+                    continue
+                forming_bar = instrument.strategy.sync_market_data()
+                if forming_bar is None:
+                    continue
+                if bar_time is not None and int(forming_bar['time'].timestamp()) < bar_time:
+                    lagging.append(instrument)
+                else:
+                    ready.append((instrument, forming_bar))
+        return ready, lagging
+
+    @profiling.tick
+    def enter(self, ready):
+        """
+        Evaluates the synced instruments and executes their signals within the caps.
+
+        :return: The time.time() at which the first order was sent, or None.
+        """
+        if not ready:
+            return None
+        first_order_at = None
+        with self.connector.snapshot():
+            open_trades, volume = self._exposure(self.connector.get_open_positions())
+            for instrument, forming_bar in ready:
+                signal_type, signal_candle = instrument.strategy.evaluate(forming_bar)
+                if not signal_type or signal_candle.empty:
+                    continue
+                if open_trades >= self.max_open_trades or volume >= self.max_total_volume:
+                    log.info(f"Portfolio cap reached; {signal_type} on {instrument.symbol} not taken.")
+                    continue
+                result = execute_trade(signal_type, signal_candle, config=instrument.config,
+                                       connector=self.connector,
+                                       max_lot_size=self.max_total_volume - volume)
+                if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+                    first_order_at = first_order_at or time.time()
+                    open_trades += 1
+                    volume += result.volume
+        return first_order_at
+
+    @profiling.tick
+    def run_management_cycle(self):
+        """Manages every open position of the portfolio's symbols with that symbol's settings."""
+        with cycle_seconds.labels(cycle="management").time(), self.connector.snapshot():
+            positions = [pos for pos in self.connector.get_open_positions() if pos.symbol in self.by_symbol]
+            self.trade_manager.run_management(positions, self.configs)
+
+    async def run(self):
+        """
+        Runs one bar-close scheduler per timeframe, driven by the first symbol
+        of that timeframe, plus a single management loop.
+        """
+        groups = {}
+        for instrument in self.instruments:
+            groups.setdefault(instrument.timeframe_name, []).append(instrument)
+        for n, (name, members) in enumerate(groups.items()):
+            self.schedulers.append(BarCloseScheduler(
+                connector=self.connector,
+                symbol=members[0].symbol,
+                timeframe=members[0].timeframe,
+                timeframe_seconds=TIMEFRAME_SECONDS.get(name, 300),
+                on_bar_close=lambda bar_time, members=members: self.run_entry_cycle(members, bar_time),
+                on_manage=self.run_management_cycle if n == 0 else None,
+                management_interval=getattr(settings.Trading, "ManagementIntervalSeconds", 5)
+            ))
+        log.info(f"Portfolio: {', '.join(f'{i.symbol} {i.timeframe_name}' for i in self.instruments)} | "
+                 f"caps: {self.max_open_trades} trades, {self.max_total_volume} lots.")
+        await asyncio.gather(*(s.run() for s in self.schedulers))
+
+    def shutdown(self):
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        log.info(f"Position management stats: {self.trade_manager.stats()}")
+        for scheduler in self.schedulers:
+            log.info(f"Entry latency ({scheduler.symbol}): {scheduler.latency_summary()}")
+
+
+def main():
+    """
+    Runs every instrument of the Portfolio config section in this process.
+    """
+    log.info("Starting portfolio trading bot...")
+    if not settings or not hasattr(settings, "Portfolio"):
+        log.error("The config has no Portfolio section. Exiting.")
+        sys.exit(1)
+
+    connector = MT5Connector(
+        account=settings.Broker.Account,
+        password=settings.Broker.Password,
+        server=settings.Broker.Server
+    )
+    if not connector.connect():
+        log.error("Failed to connect to MT5. Exiting application.")
+        return
+    try:
+        instruments = load_instruments(connector)
+        snapshot = compile_config(settings)
+    except ConfigError as e:
+        log.error(f"FATAL: {e}")
+        connector.disconnect()
+        sys.exit(1)
+    metrics_server = start_metrics(settings)
+    profiling.install_from_config(settings)
+
+    runner = PortfolioRunner(
+        connector,
+        instruments,
+        max_open_trades=settings.Portfolio.MaxOpenTrades,
+        max_total_volume=settings.Portfolio.MaxTotalVolume,
+        config_watcher=watcher_from_config(snapshot)
+    )
+    try:
+        asyncio.run(runner.run())
+    except KeyboardInterrupt:
+        log.info("Bot stopped by user.")
+    finally:
+        runner.shutdown()
+        if profiling.profiler.enabled:
+            profiling.profiler.stop()
+            profiling.profiler.dump()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        log.info(f"Terminal cache stats: {connector.cache_stats()}")
+        log.info(f"Order execution stats: {connector.execution_stats()}")
+        connector.disconnect()
+        log.info("Bot has been shut down gracefully.")
+
+
+if __name__ == "__main__":
+    main()
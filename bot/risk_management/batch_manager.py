@@ -0,0 +1,150 @@
+from collections import defaultdict
+import numpy as np
+from utils.logger import log
+from utils.profiling import section
+from config import settings
+import MetaTrader5 as mt5
+
+# Default for the optional TradeManagement.MinModifyPoints: smaller SL moves are not sent
+DEFAULT_MIN_MODIFY_POINTS = 2
+
+
+class BatchTradeManager:
+    """
+    Breakeven and trailing stop management for all open positions at once.
+
+    Positions are grouped by symbol; each group reads one tick and one symbol
+    info and computes its new stop losses as array operations. Only
+    modifications that matter reach the broker:
+
+    - the two rules are merged into one target per position, and a stop loss
+      is only ever tightened (breakeven no longer pulls a trailed stop back
+      to the entry price);
+    - the target is clamped to the symbol's trade_stops_level, which the
+      broker would reject, and rounded to its digits;
+    - moves smaller than MinModifyPoints are skipped, so a stop trailing a
+      slowly rising price is sent in steps instead of on every tick.
+    """
+    def __init__(self, connector, config=None):
+        self.connector = connector
+        self.config = config or settings
+        self.evaluated = 0
+        self.sent = 0
+        self.suppressed = 0
+
+    def configure(self, config):
+        """Binds new default settings, e.g. a reloaded snapshot, for the next run_management()."""
+        self.config = config
+
+    def stats(self):
+        return {'evaluated': self.evaluated, 'sent': self.sent, 'suppressed': self.suppressed}
+
+    @section
+    def run_management(self, positions, configs=None):
+        """
+        :param positions: Open positions, any mix of symbols.
+        :param configs: Optional symbol -> config; other symbols use self.config.
+        :return: The number of modifications sent.
+        """
+        by_symbol = defaultdict(list)
+        for pos in positions:
+            by_symbol[pos.symbol].append(pos)
+
+        sent = 0
+        for symbol, group in by_symbol.items():
+            config = (configs or {}).get(symbol, self.config)
+            for pos, sl in self.plan(symbol, group, config):
+                log.info(f"Moving SL of trade #{pos.ticket} from {pos.sl} to {sl}.")
+                self.connector.modify_position(pos.ticket, sl=sl, tp=pos.tp)
+                sent += 1
+        self.sent += sent
+        return sent
+
+    def plan(self, symbol, positions, config=None):
+        """
+        The stop loss updates for the positions of one symbol, without sending them.
+
+        :return: List of (position, new stop loss).
+        """
+        config = config or self.config
+        management = config.TradeManagement
+        self.evaluated += len(positions)
+        if not (management.EnableBreakeven or management.EnableTrailingStop):
+            return []
+        tick = self.connector.get_last_tick(symbol)
+        symbol_info = self.connector.get_symbol_info(symbol)
+        if not tick or symbol_info is None:
+            return []
+
+        pip = config.RiskManagement.PipDecimalValue
+        point = symbol_info.point or pip
+        is_buy = np.array([pos.type == mt5.ORDER_TYPE_BUY for pos in positions])
+        price_open = np.array([pos.price_open for pos in positions], dtype=float)
+        sl = np.array([pos.sl for pos in positions], dtype=float)
+
+        # Profit measured with longs on the ask and shorts on the bid
+        profit_pips = np.where(is_buy, tick.ask - price_open, price_open - tick.bid) / pip
+        active = profit_pips >= management.TrailingStop_ActivationPips
+
+        # Candidates that tighten the stop: higher for longs, lower (or first) for shorts
+        target = np.where(is_buy, -np.inf, np.inf)
+        if management.EnableBreakeven:
+            target = np.where(active & (sl != price_open), price_open, target)
+        if management.EnableTrailingStop:
+            distance = management.TrailingStop_DistancePips * pip
+            trail = np.where(is_buy, tick.ask - distance, tick.bid + distance)
+            target = np.where(active, np.where(is_buy, np.maximum(target, trail), np.minimum(target, trail)), target)
+
+        # The broker refuses stops closer than trade_stops_level to the exit price
+        min_distance = symbol_info.trade_stops_level * point
+        target = np.where(is_buy, np.minimum(target, tick.bid - min_distance),
+                          np.maximum(target, tick.ask + min_distance))
+        target = np.round(target, symbol_info.digits)
+
+        min_step = getattr(management, "MinModifyPoints", DEFAULT_MIN_MODIFY_POINTS) * point
+        has_sl = sl != 0.0
+        improves = np.where(is_buy, target > sl, ~has_sl | (target < sl)) & np.isfinite(target)
+        worth_it = ~has_sl | (np.abs(target - sl) >= min_step - point * 1e-6)
+        send = improves & worth_it
+        self.suppressed += int((improves & ~worth_it).sum())
+        return [(positions[i], float(target[i])) for i in np.flatnonzero(send)]
+
+    def wake_levels(self, positions, symbol_info, config=None):
+        """
+        Prices beyond which plan() may modify one of the positions: nothing is
+        sent while the ask stays below the first level and the bid above the
+        second. The levels are conservative (one point early), so a caller
+        replaying quotes may skip plan() on every tick within them.
+
+        :return: (ask level for the longs, bid level for the shorts); inf / -inf
+                 when no position of that side can be modified.
+        """
+        config = config or self.config
+        management = config.TradeManagement
+        buy_level, sell_level = np.inf, -np.inf
+        if not positions or not (management.EnableBreakeven or management.EnableTrailingStop):
+            return buy_level, sell_level
+
+        pip = config.RiskManagement.PipDecimalValue
+        point = symbol_info.point or pip
+        activation = management.TrailingStop_ActivationPips * pip
+        distance = management.TrailingStop_DistancePips * pip
+        step = getattr(management, "MinModifyPoints", DEFAULT_MIN_MODIFY_POINTS) * point
+        for pos in positions:
+            if pos.type == mt5.ORDER_TYPE_BUY:
+                level = np.inf
+                if management.EnableBreakeven and pos.sl < pos.price_open:
+                    level = pos.price_open + activation
+                if management.EnableTrailingStop:
+                    trail = pos.sl + step + distance if pos.sl else -np.inf
+                    level = min(level, max(pos.price_open + activation, trail))
+                buy_level = min(buy_level, level - point)
+            else:
+                level = -np.inf
+                if management.EnableBreakeven and (not pos.sl or pos.sl > pos.price_open):
+                    level = pos.price_open - activation
+                if management.EnableTrailingStop:
+                    trail = pos.sl - step - distance if pos.sl else np.inf
+                    level = max(level, min(pos.price_open - activation, trail))
+                sell_level = max(sell_level, level + point)
+        return buy_level, sell_level
@@ -36,6 +36,35 @@ def calculate_lot_size(account_balance, risk_percentage, stop_loss_pips, pip_val
     # Round to the broker's required precision (e.g., 2 decimal places)
     return round(lot_size, 2)
 
+def calculate_trade_levels(signal_type, signal_candle, bid, ask, point, pip_value,
+                           stop_loss_buffer_pips, risk_reward_ratio):
+    """
+    Works out the entry, stop loss and take profit prices of a new trade.
+
+    This function implements the execution step of Sections 4.1. and 4.2. of the spec.
+
+    :param signal_type: "BUY" or "SELL".
+    :param signal_candle: The closed candle that produced the signal (needs 'high'/'low').
+    :param bid: Current bid price.
+    :param ask: Current ask price.
+    :param point: The symbol's point size.
+    :param pip_value: The price size of one pip (PipDecimalValue).
+    :param stop_loss_buffer_pips: Distance kept beyond the signal candle's extreme.
+    :param risk_reward_ratio: Take profit distance as a multiple of the stop loss.
+    :return: Tuple of (entry_price, sl_price, tp_price, stop_loss_pips).
+    """
+    if signal_type == "BUY":
+        entry_price = ask
+        sl_price = signal_candle['low'] - (stop_loss_buffer_pips * 10 * point)
+        stop_loss_pips = (entry_price - sl_price) / pip_value
+        tp_price = entry_price + (stop_loss_pips * risk_reward_ratio * pip_value)
+    else: # SELL
+        entry_price = bid
+        sl_price = signal_candle['high'] + (stop_loss_buffer_pips * 10 * point)
+        stop_loss_pips = (sl_price - entry_price) / pip_value
+        tp_price = entry_price - (stop_loss_pips * risk_reward_ratio * pip_value)
+    return entry_price, sl_price, tp_price, stop_loss_pips
+
 # --- Example Usage (for testing) ---
 if __name__ == '__main__':
     # Based on the example in the spec
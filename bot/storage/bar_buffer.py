@@ -0,0 +1,124 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from storage.bar_store import BAR_DTYPES
+
+# Newest bars kept per symbol/timeframe, the longest window get_market_data serves without a full fetch
+DEFAULT_CAPACITY = 4096
+
+
+class BarBuffer:
+    """
+    The most recent bars of one symbol and timeframe, in preallocated NumPy
+    columns laid out like the rates array of copy_rates_from_pos.
+
+    merge() rewrites the forming bar in place and appends the new ones. The
+    columns are twice `capacity` long, so the newest `capacity` bars are always
+    one contiguous slice and frame() never copies; when the end is reached they
+    are moved back to the front, one move per `capacity` appended bars.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.columns = {col: np.zeros(2 * capacity, dtype=dtype) for col, dtype in BAR_DTYPES.items()}
+        self.start = 0
+        self.end = 0
+        self.loaded = 0     # Bars asked for by the last full load (the terminal may have had fewer)
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def last_time(self):
+        """Epoch seconds of the newest (forming) bar, or None when empty."""
+        return int(self.columns['time'][self.end - 1]) if self.end > self.start else None
+
+    def load(self, rates, requested):
+        """
+        Replaces the content with a full fetch.
+
+        :param rates: The structured array returned by copy_rates_from_pos.
+        :param requested: The number of bars the fetch asked for.
+        """
+        rates = rates[-self.capacity:]
+        self.start = 0
+        self.end = len(rates)
+        self._write(rates, 0)
+        self.loaded = min(requested, self.capacity)
+
+    def merge(self, rates):
+        """
+        Applies a delta fetch, which has to start at or before the newest
+        stored bar: the bars from its first one on are overwritten, the newer
+        ones appended.
+
+        :return: The number of bars appended, or None when the fetch does not
+                 reach back to the stored bars (a gap to backfill) or does not
+                 line up with them (history rewritten by the terminal).
+        """
+        count = len(rates)
+        if not count or count > self.capacity:
+            return None
+        stored = self.columns['time'][self.start:self.end]
+        at = int(np.searchsorted(stored, rates['time'][0]))
+        if at == len(stored) or stored[at] != rates['time'][0]:
+            return None
+        added = at + count - len(stored)
+        position = self.start + at
+        if position + count > len(self.columns['time']):
+            # Keep as many of the bars before the overwritten ones as still fit in the capacity
+            keep = min(at, self.capacity - count)
+            for values in self.columns.values():
+                values[:keep] = values[position - keep:position]
+            self.start, position = 0, keep
+        self._write(rates, position)
+        self.end = position + count
+        self.start = max(self.start, self.end - self.capacity)
+        return max(added, 0)
+
+    def _write(self, rates, position):
+        for col, values in self.columns.items():
+            if col in rates.dtype.names:
+                values[position:position + len(rates)] = rates[col]
+
+    def frame(self, count):
+        """
+        The newest `count` bars as a DataFrame shaped like
+        MT5Connector.get_market_data. Every column, 'time' included
+        (reinterpreted as datetime64[s]), is a view on the buffer: valid until
+        the next merge() or load().
+        """
+        rows = slice(max(self.start, self.end - count), self.end)
+        data = {col: values[rows] for col, values in self.columns.items()}
+        data['time'] = data['time'].view('datetime64[s]')
+        return pd.DataFrame(data, copy=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time delta merges into a BarBuffer against rebuilding the frame.")
+    parser.add_argument("--bars", type=int, default=500, help="Bars handed to the strategy per call.")
+    parser.add_argument("--ticks", type=int, default=20_000)
+    args = parser.parse_args()
+
+    from utils.logger import log
+    rates = np.zeros(args.bars + args.ticks, dtype=list(BAR_DTYPES.items()))
+    rates['time'] = 1_700_000_000 + 300 * np.arange(len(rates))
+    for col in ('open', 'high', 'low', 'close'):
+        rates[col] = 2000.0 + np.cumsum(np.random.default_rng(0).normal(0, 0.5, len(rates)))
+
+    started = time.perf_counter()
+    for i in range(args.ticks):
+        window = rates[i:i + args.bars]
+        df = pd.DataFrame(window)
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+    rebuild = (time.perf_counter() - started) / args.ticks
+
+    buffer = BarBuffer()
+    buffer.load(rates[:args.bars], args.bars)
+    started = time.perf_counter()
+    for i in range(args.ticks):
+        buffer.merge(rates[args.bars + i - 1:args.bars + i + 1])
+        df = buffer.frame(args.bars)
+    merge = (time.perf_counter() - started) / args.ticks
+    log.info(f"{args.bars} bars per call: rebuilding {rebuild * 1e6:.1f} us, delta merge {merge * 1e6:.1f} us "
+             f"({rebuild / merge:.1f}x)")
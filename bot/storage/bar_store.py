@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from utils.logger import log
+
+# Column layout of the rates array returned by MetaTrader5.copy_rates_from_pos
+BAR_DTYPES = {
+    'time': np.dtype('<i8'),        # Epoch seconds, sorted ascending
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'tick_volume': np.dtype('<u8'),
+    'spread': np.dtype('<i4'),
+    'real_volume': np.dtype('<u8'),
+}
+DEFAULT_ROOT = os.path.join('data', 'bars')
+
+
+class BarSeries:
+    """
+    Read-only, memory-mapped view of the bars of one symbol and timeframe.
+    Each column is a NumPy memmap, so opening costs no reads and no copies.
+    """
+    def __init__(self, path, count):
+        self.path = path
+        self.count = count
+        self.columns = {}
+        for col, dtype in BAR_DTYPES.items():
+            if count:
+                self.columns[col] = np.memmap(os.path.join(path, f"{col}.bin"), dtype=dtype,
+                                              mode='r', shape=(count,))
+            else:
+                self.columns[col] = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, col):
+        return self.columns[col]
+
+    def index_range(self, start=None, end=None):
+        """
+        Row slice of the bars with start <= time < end (O(log n) binary search).
+
+        :param start: Inclusive lower bound, epoch seconds or anything pd.Timestamp accepts.
+        :param end: Exclusive upper bound, same types as start.
+        """
+        times = self.columns['time']
+        lo = 0 if start is None else int(np.searchsorted(times, _to_epoch(start), side='left'))
+        hi = self.count if end is None else int(np.searchsorted(times, _to_epoch(end), side='left'))
+        return slice(lo, max(lo, hi))
+
+    def to_frame(self, start=None, end=None):
+        """
+        The bars in [start, end) as a DataFrame shaped like MT5Connector.get_market_data.
+        The price columns are views on the memory map; 'time' is reinterpreted
+        as datetime64[s] without copying.
+        """
+        rows = self.index_range(start, end)
+        data = {col: values[rows] for col, values in self.columns.items()}
+        data['time'] = data['time'].view('datetime64[s]')
+        return pd.DataFrame(data, copy=False)
+
+
+class BarStore:
+    """
+    On-disk columnar store of OHLC bars, one directory per symbol/timeframe
+    with a raw binary file per column and a small meta.json holding the row
+    count. Appends only ever add bars newer than the last stored one.
+    """
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def _path(self, symbol, timeframe):
+        return os.path.join(self.root, symbol, timeframe)
+
+    def _read_count(self, path):
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r') as f:
+                return json.load(f)['count']
+        except FileNotFoundError:
+            return 0
+
+    def _write_count(self, path, count):
+        # Written last and swapped in atomically: readers never see a half-written append
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'count': count, 'columns': {c: d.str for c, d in BAR_DTYPES.items()}}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    def open(self, symbol, timeframe):
+        """
+        Memory-maps the stored bars of a symbol and timeframe (e.g. "XAUUSD", "M5").
+        """
+        path = self._path(symbol, timeframe)
+        return BarSeries(path, self._read_count(path))
+
+    def last_time(self, symbol, timeframe):
+        """Epoch seconds of the newest stored bar, or None if there is none."""
+        series = self.open(symbol, timeframe)
+        return int(series['time'][-1]) if len(series) else None
+
+    def append(self, symbol, timeframe, rates):
+        """
+        Appends bars newer than the last stored one.
+
+        :param rates: The structured array returned by copy_rates_from_pos, or a
+                      DataFrame with the same columns ('time' as datetime or epoch
+                      seconds). Must be sorted by time; missing volume/spread
+                      columns are stored as 0.
+        :return: The number of bars appended.
+        """
+        columns = _as_columns(rates)
+        times = columns['time']
+        if len(times) > 1 and np.any(np.diff(times) <= 0):
+            raise ValueError("Bars to append must be strictly increasing in time.")
+
+        path = self._path(symbol, timeframe)
+        os.makedirs(path, exist_ok=True)
+        count = self._read_count(path)
+        last = self.last_time(symbol, timeframe)
+        new_rows = slice(0 if last is None else int(np.searchsorted(times, last, side='right')), None)
+        added = len(times[new_rows])
+        if not added:
+            return 0
+
+        for col, dtype in BAR_DTYPES.items():
+            file_path = os.path.join(path, f"{col}.bin")
+            with open(file_path, 'ab') as f:
+                # Drop any tail left by an append that crashed before its meta update
+                f.truncate(count * dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(columns[col][new_rows], dtype=dtype).tobytes())
+        self._write_count(path, count + added)
+        return added
+
+    def update_from_connector(self, connector, symbol, timeframe_name, timeframe, count):
+        """
+        Fetches the latest `count` bars through an MT5Connector and appends the
+        closed ones (the last, still-forming bar is never stored).
+
+        :return: The number of bars appended, or 0 if the fetch failed.
+        """
+        df = connector.get_market_data(symbol, timeframe, count)
+        if df is None or len(df) < 2:
+            return 0
+        return self.append(symbol, timeframe_name, df.iloc[:-1])
+
+    def import_csv(self, csv_path, symbol, timeframe):
+        """
+        Imports an MT5 CSV export (time in epoch seconds) into the store.
+
+        :return: The number of bars appended.
+        """
+        df = pd.read_csv(csv_path)
+        df = df.sort_values('time').drop_duplicates('time', keep='last')
+        return self.append(symbol, timeframe, df)
+
+
+def _to_epoch(value):
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).timestamp())
+
+
+def _as_columns(rates):
+    if isinstance(rates, pd.DataFrame):
+        names = rates.columns
+        get = lambda col: rates[col].to_numpy()
+    else:
+        names = rates.dtype.names
+        get = lambda col: rates[col]
+
+    columns = {}
+    for col, dtype in BAR_DTYPES.items():
+        if col in names:
+            values = get(col)
+            if col == 'time' and np.issubdtype(values.dtype, np.datetime64):
+                values = values.astype('datetime64[s]').astype('int64')
+            columns[col] = values
+        elif col in ('open', 'high', 'low', 'close', 'time'):
+            raise ValueError(f"Bars are missing the '{col}' column.")
+        else:
+            columns[col] = np.zeros(len(get('time')), dtype=dtype)
+    return columns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the memory-mapped bar store.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Store directory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Import an MT5 CSV export.")
+    importer.add_argument("csv", help="CSV file with time in epoch seconds.")
+    importer.add_argument("--symbol", required=True)
+    importer.add_argument("--timeframe", required=True, help="e.g. M5")
+    info = commands.add_parser("info", help="Show what is stored for a symbol/timeframe.")
+    info.add_argument("--symbol", required=True)
+    info.add_argument("--timeframe", required=True)
+    args = parser.parse_args()
+
+    store = BarStore(args.root)
+    if args.command == "import":
+        started = time.perf_counter()
+        appended = store.import_csv(args.csv, args.symbol, args.timeframe)
+        log.info(f"Imported {appended} new bar(s) into {args.symbol}/{args.timeframe} "
+                 f"in {time.perf_counter() - started:.2f}s.")
+    else:
+        started = time.perf_counter()
+        series = store.open(args.symbol, args.timeframe)
+        opened_ms = (time.perf_counter() - started) * 1000
+        if len(series):
+            first, last = series['time'][0], series['time'][-1]
+            log.info(f"{args.symbol}/{args.timeframe}: {len(series)} bars from "
+                     f"{pd.Timestamp(first, unit='s')} to {pd.Timestamp(last, unit='s')} "
+                     f"(opened in {opened_ms:.2f} ms).")
+        else:
+            log.info(f"{args.symbol}/{args.timeframe}: no bars stored.")
@@ -0,0 +1,155 @@
+import argparse
+import time
+from collections import deque, namedtuple
+import numpy as np
+import pandas as pd
+from utils.logger import log
+from utils.bar_scheduler import TIMEFRAME_SECONDS
+from storage.bar_store import BarStore, DEFAULT_ROOT
+
+# One aggregated bar; time is the epoch second its bucket opens
+ResampledBar = namedtuple('ResampledBar', ['time', 'open', 'high', 'low', 'close', 'tick_volume'])
+
+
+def _epoch_seconds(times):
+    values = np.asarray(times)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[s]').astype(np.int64)
+    return values.astype(np.int64)
+
+
+def _to_epoch(value):
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).timestamp())
+
+
+def resample_bars(df, timeframe_seconds, base_seconds=300):
+    """
+    Aggregates a history of base bars (e.g. M5) into higher-timeframe bars in
+    one vectorized pass. Buckets are aligned on epoch multiples of the
+    timeframe, like the terminal's own bars (D1 and above excepted).
+
+    :param df: Bars oldest first with time (datetime or epoch seconds) and OHLC columns.
+    :return: DataFrame with time (datetime of the bucket open), OHLC,
+             tick_volume and 'available_at': the positional index of the first
+             base bar at whose close the aggregated bar is known complete
+             (len(df) for a bucket that is still open).
+    """
+    epoch = _epoch_seconds(df['time'])
+    n = len(epoch)
+    if n == 0:
+        return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'tick_volume', 'available_at'])
+    bucket = epoch // timeframe_seconds * timeframe_seconds
+    starts = np.r_[0, np.flatnonzero(np.diff(bucket)) + 1]
+    ends = np.r_[starts[1:], n]
+    volume = df['tick_volume'].to_numpy(dtype=float) if 'tick_volume' in df else np.zeros(n)
+
+    # Complete once its last slot has closed, or else when the next bucket's first bar has
+    last_slot = epoch[ends - 1] + base_seconds >= bucket[starts] + timeframe_seconds
+    available_at = np.where(last_slot, ends - 1, ends)
+    return pd.DataFrame({
+        'time': pd.to_datetime(bucket[starts], unit='s'),
+        'open': df['open'].to_numpy(dtype=float)[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(dtype=float), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(dtype=float), starts),
+        'close': df['close'].to_numpy(dtype=float)[ends - 1],
+        'tick_volume': np.add.reduceat(volume, starts),
+        'available_at': available_at,
+    })
+
+
+def align_to_base(resampled, values, base_length):
+    """
+    For every base bar, the value of the latest aggregated bar complete at its
+    close (NaN before the first one), so a backtest never sees an unfinished bar.
+
+    :param resampled: The result of resample_bars.
+    :param values: One value per aggregated bar (e.g. an indicator over their closes).
+    """
+    values = np.asarray(values, dtype=float)
+    latest = np.searchsorted(resampled['available_at'].to_numpy(), np.arange(base_length), side='right') - 1
+    aligned = np.full(base_length, np.nan)
+    known = latest >= 0
+    aligned[known] = values[latest[known]]
+    return aligned
+
+
+class BarResampler:
+    """
+    Builds higher-timeframe bars incrementally from a stream of closed base
+    bars or of ticks, and keeps the latest completed ones.
+    """
+    def __init__(self, timeframe_seconds, base_seconds=300, keep=500):
+        self.timeframe_seconds = timeframe_seconds
+        self.base_seconds = base_seconds
+        self.completed = deque(maxlen=keep)
+        self.reset()
+
+    def reset(self):
+        self.completed.clear()
+        self.current = None   # [bucket, open, high, low, close, volume] of the open bucket
+
+    def _close_current(self):
+        bucket, o, h, l, c, v = self.current
+        bar = ResampledBar(bucket, o, h, l, c, v)
+        self.completed.append(bar)
+        self.current = None
+        return bar
+
+    def _add(self, epoch, o, h, l, c, volume):
+        finished = []
+        bucket = epoch // self.timeframe_seconds * self.timeframe_seconds
+        if self.current is not None and bucket != self.current[0]:
+            finished.append(self._close_current())
+        if self.current is None:
+            self.current = [bucket, o, h, l, c, volume]
+        else:
+            current = self.current
+            current[2] = max(current[2], h)
+            current[3] = min(current[3], l)
+            current[4] = c
+            current[5] += volume
+        return finished
+
+    def update(self, time, open, high, low, close, tick_volume=0):
+        """
+        Adds one closed base bar.
+
+        :param time: Bar open, epoch seconds or anything pd.Timestamp accepts.
+        :return: The aggregated bars this completed (usually none or one).
+        """
+        epoch = _to_epoch(time)
+        finished = self._add(epoch, open, high, low, close, tick_volume)
+        # The bucket's last slot just closed: no need to wait for the next bar
+        if epoch + self.base_seconds >= self.current[0] + self.timeframe_seconds:
+            finished.append(self._close_current())
+        return finished
+
+    def update_tick(self, time, price, volume=1):
+        """
+        Adds one tick. A bucket completes with the first tick of the next one.
+
+        :return: The aggregated bars this completed.
+        """
+        return self._add(_to_epoch(time), price, price, price, price, volume)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Derive higher-timeframe bars from stored base bars.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Store directory.")
+    parser.add_argument("--symbol", required=True)
+    parser.add_argument("--base", default="M5", help="Stored timeframe to read.")
+    parser.add_argument("--to", nargs="+", default=["M15", "H1", "H4"], help="Timeframes to build.")
+    args = parser.parse_args()
+
+    store = BarStore(args.root)
+    base = store.open(args.symbol, args.base).to_frame()
+    for name in args.to:
+        started = time.perf_counter()
+        bars = resample_bars(base, TIMEFRAME_SECONDS[name], TIMEFRAME_SECONDS[args.base])
+        # Only completed bars are stored; the open bucket is rebuilt on the next run
+        complete = bars[bars['available_at'] < len(base)].drop(columns='available_at')
+        appended = store.append(args.symbol, name, complete)
+        log.info(f"{args.symbol} {args.base} -> {name}: {len(complete)} bars, {appended} new, "
+                 f"in {time.perf_counter() - started:.2f}s.")
@@ -0,0 +1,156 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.logger import log
+from config import settings
+
+PATTERNS = (
+    'bull_engulfing', 'bear_engulfing', 'hammer', 'shooting_star',
+    'inside_bar', 'outside_bar', 'doji', 'morning_star', 'evening_star',
+)
+# Entry confirmations of the strategy, by the name recorded in the decision trace
+BULLISH_CONFIRMATIONS = (("engulfing", 'bull_engulfing'), ("pin_bar", 'hammer'))
+BEARISH_CONFIRMATIONS = (("engulfing", 'bear_engulfing'), ("pin_bar", 'shooting_star'))
+
+# Thresholds used when the CandlePatterns section does not set them
+DEFAULT_DOJI_BODY_MAX_PERCENT = 0.1
+DEFAULT_STAR_FIRST_BODY_MIN_PERCENT = 0.5
+DEFAULT_STAR_MIDDLE_BODY_MAX_RATIO = 0.5
+
+
+def _previous(values, n=1):
+    # The first n bars have no predecessor: NaN makes every comparison with them False
+    shifted = np.empty_like(values)
+    shifted[:n] = np.nan
+    shifted[n:] = values[:-n]
+    return shifted
+
+
+def candle_features(open_, high, low, close):
+    """
+    Body, wick and range sizes of every candle.
+
+    :return: Dict of arrays: body, upper_wick, lower_wick, range.
+    """
+    return {
+        'body': np.abs(close - open_),
+        'upper_wick': high - np.maximum(open_, close),
+        'lower_wick': np.minimum(open_, close) - low,
+        'range': high - low,
+    }
+
+
+class CandlePatternDetector:
+    """
+    Flags candlestick patterns on whole OHLC arrays with NumPy, one boolean
+    array per pattern. A pattern on bar i only looks at bars i-2..i, so the
+    bar-by-bar at() gives the same answer as the vectorized detect().
+    """
+    def __init__(self, config=None):
+        """
+        :param config: The CandlePatterns config section (PinBar, and optionally
+                       Doji.BodyMaxPercent and Star.FirstBodyMinPercent /
+                       Star.MiddleBodyMaxRatio); the global settings by default.
+        """
+        config = config or settings.CandlePatterns
+        self.pin_body_max = config.PinBar.BodyMaxPercent
+        self.pin_wick_min = config.PinBar.WickMinPercent
+        self.pin_opposite_wick_max = config.PinBar.OppositeWickMaxPercent
+        doji = getattr(config, "Doji", None)
+        self.doji_body_max = getattr(doji, "BodyMaxPercent", DEFAULT_DOJI_BODY_MAX_PERCENT)
+        star = getattr(config, "Star", None)
+        self.star_first_body_min = getattr(star, "FirstBodyMinPercent", DEFAULT_STAR_FIRST_BODY_MIN_PERCENT)
+        self.star_middle_body_max = getattr(star, "MiddleBodyMaxRatio", DEFAULT_STAR_MIDDLE_BODY_MAX_RATIO)
+
+    def detect(self, open_, high, low, close):
+        """
+        :param open_, high, low, close: Float arrays, oldest first.
+        :return: Dict mapping each name in PATTERNS to a boolean array.
+        """
+        features = candle_features(open_, high, low, close)
+        body, upper_wick, lower_wick, total_range = (features['body'], features['upper_wick'],
+                                                     features['lower_wick'], features['range'])
+        prev_open, prev_close = _previous(open_), _previous(close)
+        prev_high, prev_low = _previous(high), _previous(low)
+        is_bullish = close > open_
+        is_bearish = close < open_
+
+        # Pin bars: small body, one long wick, the opposite wick short
+        is_small_body = (total_range > 0) & (body < self.pin_body_max * total_range)
+        hammer = (is_small_body &
+                  (lower_wick > self.pin_wick_min * total_range) &
+                  (upper_wick < self.pin_opposite_wick_max * total_range))
+        shooting_star = (is_small_body &
+                         (upper_wick > self.pin_wick_min * total_range) &
+                         (lower_wick < self.pin_opposite_wick_max * total_range))
+
+        # Three-candle stars: a strong candle, a small one, then a reversal past
+        # the middle of the first candle's body
+        first_open, first_close = _previous(open_, 2), _previous(close, 2)
+        first_body, first_range = np.abs(first_close - first_open), _previous(total_range, 2)
+        middle_body = _previous(body)
+        first_is_strong = first_body >= self.star_first_body_min * first_range
+        middle_is_small = middle_body <= self.star_middle_body_max * first_body
+        first_midpoint = (first_open + first_close) / 2.0
+
+        with np.errstate(invalid='ignore'):
+            return {
+                'bull_engulfing': (is_bullish & (prev_close < prev_open) &
+                                   (close > prev_open) & (open_ < prev_close)),
+                'bear_engulfing': (is_bearish & (prev_close > prev_open) &
+                                   (open_ > prev_close) & (close < prev_open)),
+                'hammer': hammer,
+                'shooting_star': shooting_star,
+                'inside_bar': (high < prev_high) & (low > prev_low),
+                'outside_bar': (high > prev_high) & (low < prev_low),
+                # A candle without any range is a four-price doji
+                'doji': body <= self.doji_body_max * total_range,
+                'morning_star': ((first_close < first_open) & first_is_strong & middle_is_small &
+                                 is_bullish & (close > first_midpoint)),
+                'evening_star': ((first_close > first_open) & first_is_strong & middle_is_small &
+                                 is_bearish & (close < first_midpoint)),
+            }
+
+    def detect_frame(self, df):
+        """detect() over the OHLC columns of a DataFrame."""
+        return self.detect(df['open'].to_numpy(dtype=float), df['high'].to_numpy(dtype=float),
+                           df['low'].to_numpy(dtype=float), df['close'].to_numpy(dtype=float))
+
+    def at(self, df, index=-2):
+        """
+        The patterns of a single bar, computed from it and the two before it.
+
+        :param index: Positional index of the bar in df (the signal candle by default).
+        :return: Dict mapping each name in PATTERNS to a bool.
+        """
+        end = index % len(df) + 1
+        rows = slice(max(0, end - 3), end)
+        patterns = self.detect(*(df[col].to_numpy(dtype=float)[rows] for col in ('open', 'high', 'low', 'close')))
+        return {name: bool(flags[-1]) for name, flags in patterns.items()}
+
+
+def confirmation(patterns, confirmations):
+    """
+    Name of the first entry confirmation found in the patterns of one bar
+    (see BULLISH_CONFIRMATIONS / BEARISH_CONFIRMATIONS), or None.
+    """
+    for name, pattern in confirmations:
+        if patterns[pattern]:
+            return name
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count candlestick patterns in an OHLC CSV file.")
+    parser.add_argument("csv", help="CSV with open/high/low/close columns.")
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.csv)
+    detector = CandlePatternDetector()
+    started = time.perf_counter()
+    found = detector.detect_frame(data)
+    elapsed = time.perf_counter() - started
+    log.info(f"{len(data)} bars scanned in {elapsed * 1000:.1f} ms:")
+    for name in PATTERNS:
+        log.info(f"  {name}: {int(found[name].sum())}")
@@ -0,0 +1,126 @@
+from collections import deque, namedtuple
+import pandas as pd
+
+# Evaluations kept by default: a bit over three days of M5 bars
+DEFAULT_CAPACITY = 1000
+
+# One record per evaluated signal candle. A condition is True/False, or None
+# when its filter is disabled in the config (a skipped filter always passes).
+DecisionRecord = namedtuple('DecisionRecord', [
+    'time', 'open', 'high', 'low', 'close',
+    'ema_fast', 'ema_slow', 'rsi', 'adx',
+    'is_trending',
+    'is_uptrend', 'is_long_pullback', 'is_bull_pattern', 'is_long_rsi_ok', 'is_htf_long_ok', 'bull_pattern',
+    'is_downtrend', 'is_short_pullback', 'is_bear_pattern', 'is_short_rsi_ok', 'is_htf_short_ok',
+    'bear_pattern',
+    'signal',
+])
+
+LONG_CONDITIONS = ('is_trending', 'is_uptrend', 'is_long_pullback', 'is_bull_pattern', 'is_long_rsi_ok',
+                   'is_htf_long_ok')
+SHORT_CONDITIONS = ('is_trending', 'is_downtrend', 'is_short_pullback', 'is_bear_pattern', 'is_short_rsi_ok',
+                    'is_htf_short_ok')
+
+_CONDITION_LABELS = {
+    'is_trending': "1. Trend Strength Filter (ADX > threshold)",
+    'is_uptrend': "2. Trend Confirmation (EMA_Fast > EMA_Slow AND Close > EMA_Slow)",
+    'is_downtrend': "2. Trend Confirmation (EMA_Fast < EMA_Slow AND Close < EMA_Slow)",
+    'is_long_pullback': "3. Pullback Confirmation (Low <= EMA_Fast)",
+    'is_short_pullback': "3. Pullback Confirmation (High >= EMA_Fast)",
+    'is_bull_pattern': "4. Candle Pattern Confirmation (Bullish Engulfing/Pinbar)",
+    'is_bear_pattern': "4. Candle Pattern Confirmation (Bearish Engulfing/Pinbar)",
+    'is_long_rsi_ok': "5. RSI Filter (RSI < overbought)",
+    'is_short_rsi_ok': "5. RSI Filter (RSI > oversold)",
+    'is_htf_long_ok': "6. Higher Timeframe Trend (every timeframe up)",
+    'is_htf_short_ok': "6. Higher Timeframe Trend (every timeframe down)",
+}
+
+
+def passes(record, conditions):
+    """True when every condition is met or skipped."""
+    return all(getattr(record, c) is not False for c in conditions)
+
+
+def render(record):
+    """
+    Multi-line text of a decision, in the layout of the former per-evaluation logs.
+    """
+    lines = [
+        f"Signal Candle ({record.time}): O={record.open:.5f}, H={record.high:.5f}, "
+        f"L={record.low:.5f}, C={record.close:.5f}",
+        f"Indicators: EMA_Fast={record.ema_fast:.5f}, EMA_Slow={record.ema_slow:.5f}, "
+        f"RSI={record.rsi:.2f}, ADX={record.adx:.2f}",
+    ]
+    for side, conditions, pattern in (("LONG", LONG_CONDITIONS, record.bull_pattern),
+                                      ("SHORT", SHORT_CONDITIONS, record.bear_pattern)):
+        lines.append(f"--- {side} conditions ---")
+        for condition in conditions:
+            value = getattr(record, condition)
+            text = "SKIPPED (disabled in config)" if value is None else str(value)
+            if condition in ('is_bull_pattern', 'is_bear_pattern') and pattern:
+                text += f" [{pattern}]"
+            lines.append(f"{_CONDITION_LABELS[condition]}: {text}")
+    lines.append(f">>>> {record.signal} SIGNAL <<<<" if record.signal else "No entry signal.")
+    return "\n".join(lines)
+
+
+def summarize(record):
+    """One-line form of a decision: the signal, or the conditions that failed."""
+    if record.signal:
+        return f"{record.time}: {record.signal}"
+    failed_long = [c for c in LONG_CONDITIONS if getattr(record, c) is False]
+    failed_short = [c for c in SHORT_CONDITIONS if getattr(record, c) is False]
+    return (f"{record.time}: no signal (long failed {', '.join(failed_long)}; "
+            f"short failed {', '.join(failed_short)})")
+
+
+def record_from_history(history, index):
+    """
+    Builds the DecisionRecord of one row of a run_logic_on_history result.
+
+    :param history: The DataFrame returned by run_logic_on_history.
+    :param index: Positional row index of the signal candle.
+    """
+    row = history.iloc[index]
+    adx_col = next(c for c in history.columns if c.startswith('ADX_'))
+    values = {field: row[field] for field in DecisionRecord._fields if field in history.columns}
+    values['adx'] = row[adx_col]
+    for condition in set(LONG_CONDITIONS + SHORT_CONDITIONS):
+        values[condition] = bool(row[condition])
+    values.setdefault('bull_pattern', None)
+    values.setdefault('bear_pattern', None)
+    return DecisionRecord(**values)
+
+
+class DecisionTrace:
+    """
+    Bounded ring buffer of the latest DecisionRecords. Recording one is a
+    tuple append; turning them into text only happens when asked for.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.records = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.records)
+
+    def append(self, record):
+        self.records.append(record)
+
+    def clear(self):
+        self.records.clear()
+
+    def last(self):
+        """The most recent record, or None."""
+        return self.records[-1] if self.records else None
+
+    def find(self, time):
+        """The latest record of the signal candle at `time`, or None if it is not kept."""
+        time = pd.Timestamp(time)
+        for record in reversed(self.records):
+            if pd.Timestamp(record.time) == time:
+                return record
+        return None
+
+    def to_frame(self):
+        """All kept records as a DataFrame, oldest first."""
+        return pd.DataFrame(list(self.records), columns=DecisionRecord._fields)
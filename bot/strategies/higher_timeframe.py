@@ -0,0 +1,132 @@
+import math
+import numpy as np
+from utils.bar_scheduler import TIMEFRAME_SECONDS
+from storage.resampler import BarResampler, resample_bars, align_to_base
+
+# Completed higher-timeframe bars per slow EMA period used to warm the trend
+WARMUP_PERIODS = 4
+
+
+class HigherTimeframeTrend:
+    """
+    EMA fast/slow trend of one higher timeframe, built from the base bars the
+    strategy already has: a BarResampler turns them into higher-timeframe bars
+    and each completed one advances the EMAs. No extra terminal calls.
+    """
+    def __init__(self, name, base_seconds, ema_fast_period, ema_slow_period):
+        self.name = name
+        self.resampler = BarResampler(TIMEFRAME_SECONDS[name], base_seconds)
+        self.ema_fast_period = ema_fast_period
+        self.ema_slow_period = ema_slow_period
+        self.reset()
+
+    def reset(self):
+        self.resampler.reset()
+        self.ema_fast = math.nan
+        self.ema_slow = math.nan
+        self.close = math.nan
+        self.count = 0
+
+    def apply(self, bar):
+        """Adds one closed base bar (anything with time/open/high/low/close)."""
+        for htf_bar in self.resampler.update(bar.time, bar.open, bar.high, bar.low, bar.close):
+            alpha_fast = 2.0 / (self.ema_fast_period + 1.0)
+            alpha_slow = 2.0 / (self.ema_slow_period + 1.0)
+            if self.count == 0:
+                self.ema_fast = self.ema_slow = htf_bar.close
+            else:
+                self.ema_fast = (1.0 - alpha_fast) * self.ema_fast + alpha_fast * htf_bar.close
+                self.ema_slow = (1.0 - alpha_slow) * self.ema_slow + alpha_slow * htf_bar.close
+            self.close = htf_bar.close
+            self.count += 1
+
+    @property
+    def direction(self):
+        """
+        1 for an uptrend (EMA_Fast > EMA_Slow and Close > EMA_Slow on the last
+        completed bar), -1 for a downtrend, 0 otherwise or before EMASlow_Period
+        bars have completed.
+        """
+        if self.count < self.ema_slow_period:
+            return 0
+        return int(_direction(self.ema_fast, self.ema_slow, self.close))
+
+    def history_direction(self, df, base_seconds):
+        """
+        Vectorized direction as known at the close of every base bar of df,
+        from that history alone (the trend seeded at its first bar).
+        """
+        bars = resample_bars(df, TIMEFRAME_SECONDS[self.name], base_seconds)
+        closes = bars['close'].astype(float)
+        ema_fast = closes.ewm(span=self.ema_fast_period, adjust=False).mean().to_numpy()
+        ema_slow = closes.ewm(span=self.ema_slow_period, adjust=False).mean().to_numpy()
+        direction = _direction(ema_fast, ema_slow, closes.to_numpy())
+        direction = np.where(np.arange(len(bars)) + 1 >= self.ema_slow_period, direction, 0)
+        return np.nan_to_num(align_to_base(bars, direction, len(df))).astype(int)
+
+
+def _direction(ema_fast, ema_slow, close):
+    up = (ema_fast > ema_slow) & (close > ema_slow)
+    down = (ema_fast < ema_slow) & (close < ema_slow)
+    return np.where(up, 1, np.where(down, -1, 0))
+
+
+class HigherTimeframeFilter:
+    """
+    The trends of every timeframe in Strategy.HigherTimeframe.Timeframes. A
+    long entry needs all of them up, a short one all of them down.
+    """
+    def __init__(self, section, base_timeframe="M5"):
+        """
+        :param section: The Strategy.HigherTimeframe config section (Timeframes,
+                        EMAFast_Period, EMASlow_Period).
+        :param base_timeframe: Timeframe of the bars fed to apply().
+        """
+        self.base_seconds = TIMEFRAME_SECONDS[base_timeframe]
+        self.trends = [HigherTimeframeTrend(name, self.base_seconds, section.EMAFast_Period,
+                                            section.EMASlow_Period)
+                       for name in section.Timeframes]
+        self.last_time = None   # Last bar applied by follow()
+
+    def reset(self):
+        for trend in self.trends:
+            trend.reset()
+        self.last_time = None
+
+    def apply(self, bar):
+        for trend in self.trends:
+            trend.apply(bar)
+
+    def follow(self, df):
+        """
+        Brings the trends up to the last bar of df, a window of closed base bars
+        that moves forward between calls: only the bars newer than the last one
+        followed are applied. A window that no longer contains that bar (the
+        first one, or after a gap) reseeds the trends from its own bars.
+        """
+        times = df['time']
+        if self.last_time is None or not (times == self.last_time).any():
+            self.reset()
+            new = df
+        else:
+            new = df[times > self.last_time]
+        for bar in new[['time', 'open', 'high', 'low', 'close']].itertuples(index=False):
+            self.apply(bar)
+        if len(df):
+            self.last_time = times.iloc[-1]
+
+    def warmup_bars(self):
+        """Base bars needed for every trend to be known and its EMA seed decayed."""
+        return max(TIMEFRAME_SECONDS[t.name] // self.base_seconds * t.ema_slow_period * WARMUP_PERIODS
+                   for t in self.trends)
+
+    def direction(self):
+        """1 when every timeframe is up, -1 when every one is down, else 0."""
+        directions = {trend.direction for trend in self.trends}
+        return directions.pop() if len(directions) == 1 else 0
+
+    def history_direction(self, df):
+        """The combined direction at the close of every base bar of df (see direction())."""
+        directions = np.array([trend.history_direction(df, self.base_seconds) for trend in self.trends])
+        agree = (directions == directions[0]).all(axis=0)
+        return np.where(agree, directions[0], 0)
@@ -0,0 +1,198 @@
+from collections import deque, namedtuple
+import math
+import pandas as pd
+
+_Bar = namedtuple('_Bar', ['time', 'open', 'high', 'low', 'close'])
+
+
+def _bars(df):
+    # Plain Python rows: much cheaper than itertuples/boolean indexing for a few bars
+    return map(_Bar._make, zip(*(df[col].tolist() for col in _Bar._fields)))
+
+
+class _Rma:
+    """
+    Wilder's moving average as pandas_ta computes it (ewm with adjust=True and
+    min_periods=length), updated one observation at a time.
+    """
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.total = 0.0
+        self.weight = 0.0
+        self.count = 0
+
+    def update(self, value):
+        # A missing value still ages the earlier ones, like ewm(ignore_na=False)
+        self.total *= self.decay
+        self.weight *= self.decay
+        if not math.isnan(value):
+            self.total += value
+            self.weight += 1.0
+            self.count += 1
+
+    @property
+    def value(self):
+        if self.count < self.length:
+            return math.nan
+        return self.total / self.weight
+
+
+class IndicatorState:
+    """
+    Keeps the strategy's indicators (EMA fast/slow, RSI, ATR, +DI/-DI and ADX)
+    between ticks and advances them with only the newly closed bar(s), so a
+    tick costs O(1) instead of recomputing the whole window.
+
+    The values are the plain recursions seeded once at the first bar, i.e. the
+    same as XauUsdM5Strategy.run_logic_on_history(df, lookback=0) over the
+    seed history.
+    """
+    # Closed bars kept with their indicator values, enough for the three-candle patterns
+    KEEP_BARS = 3
+
+    def __init__(self, ema_fast_period, ema_slow_period, rsi_period, adx_period, higher_timeframes=None):
+        """
+        :param higher_timeframes: Optional HigherTimeframeFilter fed every applied
+                                  bar, so its trends follow the same stream.
+        """
+        self.ema_fast_period = ema_fast_period
+        self.ema_slow_period = ema_slow_period
+        self.rsi_period = rsi_period
+        self.adx_period = adx_period
+        self.higher_timeframes = higher_timeframes
+        self.reset()
+
+    def reset(self):
+        """Drops all state; the next update() will ask for a reseed."""
+        self.last_time = None
+        self.bars_seen = 0
+        self.ema_fast = math.nan
+        self.ema_slow = math.nan
+        self.gains = deque(maxlen=self.rsi_period)
+        self.losses = deque(maxlen=self.rsi_period)
+        self.atr = _Rma(self.adx_period)
+        self.plus_dm = _Rma(self.adx_period)
+        self.minus_dm = _Rma(self.adx_period)
+        self.adx = _Rma(self.adx_period)
+        self.prev_bar = None
+        self.rows = deque(maxlen=self.KEEP_BARS)
+        if self.higher_timeframes is not None:
+            self.higher_timeframes.reset()
+
+    @property
+    def is_warm(self):
+        return self.last_time is not None
+
+    def seed(self, df):
+        """
+        Rebuilds the state from scratch out of a history of closed bars.
+        """
+        self.reset()
+        for bar in _bars(df):
+            self._apply(bar)
+
+    def update(self, df):
+        """
+        Applies the closed bars of df that are newer than the last one seen.
+
+        :param df: Recent closed bars, oldest first. It must still contain the
+                   last bar applied so continuity can be checked.
+        :return: The number of bars applied, or None when the state is cold or
+                 df does not continue it (data gap, restart, rewritten history)
+                 and a reseed is needed.
+        """
+        if not self.is_warm or df.empty:
+            return None
+
+        bars = list(_bars(df))
+        last_time = self.last_time
+        if not any(bar.time == last_time for bar in bars):
+            return None
+
+        applied = 0
+        for bar in bars:
+            if bar.time > last_time:
+                self._apply(bar)
+                applied += 1
+        return applied
+
+    def _apply(self, bar):
+        alpha_fast = 2.0 / (self.ema_fast_period + 1.0)
+        alpha_slow = 2.0 / (self.ema_slow_period + 1.0)
+        prev = self.prev_bar
+
+        if prev is None:
+            self.ema_fast = bar.close
+            self.ema_slow = bar.close
+        else:
+            self.ema_fast = (1.0 - alpha_fast) * self.ema_fast + alpha_fast * bar.close
+            self.ema_slow = (1.0 - alpha_slow) * self.ema_slow + alpha_slow * bar.close
+
+            delta = bar.close - prev.close
+            self.gains.append(delta if delta > 0 else 0.0)
+            self.losses.append(-delta if delta < 0 else 0.0)
+
+            true_range = max(bar.high - bar.low, abs(bar.high - prev.close), abs(prev.close - bar.low))
+            up = bar.high - prev.high
+            down = prev.low - bar.low
+            self.atr.update(true_range)
+            self.plus_dm.update(up if up > down and up > 0 else 0.0)
+            self.minus_dm.update(down if down > up and down > 0 else 0.0)
+
+            plus_di, minus_di = self._directional_indexes()
+            if plus_di + minus_di > 0:
+                self.adx.update(100.0 * abs(plus_di - minus_di) / (plus_di + minus_di))
+            else:
+                self.adx.update(math.nan)
+
+        if self.higher_timeframes is not None:
+            self.higher_timeframes.apply(bar)
+
+        self.prev_bar = bar
+        self.last_time = bar.time
+        self.bars_seen += 1
+        self.rows.append({
+            'time': bar.time, 'open': bar.open, 'high': bar.high,
+            'low': bar.low, 'close': bar.close, **self.values(),
+        })
+
+    def _directional_indexes(self):
+        atr = self.atr.value
+        if math.isnan(atr) or atr == 0:
+            return math.nan, math.nan
+        return 100.0 * self.plus_dm.value / atr, 100.0 * self.minus_dm.value / atr
+
+    def _rsi(self):
+        if len(self.gains) < self.rsi_period:
+            return math.nan
+        gain = sum(self.gains) / self.rsi_period
+        loss = sum(self.losses) / self.rsi_period
+        if loss == 0:
+            return math.nan if gain == 0 else 100.0
+        return 100.0 - (100.0 / (1.0 + gain / loss))
+
+    def values(self):
+        """Current indicator values, keyed like the columns of _calculate_indicators."""
+        plus_di, minus_di = self._directional_indexes()
+        return {
+            'ema_fast': self.ema_fast,
+            'ema_slow': self.ema_slow,
+            'rsi': self._rsi(),
+            'atr': self.atr.value,
+            f"ADX_{self.adx_period}": self.adx.value,
+            f"DMP_{self.adx_period}": plus_di,
+            f"DMN_{self.adx_period}": minus_di,
+        }
+
+    def to_frame(self, forming_bar=None):
+        """
+        The last closed bars with their indicator values, shaped like the
+        DataFrame run_logic_on_data evaluates (signal candle at iloc[-2]).
+
+        :param forming_bar: The current, still-forming bar to append last.
+        """
+        rows = list(self.rows)
+        if forming_bar is not None:
+            rows.append({col: forming_bar[col] for col in ('time', 'open', 'high', 'low', 'close')})
+        return pd.DataFrame(rows)
@@ -1,231 +1,440 @@
+import logging
 from utils.logger import log
 from config import settings
-# We will need pandas and a library for indicators, e.g., pandas_ta
-# For now, we just lay out the structure.
+from strategies.indicator_state import IndicatorState
+from strategies.higher_timeframe import HigherTimeframeFilter
+from strategies.candle_patterns import (CandlePatternDetector, confirmation,
+                                        BULLISH_CONFIRMATIONS, BEARISH_CONFIRMATIONS)
+from utils.metrics import indicator_update_seconds, signals_evaluated, signals_fired
+from utils.profiling import section
+from strategies.decision_trace import DecisionRecord, DecisionTrace, render as render_decision, summarize
+from indicators import kernels
+import numpy as np
 import pandas as pd 
-import pandas_ta as ta
+
+
+# Bars read on a warm tick: the forming bar plus a few closed ones, so a
+# missed tick or two is still applied incrementally instead of reseeding
+# (the connector's bar buffer only transfers the bars that changed)
+DELTA_FETCH_BARS = 5
+
+# Rows replayed per block by the windowed indicators, small enough to stay in cache
+_WINDOW_CHUNK_ROWS = 1 << 14
+
+
+def _windowed_ema(values, span, window):
+    """
+    EMA (adjust=False) of every bar computed only over the `window` bars ending
+    at it, i.e. what _calculate_indicators sees on a slice of that length.
+    Bars with a shorter history keep the EMA seeded at the first bar.
+    """
+    out = kernels.ema(values, span)
+    alpha = 2.0 / (span + 1.0)
+    for start in range(window - 1, len(values), _WINDOW_CHUNK_ROWS):
+        rows = min(_WINDOW_CHUNK_ROWS, len(values) - start)
+        first = start - window + 1
+        ema = values[first:first + rows].copy()
+        for j in range(1, window):
+            ema *= 1.0 - alpha
+            ema += alpha * values[first + j:first + j + rows]
+        out[start:start + rows] = ema
+    return out
+
+
+def _windowed_adx(high, low, close, length, window):
+    """
+    ADX, +DI and -DI of every bar computed the way pandas_ta's adx() does on a
+    slice of `window` bars ending at it: Wilder RMA (adjust=True, min_periods=length)
+    with the first bar of the slice lacking a previous close. Bars with a shorter
+    history are left as NaN for the caller to fill.
+    """
+    adx = np.full(len(close), np.nan)
+    dmp = np.full(len(close), np.nan)
+    dmn = np.full(len(close), np.nan)
+
+    # Index 0 wraps around but is never read: every slice starts at offset 1
+    prev_close = np.roll(close, 1)
+    tr = np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(prev_close - low)])
+    up = high - np.roll(high, 1)
+    dn = np.roll(low, 1) - low
+    pos = np.where((up > dn) & (up > 0), up, 0.0)
+    neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+    decay = 1.0 - 1.0 / length
+
+    for start in range(window - 1, len(close), _WINDOW_CHUNK_ROWS):
+        rows = min(_WINDOW_CHUNK_ROWS, len(close) - start)
+        first = start - window + 1
+        # ATR, +DM and -DM share the RMA denominator, which cancels out of DI and DX
+        atr_sum = np.zeros(rows)
+        pos_sum = np.zeros(rows)
+        neg_sum = np.zeros(rows)
+        adx_sum = np.zeros(rows)
+        adx_weight = np.zeros(rows)
+        adx_count = np.zeros(rows, dtype=np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for j in range(1, window):
+                bars = slice(first + j, first + j + rows)
+                atr_sum = atr_sum * decay + tr[bars]
+                pos_sum = pos_sum * decay + pos[bars]
+                neg_sum = neg_sum * decay + neg[bars]
+                if j >= length:
+                    dx = 100.0 * np.abs(pos_sum - neg_sum) / (pos_sum + neg_sum)
+                    has_dx = ~np.isnan(dx)
+                    adx_sum = adx_sum * decay + np.where(has_dx, dx, 0.0)
+                    adx_weight = adx_weight * decay + has_dx
+                    adx_count += has_dx
+            out = slice(start, start + rows)
+            adx[out] = np.where(adx_count >= length, adx_sum / adx_weight, np.nan)
+            if window - 1 >= length:
+                dmp[out] = 100.0 * pos_sum / atr_sum
+                dmn[out] = 100.0 * neg_sum / atr_sum
+    return adx, dmp, dmn
+
+
+def _indicator_settings(config):
+    # What the incremental indicator state is built from
+    strategy = config.Strategy
+    htf = getattr(strategy, "HigherTimeframe", None)
+    return (strategy.EMAFast_Period, strategy.EMASlow_Period, strategy.RSI_Period, strategy.ADX_Period,
+            htf.to_dict() if htf is not None else None, config.Trading.Timeframe)
+
 
 class XauUsdM5Strategy:
     """
     Implements the XAUUSD M5 Trend-Following strategy.
     """
-    def __init__(self, mt5_connector):
+    def __init__(self, mt5_connector, config=None):
+        """
+        :param config: Settings to trade with (Trading, Strategy and CandlePatterns
+                       sections); the global settings by default.
+        """
         self.mt5 = mt5_connector
-        self.symbol = settings.Trading.Symbol
+        self.config = None
+        self.indicators = None
+        config = config or settings
+        self.symbol = config.Trading.Symbol
         self.timeframe = "M5" # Placeholder, will need to be mapped to mt5 enum
+        # Why each recently evaluated candle did or did not signal
+        self.trace = DecisionTrace()
+        self.configure(config)
+
+    def configure(self, config):
+        """
+        Binds the strategy to its settings: a compiled snapshot (see
+        config.compile_config) or a Config. Called again between two bars with
+        a reloaded snapshot; the indicator state is only rebuilt, and reseeded
+        on the next tick, when its periods or the higher-timeframe filter change.
+        """
+        previous = self.config
+        self.config = config
+        strategy = config.Strategy
+        htf = getattr(strategy, "HigherTimeframe", None)
+        if previous is None or _indicator_settings(previous) != _indicator_settings(config):
+            if previous is not None:
+                log.info("Indicator settings changed. The indicator state will be reseeded.")
+            # Optional trend filter on higher timeframes resampled from the same bars
+            self.higher_timeframes = None
+            self.window_higher_timeframes = None
+            if htf is not None and htf.Enabled:
+                self.higher_timeframes = HigherTimeframeFilter(htf, config.Trading.Timeframe)
+                # run_logic_on_data's windows move on their own, apart from the live state
+                self.window_higher_timeframes = HigherTimeframeFilter(htf, config.Trading.Timeframe)
+            self.indicators = IndicatorState(
+                ema_fast_period=strategy.EMAFast_Period,
+                ema_slow_period=strategy.EMASlow_Period,
+                rsi_period=strategy.RSI_Period,
+                adx_period=strategy.ADX_Period,
+                higher_timeframes=self.higher_timeframes
+            )
+        self.patterns = CandlePatternDetector(config.CandlePatterns)
 
     def _calculate_indicators(self, df):
         """
         Calculate and attach all required indicators to the DataFrame.
         """
-        log.info("Calculating indicators...")
-        df['ema_fast'] = df['close'].ewm(span=settings.Strategy.EMAFast_Period, adjust=False).mean()
-        df['ema_slow'] = df['close'].ewm(span=settings.Strategy.EMASlow_Period, adjust=False).mean()
-        
-        # RSI Calculation
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=settings.Strategy.RSI_Period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=settings.Strategy.RSI_Period).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-
-        # ADX Calculation using pandas_ta
-        adx_period = settings.Strategy.ADX_Period
-        df.ta.adx(length=adx_period, append=True)
-        # pandas_ta appends columns like 'ADX_14', let's rename for consistency if needed, but direct access is fine
-        
-        log.info("Indicators calculated.")
-        return df
+        log.debug("Calculating indicators...")
+        strategy = self.config.Strategy
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        df['ema_fast'] = kernels.ema(close, strategy.EMAFast_Period)
+        df['ema_slow'] = kernels.ema(close, strategy.EMASlow_Period)
+
+        # RSI on simple averages of the gains and losses, not Wilder's smoothing
+        df['rsi'] = kernels.rsi(close, strategy.RSI_Period, wilder=False)
 
-    def _get_candle_properties(self, candle):
-        """Helper function to get candle properties."""
-        body_size = abs(candle['close'] - candle['open'])
-        total_range = candle['high'] - candle['low']
-        if total_range == 0: # Avoid division by zero for doji-like candles
-            return 0, 0, 0
-        
-        upper_wick = candle['high'] - max(candle['open'], candle['close'])
-        lower_wick = min(candle['open'], candle['close']) - candle['low']
-        return body_size, upper_wick, lower_wick
+        # ADX with +DI / -DI, in the columns pandas_ta's adx() used to append (ADX_14, DMP_14, DMN_14)
+        adx_period = strategy.ADX_Period
+        adx, plus_di, minus_di = kernels.adx(high, low, close, adx_period)
+        df[f"ADX_{adx_period}"] = adx
+        df[f"DMP_{adx_period}"] = plus_di
+        df[f"DMN_{adx_period}"] = minus_di
+
+        log.debug("Indicators calculated.")
+        return df
 
     def _is_bullish_signal(self, df, index=-2):
         """
         Checks for bullish confirmation candle patterns on the specified candle.
         """
-        log.info(f"Checking for bullish signal on candle at {df['time'].iloc[index]}")
-        
-        candle = df.iloc[index]
-        prev_candle = df.iloc[index - 1]
-
-        is_bullish = candle['close'] > candle['open']
-        is_prev_bearish = prev_candle['close'] < prev_candle['open']
-
-        # 1. Bullish Engulfing
-        is_engulfing = (is_bullish and is_prev_bearish and
-                        candle['close'] > prev_candle['open'] and 
-                        candle['open'] < prev_candle['close'])
-        if is_engulfing:
-            log.info(f"Bullish Engulfing pattern found at {candle['time']}.")
-            return True
-
-        # 2. Bullish Pin Bar (Hammer)
-        body_size, upper_wick, lower_wick = self._get_candle_properties(candle)
-        total_range = candle['high'] - candle['low']
-        
-        is_pin_bar = (total_range > 0 and 
-                      body_size < settings.CandlePatterns.PinBar.BodyMaxPercent * total_range and
-                      lower_wick > settings.CandlePatterns.PinBar.WickMinPercent * total_range and
-                      upper_wick < settings.CandlePatterns.PinBar.OppositeWickMaxPercent * total_range)
-        if is_pin_bar:
-            log.info(f"Bullish Pin Bar (Hammer) found at {candle['time']}.")
-            return True
-
-        return False
+        return confirmation(self.patterns.at(df, index), BULLISH_CONFIRMATIONS) is not None
 
     def _is_bearish_signal(self, df, index=-2):
         """
         Checks for bearish confirmation candle patterns on the specified candle.
         """
-        log.info(f"Checking for bearish signal on candle at {df['time'].iloc[index]}")
-
-        candle = df.iloc[index]
-        prev_candle = df.iloc[index - 1]
-
-        is_bearish = candle['close'] < candle['open']
-        is_prev_bullish = prev_candle['close'] > prev_candle['open']
-
-        # 1. Bearish Engulfing
-        is_engulfing = (is_bearish and is_prev_bullish and
-                        candle['open'] > prev_candle['close'] and
-                        candle['close'] < prev_candle['open'])
-        if is_engulfing:
-            log.info(f"Bearish Engulfing pattern found at {candle['time']}.")
-            return True
-        
-        # 2. Bearish Pin Bar (Shooting Star)
-        body_size, upper_wick, lower_wick = self._get_candle_properties(candle)
-        total_range = candle['high'] - candle['low']
-
-        is_pin_bar = (total_range > 0 and
-                      body_size < settings.CandlePatterns.PinBar.BodyMaxPercent * total_range and
-                      upper_wick > settings.CandlePatterns.PinBar.WickMinPercent * total_range and
-                      lower_wick < settings.CandlePatterns.PinBar.OppositeWickMaxPercent * total_range)
-        if is_pin_bar:
-            log.info(f"Bearish Pin Bar (Shooting Star) found at {candle['time']}.")
-            return True
-            
-        return False
+        return confirmation(self.patterns.at(df, index), BEARISH_CONFIRMATIONS) is not None
 
+    @section
     def run_logic_on_data(self, df):
         """
         Runs the core entry signal logic on a given DataFrame.
         This is separated to make local backtesting easier.
+
+        The higher-timeframe trends need far more history than the window
+        holds, so they are not recomputed from it: they follow the windows of
+        successive calls, like the live state follows the bars, and match the
+        vectorized direction from the first window on.
         """
         df = self._calculate_indicators(df)
-        
+        htf_direction = None
+        if self.window_higher_timeframes is not None and len(df) >= 2:
+            self.window_higher_timeframes.follow(df.iloc[:-1])
+            htf_direction = self.window_higher_timeframes.direction()
+        return self._evaluate_entry(df, htf_direction)
+
+    def _evaluate_entry(self, df, htf_direction=None):
+        """
+        Evaluates the entry conditions on the last closed candle (df.iloc[-2])
+        of a DataFrame that already carries the indicator columns.
+
+        :param htf_direction: The higher-timeframe trend at that candle's close
+                              (1, -1 or 0); None when the filter is disabled.
+
+        Nothing is formatted here: the outcome is appended to self.trace as a
+        DecisionRecord and only rendered to the log at DEBUG level.
+        """
         # Not enough data after indicator calculation (e.g. for rolling means)
         if len(df) < 2:
             return None, None
 
         prev_candle_idx = -2
         signal_candle = df.iloc[prev_candle_idx]
-        adx_col = f"ADX_{settings.Strategy.ADX_Period}"
+        strategy = self.config.Strategy
+        ema_fast = signal_candle['ema_fast']
+        ema_slow = signal_candle['ema_slow']
+        rsi = signal_candle['rsi']
+        adx = signal_candle[f"ADX_{strategy.ADX_Period}"]
+        close = signal_candle['close']
 
-        # --- Enhanced Logging for Traceability ---
-        log.info(f"Signal Candle ({signal_candle['time']}): O={signal_candle['open']:.5f}, H={signal_candle['high']:.5f}, L={signal_candle['low']:.5f}, C={signal_candle['close']:.5f}")
-        log.info(f"Indicators: EMA_Fast={df['ema_fast'].iloc[prev_candle_idx]:.5f}, EMA_Slow={df['ema_slow'].iloc[prev_candle_idx]:.5f}, RSI={df['rsi'].iloc[prev_candle_idx]:.2f}, ADX={df[adx_col].iloc[prev_candle_idx]:.2f}")
+        # Disabled filters are recorded as None and always pass
+        # 1. ADX Filter, shared by both directions
+        is_trending = bool(adx > strategy.ADX_Threshold) if strategy.EnableADXFilter else None
+        # 2. Trend Confirmation
+        is_uptrend = bool(ema_fast > ema_slow and close > ema_slow)
+        is_downtrend = bool(ema_fast < ema_slow and close < ema_slow)
+        # 3. Pullback Confirmation
+        is_long_pullback = bool(signal_candle['low'] <= ema_fast)
+        is_short_pullback = bool(signal_candle['high'] >= ema_fast)
+        # 4. Candle Pattern Filter
+        bull_pattern = bear_pattern = None
+        is_bull_pattern = is_bear_pattern = None
+        if strategy.EnableCandlePatternFilter:
+            patterns = self.patterns.at(df, prev_candle_idx)
+            bull_pattern = confirmation(patterns, BULLISH_CONFIRMATIONS)
+            bear_pattern = confirmation(patterns, BEARISH_CONFIRMATIONS)
+            is_bull_pattern = bull_pattern is not None
+            is_bear_pattern = bear_pattern is not None
+        # 5. RSI Filter
+        is_long_rsi_ok = bool(rsi < strategy.RSI_Overbought) if strategy.EnableRSIFilter else None
+        is_short_rsi_ok = bool(rsi > strategy.RSI_Oversold) if strategy.EnableRSIFilter else None
+        # 6. Higher Timeframe Trend Filter
+        is_htf_long_ok = htf_direction == 1 if htf_direction is not None else None
+        is_htf_short_ok = htf_direction == -1 if htf_direction is not None else None
 
-        # --- Check for Long Entry ---
-        log.info("--- Checking LONG conditions ---")
+        signal = None
+        if (is_trending is not False and is_uptrend and is_long_pullback and
+                is_bull_pattern is not False and is_long_rsi_ok is not False and
+                is_htf_long_ok is not False):
+            signal = "BUY"
+        elif (is_trending is not False and is_downtrend and is_short_pullback and
+                is_bear_pattern is not False and is_short_rsi_ok is not False and
+                is_htf_short_ok is not False):
+            signal = "SELL"
 
-        # 1. ADX Filter
-        if settings.Strategy.EnableADXFilter:
-            is_trending = df[adx_col].iloc[prev_candle_idx] > settings.Strategy.ADX_Threshold
-            log.info(f"1. Trend Strength Filter (ADX > {settings.Strategy.ADX_Threshold}): {is_trending}")
-        else:
-            is_trending = True
-            log.info("1. Trend Strength Filter: SKIPPED (disabled in config)")
+        record = DecisionRecord(
+            time=signal_candle['time'], open=signal_candle['open'], high=signal_candle['high'],
+            low=signal_candle['low'], close=close, ema_fast=ema_fast, ema_slow=ema_slow, rsi=rsi,
+            adx=adx, is_trending=is_trending, is_uptrend=is_uptrend,
+            is_long_pullback=is_long_pullback, is_bull_pattern=is_bull_pattern,
+            is_long_rsi_ok=is_long_rsi_ok, is_htf_long_ok=is_htf_long_ok, bull_pattern=bull_pattern,
+            is_downtrend=is_downtrend, is_short_pullback=is_short_pullback,
+            is_bear_pattern=is_bear_pattern, is_short_rsi_ok=is_short_rsi_ok,
+            is_htf_short_ok=is_htf_short_ok, bear_pattern=bear_pattern, signal=signal
+        )
+        self.trace.append(record)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(render_decision(record))
 
-        # 2. Trend Confirmation
-        is_uptrend = (df['ema_fast'].iloc[prev_candle_idx] > df['ema_slow'].iloc[prev_candle_idx] and
-                      df['close'].iloc[prev_candle_idx] > df['ema_slow'].iloc[prev_candle_idx])
-        log.info(f"2. Trend Confirmation (EMA_Fast > EMA_Slow AND Close > EMA_Slow): {is_uptrend}")
-        
-        # 3. Pullback Confirmation
-        is_pullback = signal_candle['low'] <= df['ema_fast'].iloc[prev_candle_idx]
-        log.info(f"3. Pullback Confirmation (Low <= EMA_Fast): {is_pullback}")
+        if signal:
+            return signal, signal_candle
+        return None, None
 
-        # 4. Candle Pattern Filter
-        if settings.Strategy.EnableCandlePatternFilter:
-            is_bull_pattern = self._is_bullish_signal(df, prev_candle_idx)
-            log.info(f"4. Candle Pattern Confirmation (Bullish Engulfing/Pinbar): {is_bull_pattern}")
-        else:
-            is_bull_pattern = True
-            log.info("4. Candle Pattern Confirmation: SKIPPED (disabled in config)")
+    def run_logic_on_history(self, df, lookback=None):
+        """
+        Vectorized counterpart of run_logic_on_data for a whole price history.
+        Every indicator is computed once and each entry condition becomes a boolean
+        column, so the signal for every bar comes out of a single pass.
 
-        # 5. RSI Filter
-        if settings.Strategy.EnableRSIFilter:
-            is_rsi_ok = df['rsi'].iloc[prev_candle_idx] < settings.Strategy.RSI_Overbought
-            log.info(f"5. RSI Filter (RSI < {settings.Strategy.RSI_Overbought}): {is_rsi_ok}")
-        else:
-            is_rsi_ok = True
-            log.info(f"5. RSI Filter: SKIPPED (disabled in config)")
+        :param df: DataFrame with time/open/high/low/close columns, oldest first.
+        :param lookback: Number of bars the bar-by-bar path is fed per evaluation.
+                         The EMAs and ADX depend on where that slice starts, so they
+                         are replayed over the same trailing window and agree with the
+                         bar-by-bar values up to float rounding. Defaults to the live
+                         fetch size; pass 0 to seed every indicator once at the first
+                         bar instead.
+        :return: A copy of df with the indicator and condition columns plus a 'signal'
+                 column ("BUY", "SELL" or None), indexed by the signal candle.
+        """
+        if lookback is None:
+            lookback = self.get_lookback_bars()
 
-        if is_trending and is_uptrend and is_pullback and is_bull_pattern and is_rsi_ok:
-            log.info(">>>> LONG SIGNAL DETECTED <<<<")
-            return "BUY", signal_candle
+        df = self._calculate_indicators(df.reset_index(drop=True))
+        adx_col = f"ADX_{self.config.Strategy.ADX_Period}"
+        window = lookback - 1 # The last bar of each slice is still forming
+        if lookback > 0 and len(df) >= window:
+            high = df['high'].to_numpy(dtype=float)
+            low = df['low'].to_numpy(dtype=float)
+            close = df['close'].to_numpy(dtype=float)
+            df['ema_fast'] = _windowed_ema(close, self.config.Strategy.EMAFast_Period, window)
+            df['ema_slow'] = _windowed_ema(close, self.config.Strategy.EMASlow_Period, window)
+            adx, dmp, dmn = _windowed_adx(high, low, close, self.config.Strategy.ADX_Period, window)
+            tail = slice(window - 1, None)
+            df.loc[df.index[tail], adx_col] = adx[tail]
+            df.loc[df.index[tail], f"DMP_{self.config.Strategy.ADX_Period}"] = dmp[tail]
+            df.loc[df.index[tail], f"DMN_{self.config.Strategy.ADX_Period}"] = dmn[tail]
+            if window - 1 < self.config.Strategy.RSI_Period:
+                df['rsi'] = np.nan
 
-        # --- Check for Short Entry ---
-        log.info("--- Checking SHORT conditions ---")
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
+        ema_fast = df['ema_fast'].to_numpy()
+        ema_slow = df['ema_slow'].to_numpy()
+        rsi = df['rsi'].to_numpy()
+        ones = np.ones(len(df), dtype=bool)
+        # Candle patterns of every bar against the bars before it
+        patterns = self.patterns.detect_frame(df)
 
-        # 1. ADX check is the same for short entries
-        if settings.Strategy.EnableADXFilter:
-            # Re-use the is_trending variable calculated for the long check
-            log.info(f"1. Trend Strength Filter (ADX > {settings.Strategy.ADX_Threshold}): {is_trending}")
+        # --- Entry conditions, same order and semantics as run_logic_on_data ---
+        if self.config.Strategy.EnableADXFilter:
+            df['is_trending'] = df[adx_col].to_numpy() > self.config.Strategy.ADX_Threshold
+        else:
+            df['is_trending'] = ones
+        df['is_uptrend'] = (ema_fast > ema_slow) & (close > ema_slow)
+        df['is_downtrend'] = (ema_fast < ema_slow) & (close < ema_slow)
+        df['is_long_pullback'] = low <= ema_fast
+        df['is_short_pullback'] = high >= ema_fast
+        if self.config.Strategy.EnableCandlePatternFilter:
+            df['is_bull_pattern'] = patterns['bull_engulfing'] | patterns['hammer']
+            df['is_bear_pattern'] = patterns['bear_engulfing'] | patterns['shooting_star']
         else:
-            log.info("1. Trend Strength Filter: SKIPPED (disabled in config)")
+            df['is_bull_pattern'] = ones
+            df['is_bear_pattern'] = ones
+        if self.config.Strategy.EnableRSIFilter:
+            df['is_long_rsi_ok'] = rsi < self.config.Strategy.RSI_Overbought
+            df['is_short_rsi_ok'] = rsi > self.config.Strategy.RSI_Oversold
+        else:
+            df['is_long_rsi_ok'] = ones
+            df['is_short_rsi_ok'] = ones
+        if self.higher_timeframes is not None:
+            # Known at each bar's close from the whole history, whatever the lookback
+            htf_direction = self.higher_timeframes.history_direction(df)
+            df['is_htf_long_ok'] = htf_direction == 1
+            df['is_htf_short_ok'] = htf_direction == -1
+        else:
+            df['is_htf_long_ok'] = ones
+            df['is_htf_short_ok'] = ones
 
-        # 2. Trend Confirmation
-        is_downtrend = (df['ema_fast'].iloc[prev_candle_idx] < df['ema_slow'].iloc[prev_candle_idx] and
-                        df['close'].iloc[prev_candle_idx] < df['ema_slow'].iloc[prev_candle_idx])
-        log.info(f"2. Trend Confirmation (EMA_Fast < EMA_Slow AND Close < EMA_Slow): {is_downtrend}")
+        is_long = (df['is_trending'] & df['is_uptrend'] & df['is_long_pullback'] &
+                   df['is_bull_pattern'] & df['is_long_rsi_ok'] & df['is_htf_long_ok']).to_numpy()
+        is_short = (df['is_trending'] & df['is_downtrend'] & df['is_short_pullback'] &
+                    df['is_bear_pattern'] & df['is_short_rsi_ok'] & df['is_htf_short_ok']).to_numpy()
+        df['signal'] = pd.Series(np.where(is_long, "BUY", np.where(is_short, "SELL", None)),
+                                 index=df.index, dtype=object)
 
-        # 3. Pullback Confirmation
-        is_pullback = signal_candle['high'] >= df['ema_fast'].iloc[prev_candle_idx]
-        log.info(f"3. Pullback Confirmation (High >= EMA_Fast): {is_pullback}")
+        log.info(f"Evaluated {len(df)} bars: {int(is_long.sum())} BUY and {int(is_short.sum())} SELL signals.")
+        return df
 
-        # 4. Candle Pattern Filter
-        if settings.Strategy.EnableCandlePatternFilter:
-            is_bear_pattern = self._is_bearish_signal(df, prev_candle_idx)
-            log.info(f"4. Candle Pattern Confirmation (Bearish Engulfing/Pinbar): {is_bear_pattern}")
-        else:
-            is_bear_pattern = True
-            log.info("4. Candle Pattern Confirmation: SKIPPED (disabled in config)")
+    def get_lookback_bars(self):
+        """Number of bars fetched for each windowed evaluation."""
+        return self.config.Strategy.EMASlow_Period + 50
 
-        # 5. RSI Filter
-        if settings.Strategy.EnableRSIFilter:
-            is_rsi_ok = df['rsi'].iloc[prev_candle_idx] > settings.Strategy.RSI_Oversold
-            log.info(f"5. RSI Filter (RSI > {settings.Strategy.RSI_Oversold}): {is_rsi_ok}")
-        else:
-            is_rsi_ok = True
-            log.info(f"5. RSI Filter: SKIPPED (disabled in config)")
-        
-        if is_trending and is_downtrend and is_pullback and is_bear_pattern and is_rsi_ok:
-            log.info(">>>> SHORT SIGNAL DETECTED <<<<")
-            return "SELL", signal_candle
-            
-        log.info("No new entry signals found.")
-        return None, None
+    def get_warmup_bars(self):
+        """
+        Number of bars used to (re)seed the incremental indicators. Long enough
+        for the seed value of the slow EMA to have decayed away, on the higher
+        timeframes too when their filter is enabled.
+        """
+        bars = self.config.Strategy.EMASlow_Period * 10
+        if self.higher_timeframes is not None:
+            bars = max(bars, self.higher_timeframes.warmup_bars())
+        return bars
 
     def check_for_entry(self):
         """
         Main entry logic method. Gets live data and runs the logic.
+
+        Only the bars closed since the last tick are fetched and applied to the
+        incremental indicator state; after a restart or a data gap the state is
+        reseeded from a full warm-up history.
         """
         log.info("Checking for new trade entry signals...")
-        data = self.mt5.get_market_data(self.symbol, self.timeframe, settings.Strategy.EMASlow_Period + 50)
-        
-        if data is None or len(data) < settings.Strategy.EMASlow_Period:
-            log.warning("Not enough market data to proceed.")
+        forming_bar = self.sync_market_data()
+        if forming_bar is None:
             return None, None
+        return self.evaluate(forming_bar)
+
+    @section
+    def sync_market_data(self):
+        """
+        The terminal-facing half of check_for_entry: fetches the new bars and
+        brings the indicator state up to date.
+
+        :return: The still-forming bar, or None if there was not enough data.
+        """
+        data = None
+        if self.indicators.is_warm:
+            data = self.mt5.get_market_data(self.symbol, self.timeframe, DELTA_FETCH_BARS)
+            if data is not None:
+                with indicator_update_seconds.labels(mode="update").time():
+                    applied = self.indicators.update(data.iloc[:-1])
+                if applied is None:
+                    log.info("Indicator state does not continue the fetched bars. Reseeding...")
+                    data = None
+
+        if data is None:
+            data = self.mt5.get_market_data(self.symbol, self.timeframe, self.get_warmup_bars())
+            if data is None or len(data) < self.config.Strategy.EMASlow_Period:
+                log.warning("Not enough market data to proceed.")
+                self.indicators.reset()
+                return None
+            with indicator_update_seconds.labels(mode="seed").time():
+                self.indicators.seed(data.iloc[:-1])
+        return data.iloc[-1]
 
-        return self.run_logic_on_data(data) 
\ No newline at end of file
+    @section
+    def evaluate(self, forming_bar):
+        """
+        The compute half of check_for_entry: evaluates the entry conditions on
+        the indicator state. Makes no terminal calls.
+        """
+        htf_direction = self.higher_timeframes.direction() if self.higher_timeframes is not None else None
+        signal_type, signal_candle = self._evaluate_entry(self.indicators.to_frame(forming_bar=forming_bar),
+                                                          htf_direction)
+        if self.trace.last() is not None:
+            log.info(f"Entry check ({self.symbol}): {summarize(self.trace.last())}")
+            signals_evaluated.labels(symbol=self.symbol).inc()
+        if signal_type:
+            signals_fired.labels(symbol=self.symbol, direction=signal_type).inc()
+        return signal_type, signal_candle
@@ -0,0 +1,25 @@
+import logging
+import os
+import sys
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+import pytest
+import backtest  # MetaTrader5 constants off Windows (see backtest/__init__.py)
+from utils.logger import log
+from config import settings
+from benchmarks.synthetic_data import generate_bars
+
+# Keep test runs out of the bot's log files, and the per-tick replay logs off the console
+for handler in [h for h in log.handlers if isinstance(h, logging.FileHandler)]:
+    log.removeHandler(handler)
+log.setLevel(logging.WARNING)
+
+settings.load(os.path.join(BOT_DIR, 'config.template.json'))
+
+
+@pytest.fixture(scope="session")
+def bars():
+    """Synthetic M5 bars, enough for every indicator and the H1 trend filter to warm up."""
+    return generate_bars(3000, seed=7)
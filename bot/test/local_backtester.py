@@ -1,23 +1,28 @@
+import argparse
+import time
 import pandas as pd
 from utils.logger import log
 from strategies.xauusd_m5_strategy import XauUsdM5Strategy
-from bot.config import settings
+from strategies.decision_trace import record_from_history, render as render_decision
+from config import settings
+from storage.bar_store import BarStore
 import sys
 
 class MockMT5Connector:
     """
-    A mock connector that simulates the real MT5Connector but uses data from a CSV file.
+    A mock connector that simulates the real MT5Connector but uses data from a CSV file
+    or from bars that were already loaded (see load_bars).
     """
-    def __init__(self, csv_filepath):
+    def __init__(self, csv_filepath=None, data=None):
+        self.current_index = 0
+        if data is not None:
+            self.data = data
+            return
         log.info(f"Initializing MockMT5Connector with data from '{csv_filepath}'")
-        try:
-            self.data = pd.read_csv(csv_filepath)
-            self.data['time'] = pd.to_datetime(self.data['time'], unit='s')
-            self.current_index = 0
-            log.info(f"Loaded {len(self.data)} data points.")
-        except FileNotFoundError:
-            log.error(f"Mock data file not found at '{csv_filepath}'.")
+        self.data = load_bars(csv_filepath)
+        if self.data is None:
             sys.exit(1)
+        log.info(f"Loaded {len(self.data)} data points.")
 
     def get_market_data(self, symbol, timeframe, count):
         """
@@ -40,52 +45,114 @@ class MockMT5Connector:
     def place_order(self, *args, **kwargs): log.info("MOCK: place_order called."); return None
 
 
-def run_local_test():
+def load_bars(csv_filepath='sample_data.csv', store_root=None, symbol=None, timeframe=None):
+    """
+    Loads the backtest bars, memory-mapped from the bar store when store_root is
+    given, otherwise parsed from the CSV file.
+
+    :return: A DataFrame of bars, or None if the data could not be found.
+    """
+    if store_root:
+        series = BarStore(store_root).open(symbol or settings.Trading.Symbol,
+                                           timeframe or settings.Trading.Timeframe)
+        if not len(series):
+            log.error(f"No bars stored under '{store_root}' for that symbol/timeframe.")
+            return None
+        return series.to_frame()
+    try:
+        data = pd.read_csv(csv_filepath)
+        data['time'] = pd.to_datetime(data['time'], unit='s')
+        return data
+    except FileNotFoundError:
+        log.error(f"Mock data file '{csv_filepath}' not found.")
+        return None
+
+
+def run_local_test(mode="vectorized", full_data=None, config=None):
     """
     Initializes and runs the backtest on the local CSV data.
+
+    :param full_data: Bars to run on; defaults to sample_data.csv via load_bars.
+    :param mode: "vectorized" evaluates the whole history in one pass,
+                 "bar-by-bar" replays every tick through run_logic_on_data and
+                 "compare" runs both and reports any bar where they disagree.
+    :param config: Settings for the strategy; the global settings by default.
+    :return: The number of mismatching bars in "compare" mode, else None.
     """
-    log.info("--- Starting Local Backtest ---")
+    log.info(f"--- Starting Local Backtest ({mode}) ---")
 
     if not settings:
         log.error("Failed to load settings. Exiting local test.")
         return
 
     # 1. Load all historical data
-    try:
-        full_data = pd.read_csv('sample_data.csv')
-        full_data['time'] = pd.to_datetime(full_data['time'], unit='s')
-        log.info(f"Loaded {len(full_data)} data points for backtest.")
-    except FileNotFoundError:
-        log.error("Mock data file 'sample_data.csv' not found.")
-        return
+    if full_data is None:
+        full_data = load_bars()
+        if full_data is None:
+            return
+    log.info(f"Loaded {len(full_data)} data points for backtest.")
 
     # 2. Initialize the Strategy (connector can be None for this test)
-    strategy = XauUsdM5Strategy(mt5_connector=None)
-    strategy.symbol = settings.Trading.Symbol
+    strategy = XauUsdM5Strategy(mt5_connector=None, config=config)
 
-    # 3. Loop through the data, simulating the bot's tick
     # We start from a point where we have enough data for the longest indicator
-    start_point = settings.Strategy.EMASlow_Period + 2 
-    
-    for i in range(start_point, len(full_data) + 1):
-        # The number of candles to feed into the logic is the same as the live bot
-        num_candles_to_feed = settings.Strategy.EMASlow_Period + 50
-        
-        # Ensure we don't request a slice that goes out of bounds (negative index)
-        start_slice = max(0, i - num_candles_to_feed)
-        current_df_slice = full_data.iloc[start_slice:i]
-        
-        current_candle_time = current_df_slice.iloc[-1]['time']
-        log.info("="*50)
-        log.info(f"Simulating tick, evaluating candle from: {current_candle_time}")
+    start_point = strategy.config.Strategy.EMASlow_Period + 2
+    # The number of candles to feed into the logic is the same as the live bot
+    num_candles_to_feed = strategy.get_lookback_bars()
+
+    vectorized_signals = {}
+    if mode in ("vectorized", "compare"):
+        started = time.perf_counter()
+        history = strategy.run_logic_on_history(full_data, lookback=num_candles_to_feed)
+        elapsed = time.perf_counter() - started
+        # Bar i-2 is the signal candle of the tick that sees candles [.., i)
+        evaluated = history.iloc[start_point - 2:len(full_data) - 1]
+        for idx, row in evaluated[evaluated['signal'].notna()].iterrows():
+            vectorized_signals[idx] = row['signal']
+            log.info(f"*** ---> Signal Found: {row['signal']} on candle {row['time']} <--- ***")
+        log.info(f"Vectorized pass: {len(evaluated)} bars in {elapsed:.3f}s "
+                 f"({len(evaluated) / max(elapsed, 1e-9):,.0f} bars/sec).")
+
+    if mode in ("bar-by-bar", "compare"):
+        mismatches = 0
+        # 3. Loop through the data, simulating the bot's tick
+        for i in range(start_point, len(full_data) + 1):
+            # Ensure we don't request a slice that goes out of bounds (negative index)
+            start_slice = max(0, i - num_candles_to_feed)
+            current_df_slice = full_data.iloc[start_slice:i]
+            
+            current_candle_time = current_df_slice.iloc[-1]['time']
+            log.info("="*50)
+            log.info(f"Simulating tick, evaluating candle from: {current_candle_time}")
+
+            # 4. Run the core logic on the data slice
+            signal_type, signal_candle = strategy.run_logic_on_data(current_df_slice)
+
+            if signal_type:
+                log.info(f"\\n*** ---> Signal Found: {signal_type} on candle {signal_candle['time']} <--- ***\\n")
 
-        # 4. Run the core logic on the data slice
-        signal_type, signal_candle = strategy.run_logic_on_data(current_df_slice)
+            if mode == "compare" and signal_type != vectorized_signals.get(i - 2):
+                mismatches += 1
+                log.error(f"Mismatch on candle {full_data['time'].iloc[i - 2]}: "
+                          f"bar-by-bar={signal_type}, vectorized={vectorized_signals.get(i - 2)}")
+                log.info(f"Bar-by-bar decision:\n{render_decision(strategy.trace.last())}")
+                log.info(f"Vectorized decision:\n{render_decision(record_from_history(history, i - 2))}")
 
-        if signal_type:
-            log.info(f"\\n*** ---> Signal Found: {signal_type} on candle {signal_candle['time']} <--- ***\\n")
+        if mode == "compare":
+            log.info(f"Comparison finished with {mismatches} mismatching bar(s).")
 
     log.info("--- Local Backtest Finished ---")
+    if mode == "compare":
+        return mismatches
 
 if __name__ == "__main__":
-    run_local_test() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the strategy over sample_data.csv.")
+    parser.add_argument("--mode", choices=["vectorized", "bar-by-bar", "compare"], default="vectorized")
+    parser.add_argument("--csv", default="sample_data.csv", help="Bars with time in epoch seconds.")
+    parser.add_argument("--store", help="Bar store directory; used instead of --csv when given.")
+    parser.add_argument("--symbol", help="Store symbol (default: Trading.Symbol).")
+    parser.add_argument("--timeframe", help="Store timeframe (default: Trading.Timeframe).")
+    args = parser.parse_args()
+    bars = load_bars(args.csv, args.store, args.symbol, args.timeframe)
+    if bars is not None:
+        run_local_test(args.mode, bars)
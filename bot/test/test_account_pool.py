@@ -0,0 +1,99 @@
+import multiprocessing
+import threading
+import time
+import pandas as pd
+from config import settings, compile_config
+from connectors.account_pool import AccountPool, FillReport
+
+SIGNAL_CANDLE = pd.Series({'time': pd.Timestamp(1_700_000_000, unit='s'), 'open': 1999.0, 'high': 2001.0,
+                           'low': 1995.0, 'close': 2000.0}, name=100)
+
+
+class _Process:
+    # Stands in for the worker process; the worker itself runs on a thread
+    def is_alive(self): return False
+    def terminate(self): pass
+    def join(self, timeout=None): pass
+
+
+def _serve(name, conn, delays):
+    """Answers the pool's requests like _account_worker, sleeping delays[i] before the i-th answer."""
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        seq, kind, args = message
+        time.sleep(delays.pop(0) if delays else 0.0)
+        if kind == "trade":
+            reply = FillReport(name, "filled", 10009, seq, 0.1, 2000.0, 0.1, 1.0, time.perf_counter())
+        else:
+            reply = 0
+        try:
+            conn.send((seq, reply))
+        except (BrokenPipeError, OSError):
+            return
+
+
+def _pool(delays, reply_timeout=0.3):
+    accounts = [{"Name": name, "Account": 1000 + i, "Password": "x", "Server": "Demo"}
+                for i, name in enumerate(delays)]
+    pool = AccountPool(accounts, compile_config(settings), reply_timeout=reply_timeout)
+    threads = []
+    for name, account_delays in delays.items():
+        parent_end, child_end = multiprocessing.Pipe()
+        pool.workers[name] = (_Process(), parent_end)
+        if account_delays is None:
+            # A worker that has already exited
+            child_end.close()
+            continue
+        thread = threading.Thread(target=_serve, args=(name, child_end, list(account_delays)), daemon=True)
+        thread.start()
+        threads.append((thread, child_end))
+    return pool, threads
+
+
+def test_an_account_that_does_not_answer_in_time_is_reported_and_its_late_reply_dropped():
+    pool, threads = _pool({"fast": [], "slow": [0.8]})
+    reports = {report.account: report for report in pool.dispatch("BUY", SIGNAL_CANDLE)}
+    assert reports["fast"].status == "filled"
+    assert reports["slow"].status == "no_answer"
+
+    # The slow account's fill of the first signal is read by the next request, which must skip it
+    time.sleep(0.6)
+    assert pool.manage() == {"fast": 0, "slow": 0}
+    assert pool.outcomes["slow"] == {"no_answer": 1}
+    assert set(pool.workers) == {"fast", "slow"}
+    pool.shutdown()
+    for thread, _ in threads:
+        thread.join(2)
+        assert not thread.is_alive()
+
+
+def test_an_account_whose_worker_exits_is_dropped():
+    pool, _ = _pool({"alive": [], "gone": None})
+    # Dropped whether the request fails to reach it or its pipe reports the exit
+    assert pool.manage().get("alive") == 0
+    assert set(pool.workers) == {"alive"}
+    assert [report.account for report in pool.dispatch("SELL", SIGNAL_CANDLE)] == ["alive"]
+    pool.shutdown()
+
+
+def test_management_waits_only_manage_timeout():
+    pool, _ = _pool({"fast": [], "slow": [0.5]}, reply_timeout=5.0)
+    pool.manage_timeout = 0.1
+    started = time.monotonic()
+    assert pool.manage() == {"fast": 0, "slow": None}
+    assert time.monotonic() - started < 0.4
+    assert set(pool.workers) == {"fast", "slow"}
+    pool.shutdown()
+
+
+def test_configure_drops_an_account_whose_worker_exited():
+    pool, _ = _pool({"alive": [], "gone": None})
+    assert pool.configure(compile_config(settings))
+    assert set(pool.workers) == {"alive"}
+    assert pool.manage() == {"alive": 0}
+    pool.shutdown()
@@ -0,0 +1,148 @@
+import asyncio
+from contextlib import contextmanager
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+from config import settings, merge_config, compile_config
+from connectors.mt5_connector import MT5Connector
+from storage.bar_buffer import BarBuffer
+from storage.bar_store import BAR_DTYPES
+from strategies.xauusd_m5_strategy import XauUsdM5Strategy
+from local_backtester import MockMT5Connector
+
+
+def _rates(bars):
+    rates = np.zeros(len(bars), dtype=list(BAR_DTYPES.items()))
+    rates['time'] = bars['time'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    for col in ('open', 'high', 'low', 'close', 'tick_volume'):
+        rates[col] = bars[col].to_numpy()
+    return rates
+
+
+def _assert_frame_is(frame, rates):
+    np.testing.assert_array_equal(frame['time'].to_numpy().astype('datetime64[s]').astype(np.int64), rates['time'])
+    np.testing.assert_array_equal(frame['close'].to_numpy(), rates['close'])
+
+
+def test_merge_rewrites_the_forming_bar_and_appends(bars):
+    rates = _rates(bars.iloc[:20])
+    buffer = BarBuffer(capacity=16)
+    buffer.load(rates[:10], 10)
+    forming = rates[9:11].copy()
+    forming['close'][0] += 1.0      # The forming bar moved on since the last fetch
+    assert buffer.merge(forming) == 1
+    assert len(buffer) == 11 and buffer.last_time == rates['time'][10]
+    assert buffer.frame(2)['close'].tolist() == forming['close'].tolist()
+    assert buffer.merge(rates[10:11]) == 0
+
+
+def test_merge_refuses_gaps_and_rewritten_history(bars):
+    rates = _rates(bars.iloc[:20])
+    buffer = BarBuffer(capacity=16)
+    buffer.load(rates[:10], 10)
+    assert buffer.merge(rates[12:14]) is None          # Starts after the newest stored bar
+    shifted = rates[8:10].copy()
+    shifted['time'] += 60
+    assert buffer.merge(shifted) is None               # Not on the stored bar times
+    assert buffer.merge(rates[:0]) is None
+    assert buffer.merge(_rates(bars.iloc[:17])) is None  # More than the capacity
+    assert len(buffer) == 10
+
+
+def test_newest_bars_stay_contiguous_across_compactions(bars):
+    rates = _rates(bars.iloc[:200])
+    buffer = BarBuffer(capacity=8)
+    buffer.load(rates[:8], 8)
+    newest = 7
+    while newest + 3 <= len(rates):
+        # From the stored forming bar on: it and the two bars after it
+        assert buffer.merge(rates[newest:newest + 3]) == 2
+        newest += 2
+        assert len(buffer) == 8
+        _assert_frame_is(buffer.frame(8), rates[newest - 7:newest + 1])
+
+
+class FakeTerminal:
+    """copy_rates_from_pos over a fixed history whose newest bar is `now - 1`."""
+    def __init__(self, rates):
+        self.rates = rates
+        self.now = 0
+        self.requests = []
+
+    def copy_rates_from_pos(self, symbol, timeframe, start, count):
+        self.requests.append(count)
+        return self.rates[max(0, self.now - count):self.now].copy()
+
+
+def test_get_market_data_backfills_a_gap_with_widening_delta_fetches(bars, monkeypatch):
+    rates = _rates(bars.iloc[:400])
+    terminal = FakeTerminal(rates)
+    monkeypatch.setattr(mt5, "copy_rates_from_pos", terminal.copy_rates_from_pos, raising=False)
+    connector = MT5Connector(1, "x", "Demo")
+    connector.connected = True
+
+    terminal.now = 100
+    _assert_frame_is(connector.get_market_data("XAUUSD", mt5.TIMEFRAME_M5, 50), rates[50:100])
+    assert terminal.requests == [50]
+
+    terminal.now = 101
+    _assert_frame_is(connector.get_market_data("XAUUSD", mt5.TIMEFRAME_M5, 50), rates[51:101])
+    assert terminal.requests[1:] == [2]
+
+    # 20 bars missed: 2 and 8 do not reach back to the stored bars, 32 does
+    terminal.now = 121
+    terminal.requests.clear()
+    _assert_frame_is(connector.get_market_data("XAUUSD", mt5.TIMEFRAME_M5, 50), rates[71:121])
+    assert terminal.requests == [2, 8, 32]
+
+
+class OpenPositionConnector(MockMT5Connector):
+    """The backtester's mock feed, with a position always open."""
+    @contextmanager
+    def snapshot(self):
+        yield
+
+    def get_open_positions(self, symbol=None):
+        return [object()]
+
+
+def test_indicators_follow_the_bars_while_a_trade_is_open(bars, monkeypatch):
+    import main
+    config = compile_config(settings)
+    connector = OpenPositionConnector(data=bars)
+    strategy = XauUsdM5Strategy(connector, config)
+    monkeypatch.setattr(main, "mt5_connector", connector)
+    monkeypatch.setattr(main, "strategy", strategy)
+    monkeypatch.setattr(main, "active_settings", config)
+    monkeypatch.setattr(main, "config_watcher", None)
+    seeds = []
+    seed = strategy.indicators.seed
+    monkeypatch.setattr(strategy.indicators, "seed", lambda df: (seeds.append(len(df)), seed(df)))
+
+    first = strategy.get_warmup_bars() + 1
+    for index in range(first, first + 30):
+        connector.current_index = index
+        assert main.run_entry_cycle() is None
+    # Seeded once, then advanced bar by bar: the trade did not let it go stale
+    assert len(seeds) == 1
+    assert strategy.indicators.last_time == bars["time"].iloc[first + 27]
+
+
+def test_portfolio_instruments_follow_the_bars_at_the_cap(bars):
+    from portfolio import Instrument, PortfolioRunner
+
+    class CappedConnector(OpenPositionConnector):
+        def get_open_positions(self, symbol=None):
+            return [SimpleNamespace(symbol="XAUUSD", volume=0.1)]
+
+    connector = CappedConnector(data=bars)
+    instruments = [Instrument(connector, compile_config(merge_config(settings, {"Trading": {"Symbol": symbol}})))
+                   for symbol in ("XAUUSD", "XAGUSD")]
+    runner = PortfolioRunner(connector, instruments, max_open_trades=1, max_total_volume=10.0)
+    first = instruments[0].strategy.get_warmup_bars() + 1
+    for index in range(first, first + 10):
+        connector.current_index = index
+        assert asyncio.run(runner.run_entry_cycle(instruments, bar_time=None)) is None
+    for instrument in instruments:
+        assert instrument.strategy.indicators.last_time == bars["time"].iloc[first + 7]
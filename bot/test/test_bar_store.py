@@ -0,0 +1,99 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from storage import bar_store
+from storage.bar_store import BarStore, BAR_DTYPES
+
+
+def _epochs(frame):
+    return frame['time'].astype('datetime64[s]').astype('int64').to_numpy()
+
+
+def _assert_stored(store, bars):
+    series = store.open("XAUUSD", "M5")
+    assert len(series) == len(bars)
+    np.testing.assert_array_equal(series['time'], _epochs(bars))
+    for col in ('open', 'high', 'low', 'close'):
+        np.testing.assert_array_equal(series[col], bars[col].to_numpy())
+    path = os.path.join(store.root, "XAUUSD", "M5")
+    for col, dtype in BAR_DTYPES.items():
+        assert os.path.getsize(os.path.join(path, f"{col}.bin")) == len(bars) * dtype.itemsize
+
+
+def test_append_adds_only_newer_bars(tmp_path, bars):
+    store = BarStore(str(tmp_path))
+    assert store.append("XAUUSD", "M5", bars.iloc[:100]) == 100
+    assert store.append("XAUUSD", "M5", bars.iloc[50:150]) == 50
+    assert store.append("XAUUSD", "M5", bars.iloc[:150]) == 0
+    _assert_stored(store, bars.iloc[:150])
+    assert store.last_time("XAUUSD", "M5") == _epochs(bars)[149]
+    with pytest.raises(ValueError):
+        store.append("XAUUSD", "M5", bars.iloc[[200, 199]])
+
+
+def test_append_drops_the_tail_of_a_crashed_append(tmp_path, bars):
+    store = BarStore(str(tmp_path))
+    store.append("XAUUSD", "M5", bars.iloc[:100])
+    path = os.path.join(str(tmp_path), "XAUUSD", "M5")
+    # A crash after some columns got their bytes but before meta.json was updated
+    for col in ('time', 'open', 'high'):
+        with open(os.path.join(path, f"{col}.bin"), 'ab') as f:
+            f.write(b'\xff' * 37)
+    assert len(store.open("XAUUSD", "M5")) == 100
+
+    assert store.append("XAUUSD", "M5", bars.iloc[100:120]) == 20
+    _assert_stored(store, bars.iloc[:120])
+
+
+def test_the_row_count_is_swapped_in_atomically(tmp_path, bars, monkeypatch):
+    store = BarStore(str(tmp_path))
+    store.append("XAUUSD", "M5", bars.iloc[:100])
+    path = os.path.join(str(tmp_path), "XAUUSD", "M5")
+    assert json.load(open(os.path.join(path, 'meta.json')))['count'] == 100
+    assert not os.path.exists(os.path.join(path, 'meta.json.tmp'))
+
+    def crash(src, dst):
+        raise OSError("crash before the swap")
+    monkeypatch.setattr(bar_store.os, 'replace', crash)
+    with pytest.raises(OSError):
+        store.append("XAUUSD", "M5", bars.iloc[100:130])
+    monkeypatch.undo()
+    # Readers still see the 100 committed bars; the next append overwrites the rest
+    assert len(store.open("XAUUSD", "M5")) == 100
+    assert store.append("XAUUSD", "M5", bars.iloc[100:130]) == 30
+    _assert_stored(store, bars.iloc[:130])
+
+
+def test_index_range_selects_start_inclusive_end_exclusive(tmp_path, bars):
+    store = BarStore(str(tmp_path))
+    store.append("XAUUSD", "M5", bars.iloc[:100])
+    series = store.open("XAUUSD", "M5")
+    times = _epochs(bars.iloc[:100])
+    assert series.index_range() == slice(0, 100)
+    assert series.index_range(int(times[10]), int(times[20])) == slice(10, 20)
+    assert series.index_range(int(times[10]) + 1, int(times[20]) + 1) == slice(11, 21)
+    assert series.index_range(bars['time'].iloc[10], str(bars['time'].iloc[20])) == slice(10, 20)
+    assert series.index_range(int(times[0]) - 10 ** 6, int(times[-1]) + 10 ** 6) == slice(0, 100)
+    assert series.index_range(int(times[50]), int(times[40])) == slice(50, 50)
+    frame = series.to_frame(bars['time'].iloc[10], bars['time'].iloc[20])
+    pd.testing.assert_series_equal(frame['time'], bars['time'].iloc[10:20].reset_index(drop=True),
+                                   check_dtype=False)
+    assert store.open("XAUUSD", "H1").index_range(0, 10 ** 10) == slice(0, 0)
+
+
+def test_import_csv_sorts_and_keeps_the_last_duplicate(tmp_path, bars):
+    rows = bars.iloc[:50].copy()
+    rows['time'] = _epochs(rows)
+    replaced = rows.iloc[[20]].assign(close=1.0)
+    csv = pd.concat([rows.iloc[25:], rows.iloc[:25], replaced])
+    csv_path = tmp_path / "export.csv"
+    csv.to_csv(csv_path, index=False)
+
+    store = BarStore(str(tmp_path / "store"))
+    assert store.import_csv(str(csv_path), "XAUUSD", "M5") == 50
+    expected = bars.iloc[:50].copy()
+    expected.loc[expected.index[20], 'close'] = 1.0
+    _assert_stored(store, expected)
+    assert store.import_csv(str(csv_path), "XAUUSD", "M5") == 0
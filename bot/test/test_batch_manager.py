@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+import pytest
+import MetaTrader5 as mt5
+from config import settings, merge_config
+from risk_management.batch_manager import BatchTradeManager
+
+SYMBOL = "XAUUSD"
+
+
+class FakeConnector:
+    def __init__(self, bid, ask, stops_level=50):
+        self.tick = SimpleNamespace(bid=bid, ask=ask)
+        self.info = SimpleNamespace(point=0.01, digits=2, trade_stops_level=stops_level)
+        self.modified = []
+
+    def get_last_tick(self, symbol): return self.tick
+    def get_symbol_info(self, symbol): return self.info
+    def modify_position(self, ticket, sl, tp): self.modified.append((ticket, sl))
+
+
+def _config(**management):
+    # Pips of 0.1, activation at 1.0 of profit, trailing 0.1 behind, steps of at least 0.2
+    return merge_config(settings, {
+        "RiskManagement": {"PipDecimalValue": 0.1},
+        "TradeManagement": {"EnableBreakeven": True, "EnableTrailingStop": True,
+                            "TrailingStop_ActivationPips": 10, "TrailingStop_DistancePips": 1,
+                            "MinModifyPoints": 20, **management},
+    })
+
+
+def _position(ticket, side, sl, price_open=2000.0):
+    order_type = mt5.ORDER_TYPE_BUY if side == "BUY" else mt5.ORDER_TYPE_SELL
+    return SimpleNamespace(ticket=ticket, symbol=SYMBOL, type=order_type, price_open=price_open, sl=sl, tp=0.0)
+
+
+def test_trailing_stop_is_clamped_to_the_stops_level():
+    long = BatchTradeManager(FakeConnector(bid=2001.8, ask=2002.0), _config())
+    # Trail at ask - 0.1 = 2001.9, but no closer than 0.5 to the bid
+    assert [(p.ticket, sl) for p, sl in long.plan(SYMBOL, [_position(1, "BUY", 1990.0)])] == [(1, pytest.approx(2001.3))]
+
+    short = BatchTradeManager(FakeConnector(bid=1998.0, ask=1998.2), _config())
+    assert [(p.ticket, sl) for p, sl in short.plan(SYMBOL, [_position(2, "SELL", 2010.0)])] == [(2, pytest.approx(1998.7))]
+
+
+def test_small_moves_are_suppressed():
+    manager = BatchTradeManager(FakeConnector(bid=2001.8, ask=2002.0), _config())
+    positions = [_position(1, "BUY", 2001.15), _position(2, "BUY", 2001.05)]
+    # 0.15 below the target is under the 0.2 step; 0.25 is not
+    assert [(p.ticket, sl) for p, sl in manager.plan(SYMBOL, positions)] == [(2, pytest.approx(2001.3))]
+    assert manager.suppressed == 1
+    assert manager.stats() == {'evaluated': 2, 'sent': 0, 'suppressed': 1}
+
+
+def test_stops_are_never_loosened():
+    manager = BatchTradeManager(FakeConnector(bid=2001.8, ask=2002.0), _config())
+    positions = [
+        _position(1, "BUY", 2001.6),                     # Already tighter than the clamped trail
+        _position(2, "SELL", 2000.5, price_open=2003.0), # Trailed below its entry: breakeven would loosen it
+        _position(3, "SELL", 0.0, price_open=2003.5),    # No stop yet: any stop tightens it
+    ]
+    assert [(p.ticket, sl) for p, sl in manager.plan(SYMBOL, positions)] == [(3, pytest.approx(2002.5))]
+
+    breakeven_only = BatchTradeManager(FakeConnector(bid=2001.8, ask=2002.0), _config(EnableTrailingStop=False))
+    assert breakeven_only.plan(SYMBOL, [_position(4, "BUY", 2000.5)]) == []
+    assert [(p.ticket, sl) for p, sl in breakeven_only.plan(SYMBOL, [_position(5, "BUY", 1995.0)])] == [(5, 2000.0)]
+
+
+def test_nothing_moves_before_activation():
+    manager = BatchTradeManager(FakeConnector(bid=2000.7, ask=2000.9), _config())
+    assert manager.plan(SYMBOL, [_position(1, "BUY", 1990.0), _position(2, "SELL", 2010.0)]) == []
+
+
+def test_run_management_sends_the_plan():
+    connector = FakeConnector(bid=2001.8, ask=2002.0)
+    manager = BatchTradeManager(connector, _config())
+    assert manager.run_management([_position(1, "BUY", 1990.0), _position(2, "BUY", 2001.6)]) == 1
+    assert connector.modified == [(1, pytest.approx(2001.3))]
+    assert manager.stats()['sent'] == 1
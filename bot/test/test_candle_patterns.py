@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+from strategies.candle_patterns import (CandlePatternDetector, PATTERNS, BULLISH_CONFIRMATIONS,
+                                        BEARISH_CONFIRMATIONS, confirmation)
+
+
+def _frame(*candles):
+    return pd.DataFrame(candles, columns=['open', 'high', 'low', 'close'])
+
+
+# Candles as (open, high, low, close), and the patterns of the last one with the
+# template's PinBar thresholds and the default doji and star thresholds
+@pytest.mark.parametrize("candles, expected", [
+    ([(10, 10.5, 8.5, 9), (8.8, 11, 8.7, 10.5)], {'bull_engulfing'}),
+    ([(9, 10.5, 8.5, 10), (10.2, 10.4, 8.4, 8.6)], {'bear_engulfing'}),
+    ([(10, 10.1, 8, 9.7)], {'hammer'}),
+    ([(10, 12, 9.9, 10.3)], {'shooting_star'}),
+    ([(10, 12, 8, 11), (9.5, 11, 9, 10.8)], {'inside_bar'}),
+    ([(10, 11, 9, 10.5), (9.5, 11.5, 8.5, 10.8)], {'outside_bar'}),
+    ([(10, 11, 9, 10.05)], {'doji'}),
+    ([(10, 10, 10, 10)], {'doji'}),
+    ([(12, 12.2, 9.8, 10), (9.9, 10.2, 9.5, 9.7), (9.8, 11.6, 9.7, 11.5)], {'morning_star'}),
+    ([(10, 12.2, 9.8, 12), (12.1, 12.5, 11.8, 12.3), (12.2, 12.3, 10.4, 10.5)], {'evening_star'}),
+    # Recovers less than half of the first candle's body
+    ([(12, 12.2, 9.8, 10), (9.9, 10.2, 9.5, 9.7), (9.8, 10.9, 9.7, 10.8)], set()),
+    # The middle candle is not small against the first one
+    ([(12, 12.2, 9.8, 10), (9.9, 10.2, 8.4, 8.5), (8.6, 11.6, 8.5, 11.5)], set()),
+])
+def test_patterns_of_fixed_candles(candles, expected):
+    detector = CandlePatternDetector()
+    found = detector.detect_frame(_frame(*candles))
+    assert {name for name in PATTERNS if found[name][-1]} == expected
+    assert {name for name, flag in detector.at(_frame(*candles), -1).items() if flag} == expected
+
+
+def test_the_first_bars_have_no_multi_candle_patterns():
+    found = CandlePatternDetector().detect_frame(_frame((10, 12, 8, 11), (9.5, 11, 9, 10.8)))
+    assert not any(found[name][0] for name in ('bull_engulfing', 'bear_engulfing', 'inside_bar',
+                                               'outside_bar', 'morning_star', 'evening_star'))
+    assert not found['morning_star'][1] and not found['evening_star'][1]
+
+
+def test_at_matches_detect_frame_bar_by_bar(bars):
+    detector = CandlePatternDetector()
+    data = bars.iloc[:600]
+    found = detector.detect_frame(data)
+    assert any(found[name].any() for name in PATTERNS)
+    for i in range(len(data)):
+        assert detector.at(data, i) == {name: bool(found[name][i]) for name in PATTERNS}
+    assert detector.at(data) == detector.at(data, len(data) - 2)
+
+
+def test_confirmation_names_the_first_pattern_found():
+    patterns = dict.fromkeys(PATTERNS, False)
+    assert confirmation(patterns, BULLISH_CONFIRMATIONS) is None
+    patterns.update(hammer=True, shooting_star=True)
+    assert confirmation(patterns, BULLISH_CONFIRMATIONS) == "pin_bar"
+    patterns['bear_engulfing'] = True
+    assert confirmation(patterns, BEARISH_CONFIRMATIONS) == "engulfing"
@@ -0,0 +1,142 @@
+import json
+import os
+import pickle
+import re
+import pytest
+from config import settings, merge_config, compile_config, ConfigError, PARAMETER_RULES
+from strategies.xauusd_m5_strategy import XauUsdM5Strategy
+from utils.config_watcher import ConfigWatcher
+
+
+def _compile(overrides):
+    return compile_config(merge_config(settings, overrides))
+
+
+def test_template_compiles_to_a_read_only_snapshot():
+    snapshot = compile_config(settings)
+    assert snapshot.Strategy.RSI_Overbought == 70.0 and isinstance(snapshot.Strategy.RSI_Overbought, float)
+    assert snapshot.Strategy.HigherTimeframe.Timeframes == ("H1",)
+    with pytest.raises(AttributeError):
+        snapshot.Strategy.ADX_Threshold = 30
+    assert pickle.loads(pickle.dumps(snapshot)) == snapshot
+    assert compile_config(snapshot.to_dict()) == snapshot
+
+
+def test_snapshot_repr_masks_passwords():
+    snapshot = _compile({"Broker": {"Password": "hunter2"}})
+    assert snapshot.Broker.Password == "hunter2"
+    assert "hunter2" not in repr(snapshot) and "Password=***" in repr(snapshot.Broker)
+    assert "YOUR_SECOND_PASSWORD" not in repr(snapshot)
+
+
+@pytest.mark.parametrize("overrides, problem", [
+    ({"Trading": {"MaxOpenTrades": 0}}, PARAMETER_RULES[0][0]),
+    ({"Strategy": {"RSI_Period": 0}}, PARAMETER_RULES[1][0]),
+    ({"Strategy": {"EMAFast_Period": 50}}, PARAMETER_RULES[2][0]),
+    ({"Strategy": {"RSI_Oversold": 70}}, PARAMETER_RULES[3][0]),
+    ({"Strategy": {"RSI_Overbought": 101}}, PARAMETER_RULES[3][0]),
+    ({"RiskManagement": {"PipDecimalValue": 0}}, PARAMETER_RULES[4][0]),
+    ({"TradeManagement": {"TrailingStop_DistancePips": -1}}, PARAMETER_RULES[5][0]),
+    ({"CandlePatterns": {"PinBar": {"WickMinPercent": 1.5}}}, PARAMETER_RULES[6][0]),
+    ({"Strategy": {"EMASlow_Period": "50"}}, "Strategy.EMASlow_Period must be of type int, not '50'"),
+    ({"Strategy": {"EMASlow_Period": 50.0}}, "Strategy.EMASlow_Period must be of type int"),
+    ({"Strategy": {"EnableRSIFilter": 1}}, "Strategy.EnableRSIFilter must be true or false, not 1"),
+    ({"Trading": {"MaxOpenTrades": True}}, "Trading.MaxOpenTrades must be of type int"),
+])
+def test_invalid_settings_are_rejected(overrides, problem):
+    with pytest.raises(ConfigError, match=re.escape(problem)):
+        _compile(overrides)
+
+
+def test_every_problem_is_listed():
+    data = settings.to_dict()
+    del data["TradeManagement"]
+    del data["Strategy"]["ADX_Period"]
+    data["Trading"]["Symbol"] = 5
+    with pytest.raises(ConfigError) as error:
+        compile_config(data)
+    message = str(error.value)
+    assert "Section TradeManagement is missing" in message
+    assert "Strategy.ADX_Period is missing" in message
+    assert "Trading.Symbol must be of type str" in message
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(settings.to_dict()))
+    return path
+
+
+def _touch(path):
+    # A distinct modification time even on filesystems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+
+def _rewrite(path, overrides):
+    path.write_text(json.dumps(merge_config(settings, overrides).to_dict()))
+    _touch(path)
+
+
+def test_watcher_reloads_the_reloadable_settings(config_file):
+    current = compile_config(settings)
+    watcher = ConfigWatcher(str(config_file), current)
+    assert not watcher.check()
+
+    _rewrite(config_file, {"Strategy": {"ADX_Threshold": 30}, "Broker": {"Server": "Other-Server"}})
+    assert not watcher.check()      # Settling: the file must stay the same for one interval
+    assert watcher.check()
+    snapshot = watcher.take()
+    assert snapshot.Strategy.ADX_Threshold == 30.0
+    assert snapshot.Broker.Server == current.Broker.Server     # Needs a restart
+    assert watcher.version == 1 and watcher.current is snapshot
+    assert watcher.take() is None
+
+
+def test_watcher_rejects_an_invalid_file(config_file):
+    current = compile_config(settings)
+    watcher = ConfigWatcher(str(config_file), current)
+    _rewrite(config_file, {"Strategy": {"EMAFast_Period": 60}})
+    watcher.check()
+    assert not watcher.check()
+    assert watcher.rejected == 1
+    assert watcher.take() is None and watcher.current is current
+
+    config_file.write_text("{ not json")
+    _touch(config_file)
+    watcher.check()
+    assert not watcher.check()
+    assert watcher.rejected == 2
+
+
+def test_strategy_reseeds_only_when_indicator_settings_change():
+    current = compile_config(settings)
+    strategy = XauUsdM5Strategy(mt5_connector=None, config=current)
+    indicators = strategy.indicators
+    strategy.configure(_compile({"Strategy": {"ADX_Threshold": 30}}))
+    assert strategy.indicators is indicators and strategy.config.Strategy.ADX_Threshold == 30.0
+    strategy.configure(_compile({"Strategy": {"EMAFast_Period": 13}}))
+    assert strategy.indicators is not indicators and strategy.indicators.ema_fast_period == 13
+
+
+def test_main_rebinds_the_strategy_and_trade_manager_to_a_reload(monkeypatch, config_file):
+    import main
+    from risk_management.batch_manager import BatchTradeManager
+    current = compile_config(settings)
+    watcher = ConfigWatcher(str(config_file), current)
+    monkeypatch.setattr(main, "config_watcher", watcher)
+    monkeypatch.setattr(main, "active_settings", current)
+    monkeypatch.setattr(main, "strategy", XauUsdM5Strategy(mt5_connector=None, config=current))
+    monkeypatch.setattr(main, "trade_manager", BatchTradeManager(None, current))
+
+    main.apply_config_reload()
+    assert main.active_settings is current
+
+    _rewrite(config_file, {"TradeManagement": {"TrailingStop_DistancePips": 25}})
+    watcher.check()
+    watcher.check()
+    main.apply_config_reload()
+    assert main.active_settings.TradeManagement.TrailingStop_DistancePips == 25.0
+    assert main.strategy.config is main.active_settings
+    assert main.trade_manager.config is main.active_settings
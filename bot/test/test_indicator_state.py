@@ -0,0 +1,66 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from strategies.indicator_state import IndicatorState
+
+
+def _state():
+    return IndicatorState(ema_fast_period=21, ema_slow_period=50, rsi_period=14, adx_period=14)
+
+
+def _assert_same_values(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        assert (math.isnan(actual[key]) and math.isnan(value)) or actual[key] == pytest.approx(value, rel=1e-9), key
+
+
+def _simple_average_rsi(close, period):
+    delta = close.diff()
+    gain = delta.clip(lower=0).rolling(period).mean()
+    loss = (-delta).clip(lower=0).rolling(period).mean()
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+def test_step_by_step_updates_match_a_reseed(bars):
+    stepped = _state()
+    stepped.seed(bars.iloc[:100])
+    for end in range(101, len(bars) + 1):
+        # Overlapping windows of the newest bars, like the delta fetches of the live loop
+        assert stepped.update(bars.iloc[max(0, end - 5):end]) == 1
+        if end % 250 == 0 or end == len(bars):
+            reseeded = _state()
+            reseeded.seed(bars.iloc[:end])
+            _assert_same_values(stepped.values(), reseeded.values())
+            assert stepped.last_time == reseeded.last_time
+
+
+def test_rsi_uses_simple_averages(bars):
+    state = _state()
+    expected = _simple_average_rsi(bars['close'], 14).to_numpy()
+    state.seed(bars.iloc[:1])
+    for end in range(2, 600):
+        state.update(bars.iloc[end - 2:end])
+        rsi = state.values()['rsi']
+        if np.isnan(expected[end - 1]):
+            assert math.isnan(rsi)
+        else:
+            assert rsi == pytest.approx(expected[end - 1], rel=1e-9)
+
+
+def test_update_asks_for_a_reseed_without_continuity(bars):
+    state = _state()
+    assert state.update(bars.iloc[:10]) is None          # Cold
+    state.seed(bars.iloc[:500])
+    assert state.update(bars.iloc[600:610]) is None      # Gap: the last bar seen is not in the window
+    assert state.update(bars.iloc[:0]) is None
+    assert state.update(bars.iloc[495:500]) == 0         # Nothing newer
+
+    # The reseed the caller does on None lands on the same values as stepping through the gap
+    stepped = _state()
+    stepped.seed(bars.iloc[:500])
+    for end in range(501, 611):
+        stepped.update(bars.iloc[end - 2:end])
+    state.seed(bars.iloc[:610])
+    _assert_same_values(state.values(), stepped.values())
+    pd.testing.assert_frame_equal(state.to_frame(), stepped.to_frame())
@@ -0,0 +1,97 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import kernels
+
+LENGTH = 14
+
+
+@pytest.fixture(scope="module")
+def prices(bars):
+    prices = bars.iloc[:2000].copy()
+    # A few bars without any range exercise pandas_ta's epsilon nudge of the true range
+    flat = prices.index[[300, 301, 900]]
+    for col in ('open', 'high', 'low'):
+        prices.loc[flat, col] = prices.loc[flat, 'close']
+    return prices
+
+
+# --- Pure-pandas references, written the way pandas_ta computes them ---
+def _rma(series, length):
+    return series.ewm(alpha=1.0 / length, adjust=True, min_periods=length).mean()
+
+
+def _true_range(high, low, close):
+    span = high - low
+    if span.eq(0).any():
+        span = span + sys.float_info.epsilon
+    prev_close = close.shift(1)
+    out = pd.concat([span, (high - prev_close).abs(), (prev_close - low).abs()], axis=1).max(axis=1)
+    out.iloc[0] = np.nan
+    return out
+
+
+def _adx(high, low, close, length):
+    up = high - high.shift(1)
+    down = low.shift(1) - low
+    plus_dm = ((up > down) & (up > 0)) * up
+    minus_dm = ((down > up) & (down > 0)) * down
+    plus_dm[plus_dm.abs() < sys.float_info.epsilon] = 0.0
+    minus_dm[minus_dm.abs() < sys.float_info.epsilon] = 0.0
+    scale = 100.0 / _rma(_true_range(high, low, close), length)
+    plus_di = scale * _rma(plus_dm, length)
+    minus_di = scale * _rma(minus_dm, length)
+    dx = 100.0 * (plus_di - minus_di).abs() / (plus_di + minus_di)
+    return _rma(dx, length), plus_di, minus_di
+
+
+def _assert_matches(ours, reference):
+    reference = pd.Series(reference).to_numpy(dtype=np.float64)
+    assert len(ours) == len(reference)
+    np.testing.assert_array_equal(np.isnan(ours), np.isnan(reference))
+    np.testing.assert_allclose(ours, reference, rtol=0, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("span", [3, 21, 50])
+def test_ema(prices, span):
+    close = prices['close']
+    _assert_matches(kernels.ema(close, span), close.ewm(span=span, adjust=False).mean())
+
+
+def test_rma_skips_missing_values_but_decays_through_them(prices):
+    close = prices['close'].copy()
+    close.iloc[[0, 40, 41, 500]] = np.nan
+    _assert_matches(kernels.rma(close, LENGTH), _rma(close, LENGTH))
+
+
+def test_rsi(prices):
+    close = prices['close']
+    delta = close.diff()
+    gains, losses = delta.clip(lower=0), (-delta).clip(lower=0)
+    wilder_gain, wilder_loss = _rma(gains, LENGTH), _rma(losses, LENGTH)
+    _assert_matches(kernels.rsi(close, LENGTH), 100.0 * wilder_gain / (wilder_gain + wilder_loss))
+
+    # The strategy's RSI: simple averages, the first bar counting as no change
+    delta = delta.fillna(0.0)
+    simple_gain = delta.clip(lower=0).rolling(LENGTH).mean()
+    simple_loss = (-delta).clip(lower=0).rolling(LENGTH).mean()
+    _assert_matches(kernels.rsi(close, LENGTH, wilder=False), 100.0 - 100.0 / (1.0 + simple_gain / simple_loss))
+
+
+def test_true_range_and_atr(prices):
+    high, low, close = prices['high'], prices['low'], prices['close']
+    _assert_matches(kernels.true_range(high, low, close), _true_range(high, low, close))
+    _assert_matches(kernels.atr(high, low, close, LENGTH), _rma(_true_range(high, low, close), LENGTH))
+
+
+def test_adx(prices):
+    high, low, close = prices['high'], prices['low'], prices['close']
+    for ours, reference in zip(kernels.adx(high, low, close, LENGTH), _adx(high, low, close, LENGTH)):
+        _assert_matches(ours, reference)
+
+
+def test_short_histories():
+    assert len(kernels.ema(np.array([]), 5)) == 0
+    adx, plus_di, minus_di = kernels.adx(np.ones(5), np.ones(5), np.ones(5), LENGTH)
+    assert np.isnan(adx).all() and np.isnan(plus_di).all() and np.isnan(minus_di).all()
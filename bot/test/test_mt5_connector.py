@@ -0,0 +1,115 @@
+from collections import Counter
+from types import SimpleNamespace
+import pytest
+from connectors import mt5_connector
+from connectors.mt5_connector import MT5Connector
+import MetaTrader5 as mt5
+
+
+class _Terminal:
+    """MetaTrader5 stand-in counting the calls that reach the terminal."""
+    def __init__(self):
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        return getattr(mt5, name)
+
+    def account_info(self):
+        self.calls['account_info'] += 1
+        return SimpleNamespace(balance=1000.0 + self.calls['account_info'])
+
+    def symbol_info(self, symbol):
+        self.calls['symbol_info'] += 1
+        return SimpleNamespace(name=symbol, point=0.01)
+
+    def symbol_info_tick(self, symbol):
+        self.calls['symbol_info_tick'] += 1
+        return SimpleNamespace(bid=2000.0, ask=2000.2)
+
+    def positions_get(self, symbol=None):
+        self.calls['positions_get'] += 1
+        return ()
+
+    def order_send(self, request):
+        self.calls['order_send'] += 1
+        return SimpleNamespace(retcode=mt5.TRADE_RETCODE_DONE, comment="Done")
+
+
+@pytest.fixture
+def terminal(monkeypatch):
+    terminal = _Terminal()
+    monkeypatch.setattr(mt5_connector, "mt5", terminal)
+    return terminal
+
+
+def _connector(**kwargs):
+    connector = MT5Connector(1, "secret", "Demo", **kwargs)
+    connector.connected = True
+    return connector
+
+
+def test_reads_inside_a_snapshot_reach_the_terminal_once(terminal):
+    connector = _connector()
+    with connector.snapshot():
+        for _ in range(3):
+            connector.get_account_info()
+            connector.get_last_tick("XAUUSD")
+            connector.get_open_positions("XAUUSD")
+        connector.get_last_tick("EURUSD")
+    assert terminal.calls == Counter(account_info=1, symbol_info_tick=2, positions_get=1)
+    assert (connector.hits, connector.misses, connector.round_trips) == (6, 4, 4)
+    assert connector.cache_stats()['hit_rate'] == pytest.approx(0.6)
+
+
+def test_reads_outside_a_snapshot_are_not_cached(terminal):
+    connector = _connector()
+    with connector.snapshot():
+        connector.get_account_info()
+    connector.get_account_info()
+    connector.get_account_info()
+    assert terminal.calls['account_info'] == 3 and connector.hits == 0
+    # Nothing outlives the block
+    with connector.snapshot():
+        connector.get_account_info()
+    assert terminal.calls['account_info'] == 4
+
+
+def test_a_fresh_tick_replaces_the_snapshot_copy(terminal):
+    connector = _connector()
+    with connector.snapshot():
+        connector.get_last_tick("XAUUSD")
+        connector.get_fresh_tick("XAUUSD")
+        connector.get_last_tick("XAUUSD")
+    assert terminal.calls['symbol_info_tick'] == 2
+
+
+def test_symbol_info_is_reused_until_its_ttl_expires(terminal, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(mt5_connector, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    connector = _connector(symbol_info_ttl=60.0)
+    connector.get_symbol_info("XAUUSD")
+    clock[0] += 59.0
+    connector.get_symbol_info("XAUUSD")
+    connector.get_symbol_info("EURUSD")
+    assert terminal.calls['symbol_info'] == 2
+
+    clock[0] += 1.0
+    connector.get_symbol_info("XAUUSD")
+    connector.get_symbol_info("XAUUSD")
+    assert terminal.calls['symbol_info'] == 3
+    assert (connector.hits, connector.misses) == (2, 3)
+
+
+def test_a_trade_request_drops_the_cached_account_and_positions(terminal):
+    connector = _connector()
+    with connector.snapshot():
+        before = connector.get_account_info()
+        connector.get_open_positions()
+        connector.get_last_tick("XAUUSD")
+        connector.modify_position(7, 1990.0, 2020.0)
+        after = connector.get_account_info()
+        connector.get_open_positions()
+        connector.get_last_tick("XAUUSD")
+        assert connector.get_account_info() is after
+    assert after is not before
+    assert terminal.calls == Counter(account_info=2, positions_get=2, symbol_info_tick=1, order_send=1)
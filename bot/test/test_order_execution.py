@@ -0,0 +1,157 @@
+from collections import namedtuple
+from types import SimpleNamespace
+import pytest
+from connectors.order_execution import OrderExecutor, filling_mode, normalize_volume
+import MetaTrader5 as mt5
+
+MAGIC = 23400
+COMMENT = "BUY by Python Bot 1700000000"
+
+SymbolInfo = namedtuple('SymbolInfo', ['point', 'digits', 'volume_min', 'volume_max', 'volume_step',
+                                       'filling_mode'])
+Tick = namedtuple('Tick', ['bid', 'ask'])
+Position = namedtuple('Position', ['ticket', 'magic', 'comment', 'volume', 'price_open'])
+Deal = namedtuple('Deal', ['entry', 'symbol', 'magic', 'comment', 'position_id', 'volume', 'price'])
+Order = namedtuple('Order', ['state', 'symbol', 'magic', 'comment', 'position_id', 'volume_initial',
+                             'volume_current', 'price_current'])
+
+
+class _Terminal:
+    """
+    Connector stand-in answering order_send with scripted retcodes (None for a
+    lost reply). A filled order opens a position; lost_fill=True also opens one
+    for a lost reply, as when the terminal executed it but the answer never came.
+    """
+    def __init__(self, retcodes, filling=mt5.SYMBOL_FILLING_IOC, lost_fill=False):
+        self.retcodes = list(retcodes)
+        self.symbol_info = SymbolInfo(0.01, 2, 0.01, 100.0, 0.01, filling)
+        self.lost_fill = lost_fill
+        self.requests = []
+        self.positions, self.deals, self.orders = [], [], []
+        self.ask = 2000.0
+
+    def get_symbol_info(self, symbol):
+        return self.symbol_info
+
+    def check_order(self, request):
+        return SimpleNamespace(retcode=0, comment="Done")
+
+    def send_order(self, request):
+        self.requests.append(dict(request))
+        retcode = self.retcodes.pop(0)
+        if retcode == mt5.TRADE_RETCODE_DONE or (retcode is None and self.lost_fill):
+            self.positions.append(Position(len(self.positions) + 1, request["magic"], request["comment"],
+                                           request["volume"], request["price"]))
+        if retcode is None:
+            return None
+        return SimpleNamespace(retcode=retcode, order=len(self.positions), volume=request["volume"],
+                               price=request["price"], comment="", request=request)
+
+    def get_fresh_tick(self, symbol):
+        self.ask += 0.25
+        return Tick(self.ask - 0.2, self.ask)
+
+    def get_open_positions(self, symbol=None):
+        return list(self.positions)
+
+    def get_deals(self, since, until):
+        return list(self.deals)
+
+    def get_history_orders(self, since, until):
+        return list(self.orders)
+
+
+def _execute(terminal, volume=0.1, comment=COMMENT, **kwargs):
+    executor = OrderExecutor(terminal, MAGIC, deviation=20, retry_delay=0.0, **kwargs)
+    result = executor.execute("XAUUSD", mt5.ORDER_TYPE_BUY, volume, 2000.0, 1990.0, 2020.0, comment)
+    return executor, result
+
+
+def test_requotes_are_repriced_from_a_fresh_tick_until_filled():
+    terminal = _Terminal([mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_PRICE_CHANGED, mt5.TRADE_RETCODE_DONE])
+    executor, result = _execute(terminal)
+    assert result.retcode == mt5.TRADE_RETCODE_DONE
+    assert [request["price"] for request in terminal.requests] == [2000.0, 2000.25, 2000.5]
+    assert executor.stats()['requotes'] == 2 and executor.stats()['rejected'] == 0
+    assert executor.slippage_points.summary()['count'] == 1
+
+
+def test_other_rejections_are_not_retried():
+    terminal = _Terminal([mt5.TRADE_RETCODE_INVALID_STOPS])
+    executor, result = _execute(terminal)
+    assert result.retcode == mt5.TRADE_RETCODE_INVALID_STOPS
+    assert len(terminal.requests) == 1 and executor.rejected == 1
+
+
+@pytest.mark.parametrize("deadline, max_attempts, sends", [(0.0, 5, 1), (10.0, 3, 3)])
+def test_requotes_stop_at_the_deadline_or_the_attempt_limit(deadline, max_attempts, sends):
+    terminal = _Terminal([mt5.TRADE_RETCODE_REQUOTE] * 10)
+    executor, result = _execute(terminal, deadline=deadline, max_attempts=max_attempts)
+    assert result.retcode == mt5.TRADE_RETCODE_REQUOTE
+    assert len(terminal.requests) == sends
+    assert executor.requotes == sends and executor.rejected == 1
+
+
+@pytest.mark.parametrize("flags, mode", [
+    (mt5.SYMBOL_FILLING_IOC | mt5.SYMBOL_FILLING_FOK, mt5.ORDER_FILLING_IOC),
+    (mt5.SYMBOL_FILLING_FOK, mt5.ORDER_FILLING_FOK),
+    (0, mt5.ORDER_FILLING_RETURN),
+])
+def test_the_filling_mode_follows_the_symbol(flags, mode):
+    terminal = _Terminal([mt5.TRADE_RETCODE_DONE], filling=flags)
+    assert filling_mode(terminal.symbol_info) == mode
+    _execute(terminal)
+    assert terminal.requests[0]["type_filling"] == mode
+
+
+def test_volume_is_normalized_to_the_symbol():
+    info = SymbolInfo(0.01, 2, 0.01, 5.0, 0.01, 0)
+    assert normalize_volume(0.237, info) == 0.23
+    assert normalize_volume(12.0, info) == 5.0
+    assert normalize_volume(0.004, info) == 0.0
+
+    terminal = _Terminal([])
+    _, result = _execute(terminal, volume=0.004)
+    assert result is None and terminal.requests == []
+
+
+def test_an_order_already_open_is_not_sent_again():
+    terminal = _Terminal([])
+    terminal.positions.append(Position(77, MAGIC, COMMENT, 0.1, 2000.1))
+    executor, result = _execute(terminal)
+    assert terminal.requests == []
+    assert (result.retcode, result.order, result.volume, result.price) == (mt5.TRADE_RETCODE_DONE, 77, 0.1, 2000.1)
+    assert executor.duplicates == 1
+
+
+def test_an_order_whose_position_already_closed_is_found_in_the_history():
+    terminal = _Terminal([])
+    terminal.deals.append(Deal(mt5.DEAL_ENTRY_IN, "XAUUSD", MAGIC, COMMENT, 78, 0.1, 2000.2))
+    _, result = _execute(terminal)
+    assert terminal.requests == [] and result.order == 78
+
+    terminal = _Terminal([])
+    terminal.orders.append(Order(mt5.ORDER_STATE_FILLED, "XAUUSD", MAGIC, COMMENT, 79, 0.1, 0.0, 2000.3))
+    _, result = _execute(terminal)
+    assert terminal.requests == [] and (result.order, result.volume) == (79, 0.1)
+
+
+def test_history_of_other_orders_does_not_block_a_send():
+    terminal = _Terminal([mt5.TRADE_RETCODE_DONE])
+    terminal.positions.append(Position(80, MAGIC + 1, COMMENT, 0.1, 2000.0))
+    terminal.deals.append(Deal(mt5.DEAL_ENTRY_OUT, "XAUUSD", MAGIC, COMMENT, 81, 0.1, 2000.0))
+    terminal.orders.append(Order(mt5.ORDER_STATE_FILLED + 1, "XAUUSD", MAGIC, COMMENT, 0, 0.1, 0.1, 0.0))
+    _, result = _execute(terminal)
+    assert result.retcode == mt5.TRADE_RETCODE_DONE and len(terminal.requests) == 1
+
+
+def test_a_lost_reply_is_looked_up_before_resending():
+    terminal = _Terminal([None, mt5.TRADE_RETCODE_DONE], lost_fill=True)
+    executor, result = _execute(terminal)
+    assert len(terminal.requests) == 1 and len(terminal.positions) == 1
+    assert result.order == 1 and result.comment == "Already sent"
+
+    # Not executed after all: sent again, once
+    terminal = _Terminal([None, mt5.TRADE_RETCODE_DONE])
+    _, result = _execute(terminal)
+    assert len(terminal.requests) == 2 and len(terminal.positions) == 1
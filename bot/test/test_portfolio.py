@@ -0,0 +1,75 @@
+import asyncio
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+import portfolio
+from config import settings, compile_config, ConfigError
+from portfolio import PortfolioRunner, load_instruments
+
+BAR_TIME = 1_700_000_100
+
+
+class _Connector:
+    @contextmanager
+    def snapshot(self):
+        yield
+
+    def get_open_positions(self, symbol=None):
+        return []
+
+
+class _Strategy:
+    """Serves the previous bar for the first `lag` syncs, then the new one."""
+    def __init__(self, lag):
+        self.lag = lag
+        self.syncs = 0
+        self.evaluated = []
+
+    def sync_market_data(self):
+        self.syncs += 1
+        opened = BAR_TIME if self.syncs > self.lag else BAR_TIME - 300
+        return pd.Series({'time': pd.Timestamp(opened, unit='s')})
+
+    def evaluate(self, forming_bar):
+        self.evaluated.append(int(forming_bar['time'].timestamp()))
+        return None, pd.Series(dtype=float)
+
+
+def _runner(lags):
+    config = compile_config(settings)
+    instruments = [SimpleNamespace(symbol=f"S{n}", config=config, max_open_trades=1, strategy=_Strategy(lag))
+                   for n, lag in enumerate(lags)]
+    return PortfolioRunner(_Connector(), instruments, max_open_trades=3, max_total_volume=1.0), instruments
+
+
+def test_a_symbol_listed_twice_is_rejected():
+    section = SimpleNamespace(Instruments=[{"Symbol": "XAUUSD", "Timeframe": "M5"},
+                                           {"Symbol": "XAUUSD", "Timeframe": "H1"}])
+    with pytest.raises(ConfigError, match="XAUUSD more than once"):
+        load_instruments(_Connector(), section)
+
+
+def test_lagging_symbols_are_polled_without_blocking_the_loop(monkeypatch):
+    monkeypatch.setattr(portfolio, "SYMBOL_BAR_WAIT_SECONDS", 0.3)
+    runner, (on_time, late, silent) = _runner([0, 3, 10 ** 6])
+    ticks = []
+
+    async def other_loop():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0.01)
+
+    async def cycle():
+        task = asyncio.ensure_future(other_loop())
+        try:
+            return await runner.run_entry_cycle([on_time, late, silent], BAR_TIME)
+        finally:
+            task.cancel()
+
+    assert asyncio.run(cycle()) is None
+    assert on_time.strategy.syncs == 1 and late.strategy.syncs == 4
+    assert on_time.strategy.evaluated == late.strategy.evaluated == [BAR_TIME]
+    # Given up after the wait, and the rest of the loop ran meanwhile
+    assert silent.strategy.evaluated == [] and silent.strategy.syncs > 4
+    assert len(ticks) >= 10
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from storage.tick_file import TickChunk, read_ticks, write_ticks, bars_from_ticks
+
+T0 = 1_699_999_980_000      # Epoch ms, on a minute boundary
+
+
+def _ticks(count, seed=3):
+    rng = np.random.default_rng(seed)
+    time_msc = T0 + np.cumsum(rng.integers(1, 900, count))
+    bid = np.round(2000.0 + np.cumsum(rng.normal(0.0, 0.05, count)), 2)
+    ask = np.round(bid + rng.integers(10, 40, count) * 0.01, 2)
+    return TickChunk(time_msc, bid, ask)
+
+
+def _split(ticks, bounds):
+    edges = [0, *bounds, len(ticks.time_msc)]
+    return [TickChunk(*(column[a:b] for column in ticks)) for a, b in zip(edges[:-1], edges[1:])]
+
+
+def _joined(chunks):
+    chunks = list(chunks)
+    return TickChunk(*(np.concatenate([chunk[i] for chunk in chunks]) for i in range(3))), chunks
+
+
+@pytest.mark.parametrize("name", ["ticks.ticks", "ticks.ticks.gz", "ticks.ticks.bz2", "ticks.ticks.xz"])
+def test_ticks_survive_a_write_and_read_in_uneven_chunks(tmp_path, name):
+    ticks = _ticks(1000)
+    path = str(tmp_path / name)
+    assert write_ticks(_split(ticks, [1, 300, 300, 777]), path) == 1000
+
+    read, chunks = _joined(read_ticks(path, chunk_ticks=64))
+    assert [len(chunk.time_msc) for chunk in chunks] == [64] * 15 + [40]
+    for column, expected in zip(read, ticks):
+        np.testing.assert_array_equal(column, expected)
+    assert all(column.flags['C_CONTIGUOUS'] for chunk in chunks for column in chunk)
+
+
+def test_csv_ticks_are_read_in_epoch_milliseconds(tmp_path):
+    ticks = _ticks(50)
+    frame = pd.DataFrame({'time': pd.to_datetime(ticks.time_msc, unit='ms').astype(str),
+                          'bid': ticks.bid, 'ask': ticks.ask, 'last': 0.0})
+    frame.to_csv(tmp_path / "dates.csv", index=False)
+    frame.assign(time=ticks.time_msc / 1000.0).to_csv(tmp_path / "seconds.csv", index=False)
+    for name in ("dates.csv", "seconds.csv"):
+        read, chunks = _joined(read_ticks(str(tmp_path / name), chunk_ticks=20))
+        assert len(chunks) == 3
+        for column, expected in zip(read, ticks):
+            np.testing.assert_array_equal(column, expected)
+
+
+def test_bars_from_ticks_builds_bid_bars():
+    seconds = np.array([0, 10, 20, 59.9, 60, 130, 170])
+    bid = np.array([10.0, 10.5, 9.5, 10.2, 11.0, 12.0, 11.5])
+    ask = bid + np.array([0.3, 0.2, 0.25, 0.3, 0.1, 0.2, 0.5])
+    bars = bars_from_ticks([TickChunk(T0 + (seconds * 1000).astype(np.int64), bid, ask)], 60)
+    assert list(bars['time']) == list(pd.to_datetime([T0, T0 + 60000, T0 + 120000], unit='ms'))
+    assert bars[['open', 'high', 'low', 'close']].values.tolist() == [
+        [10.0, 10.5, 9.5, 10.2], [11.0, 11.0, 11.0, 11.0], [12.0, 12.0, 11.5, 11.5]]
+    assert bars['tick_volume'].tolist() == [4, 1, 2]
+    assert bars['spread'].tolist() == [20, 10, 20]
+
+
+def test_bars_do_not_depend_on_the_chunk_boundaries():
+    ticks = _ticks(5000)
+    whole = bars_from_ticks([ticks], 60)
+    cut = bars_from_ticks(_split(ticks, [0, 1, 999, 1000, 2500, 4999]), 60)
+    assert len(whole) > 10
+    pd.testing.assert_frame_equal(cut, whole)
+    assert bars_from_ticks([], 300).empty
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from backtest.tick_replay import _next_event, SCAN_WINDOW
+
+
+def _reference(bids, asks, grid, lo, hi, levels):
+    # The same event rule, one tick at a time
+    bid_floor, bid_ceiling, ask_ceiling, ask_floor, buy_wake, sell_wake = levels
+    for j in range(lo, hi):
+        bid, ask = bids[j], asks[j]
+        if bid <= bid_floor or bid >= bid_ceiling or ask >= ask_ceiling or ask <= ask_floor:
+            return j
+        if (ask >= buy_wake or bid <= sell_wake) and (grid is None or grid[j]):
+            return j
+    return hi
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_next_event_matches_a_per_tick_loop(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 20 * SCAN_WINDOW))
+    bids = 2000.0 + np.cumsum(rng.normal(0.0, 0.1, n))
+    asks = bids + 0.2
+    grid = rng.random(n) < 0.05 if seed % 2 else None
+    levels = [-np.inf, np.inf, np.inf, -np.inf, np.inf, -np.inf]
+    # Switch a random subset of the levels on, around the price range
+    low, high = bids.min(), bids.max()
+    for k in rng.choice(6, size=int(rng.integers(0, 7)), replace=False):
+        levels[k] = rng.uniform(low - 0.5, high + 0.5)
+    lo = int(rng.integers(0, n))
+    hi = int(rng.integers(lo, n + 1))
+    assert _next_event(bids, asks, grid, lo, hi, tuple(levels)) == _reference(bids, asks, grid, lo, hi, levels)
+
+
+def test_next_event_finds_a_hit_past_the_first_windows():
+    bids = np.full(10 * SCAN_WINDOW, 2000.0)
+    asks = bids + 0.2
+    levels = (-np.inf, np.inf, np.inf, -np.inf, np.inf, 1999.0)
+    assert _next_event(bids, asks, None, 0, len(bids), levels) == len(bids)
+    bids[9 * SCAN_WINDOW + 3] = 1998.0
+    assert _next_event(bids, asks, None, 5, len(bids), levels) == 9 * SCAN_WINDOW + 3
+    # Outside [lo, hi) it is not seen, and a wake off the management grid waits
+    assert _next_event(bids, asks, None, 5, 9 * SCAN_WINDOW + 3, levels) == 9 * SCAN_WINDOW + 3
+    grid = np.zeros(len(bids), dtype=bool)
+    assert _next_event(bids, asks, grid, 0, len(bids), levels) == len(bids)
@@ -0,0 +1,130 @@
+from collections import namedtuple
+import pytest
+from utils.trade_analytics import PerformanceTracker, SERVER_TIME_SLACK_SECONDS
+from utils.trade_logger import TradeJournal
+import MetaTrader5 as mt5
+
+# The fields of MetaTrader5's TradeDeal the tracker reads
+TradeDeal = namedtuple('TradeDeal', ['ticket', 'time', 'time_msc', 'type', 'entry', 'magic', 'position_id',
+                                     'volume', 'price', 'commission', 'swap', 'profit', 'fee', 'symbol'])
+
+MAGIC = 23400
+OFFSET = 7200                   # Broker server on UTC+2
+T0 = 1_700_000_000 + OFFSET     # Broker time of the first deal
+
+
+def _deal(ticket, position, entry, buy, volume, price, seconds=0, profit=0.0, commission=0.0):
+    at = T0 + seconds
+    return TradeDeal(ticket=ticket, time=at, time_msc=at * 1000 + 250,
+                     type=mt5.DEAL_TYPE_BUY if buy else mt5.DEAL_TYPE_SELL,
+                     entry=mt5.DEAL_ENTRY_IN if entry else mt5.DEAL_ENTRY_OUT, magic=MAGIC, position_id=position,
+                     volume=volume, price=price, commission=commission, swap=0.0, profit=profit, fee=0.0,
+                     symbol="XAUUSD")
+
+
+def _order_placed(trade_id, **fields):
+    return {'trade_id': trade_id, 'magic_number': MAGIC, 'symbol': "XAUUSD", 'strategy_name': "ema",
+            'event_type': "ORDER_PLACED", 'direction': "BUY", 'lot_size': 0.3, 'entry_price': 2000.0,
+            'initial_sl': 1990.0, 'timestamp': T0 - OFFSET, **fields}
+
+
+class _Connector:
+    def __init__(self, deals):
+        self.deals = deals
+        self.windows = []
+
+    def get_deals(self, since, until):
+        self.windows.append((since, until))
+        return [deal for deal in self.deals if since <= deal.time < until]
+
+
+def _tracker(**kwargs):
+    tracker = PerformanceTracker({MAGIC: "ema"}, initial_balance=1000.0, **kwargs)
+    tracker.clock_offset = OFFSET
+    return tracker
+
+
+def test_a_trade_closed_in_parts_is_reported_once_fully_closed():
+    tracker = _tracker()
+    tracker.on_event(_order_placed(7))
+    assert tracker.on_deal(_deal(1, 7, True, True, 0.3, 2000.0, commission=-1.0)) is None
+    assert tracker.on_deal(_deal(2, 7, False, False, 0.1, 2010.0, 60, profit=100.0)) is None
+    assert tracker.summary()['open_trades'] == 1
+
+    closed = tracker.on_deal(_deal(3, 7, False, False, 0.2, 2020.0, 120, profit=400.0))
+    assert closed.direction == "BUY" and closed.volume == pytest.approx(0.3)
+    assert closed.entry_price == pytest.approx(2000.0)
+    assert closed.close_price == pytest.approx((0.1 * 2010.0 + 0.2 * 2020.0) / 0.3)
+    assert closed.pnl == pytest.approx(499.0)
+    assert closed.r_multiple == pytest.approx((closed.close_price - 2000.0) / 10.0)
+    # The closing deal's time, taken from broker time to UTC
+    assert closed.closed_at == pytest.approx(T0 + 120.25 - OFFSET)
+    summary = tracker.summary()
+    assert summary['trades'] == 1 and summary['open_trades'] == 0 and summary['equity'] == pytest.approx(1499.0)
+
+    # A deal read again is ignored
+    assert tracker.on_deal(_deal(3, 7, False, False, 0.2, 2020.0, 120, profit=400.0)) is None
+    assert tracker.summary()['trades'] == 1
+
+
+def test_a_trade_opened_before_the_history_window_takes_its_entry_from_the_journal():
+    tracker = _tracker()
+    tracker.on_event(_order_placed(8, direction="SELL", lot_size=0.2, entry_price=2000.0, initial_sl=2010.0))
+    closed = tracker.on_deal(_deal(4, 8, False, True, 0.2, 1980.0, profit=400.0))
+    assert (closed.direction, closed.entry_price, closed.initial_sl) == ("SELL", 2000.0, 2010.0)
+    assert closed.r_multiple == pytest.approx(2.0)
+
+    # Without the journal, the side comes from the closing deal and there is no entry price
+    closed = tracker.on_deal(_deal(5, 9, False, False, 0.1, 2005.0, profit=-50.0))
+    assert closed.direction == "BUY" and closed.entry_price is None and closed.r_multiple is None
+    assert tracker.summary()['trades'] == 2
+
+
+def test_deals_of_other_magic_numbers_and_balance_operations_are_ignored():
+    tracker = _tracker()
+    assert tracker.on_deal(_deal(6, 10, False, False, 0.1, 2005.0)._replace(magic=1)) is None
+    assert tracker.on_deal(_deal(7, 0, True, True, 0.0, 0.0)._replace(type=mt5.DEAL_TYPE_BALANCE)) is None
+    assert tracker.keys() == []
+
+
+def test_restore_rebuilds_the_closed_trades_and_the_open_entries(tmp_path):
+    journal = TradeJournal(str(tmp_path))
+    tracker = _tracker(journal=journal)
+    journal.subscribe(tracker.on_event)
+    for trade_id in (11, 12, 13):
+        journal.log(_order_placed(trade_id))
+    tracker.on_deal(_deal(21, 11, True, True, 0.3, 2000.0))
+    tracker.on_deal(_deal(22, 11, False, False, 0.3, 2015.0, 300, profit=450.0))
+    tracker.on_deal(_deal(23, 12, True, True, 0.3, 2000.0, 400))
+    tracker.on_deal(_deal(24, 12, False, False, 0.3, 1990.0, 900, profit=-300.0))
+    journal.flush(5)
+
+    restored = _tracker(journal=TradeJournal(str(tmp_path)))
+    assert restored.restore() == 2
+    assert restored.trades == tracker.trades
+    assert restored.equity_curve == tracker.equity_curve
+    assert restored.summary() == tracker.summary()
+    assert set(restored.entries) == {13}
+
+    # The open trade closes later against its journaled entry
+    closed = restored.on_deal(_deal(25, 13, False, False, 0.3, 2010.0, 1200, profit=300.0))
+    assert closed.r_multiple == pytest.approx(1.0)
+    journal.close()
+
+
+def test_sync_reads_from_the_newest_deal_and_forgets_deals_out_of_the_window():
+    deals = [_deal(31, 14, True, True, 0.1, 2000.0),
+             _deal(32, 14, False, False, 0.1, 2010.0, 60, profit=100.0)]
+    connector = _Connector(deals)
+    tracker = _tracker(history_days=1)
+    now = T0 - OFFSET + 3600
+    assert [t.trade_id for t in tracker.sync(connector, now, clock_offset=OFFSET)] == [14]
+    assert tracker.synced_to == T0 + 60
+    assert set(tracker.seen_deals) == {31, 32}
+
+    # Two days on: the next window starts a day before the newest deal, so the old ones go
+    deals.append(_deal(33, 15, True, True, 0.1, 2000.0, 2 * 86400))
+    assert tracker.sync(connector, now + 2 * 86400) == []
+    assert connector.windows[-1][0] == T0 + 60 - SERVER_TIME_SLACK_SECONDS
+    assert set(tracker.seen_deals) == {33}
+    assert tracker.summary()['trades'] == 1 and tracker.summary()['open_trades'] == 1
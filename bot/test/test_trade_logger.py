@@ -0,0 +1,88 @@
+import os
+import threading
+import types
+import pandas as pd
+import pytest
+from utils import trade_logger
+from utils.trade_logger import TradeJournal, TRADE_LOG_COLUMNS
+
+DAY = 1_700_000_000 // 86400 * 86400   # A UTC midnight
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drives the event timestamps log() stamps."""
+    now = types.SimpleNamespace(value=DAY + 3600.0)
+    monkeypatch.setattr(trade_logger, 'time', types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def _event(trade_id, event_type="ORDER_PLACED", **fields):
+    return {'trade_id': trade_id, 'magic_number': 1, 'symbol': "XAUUSD", 'strategy_name': "test",
+            'event_type': event_type, 'direction': "BUY", 'lot_size': 0.1, 'entry_price': 2000.5, **fields}
+
+
+def test_events_are_written_in_batches(tmp_path):
+    journal = TradeJournal(str(tmp_path), batch_size=256)
+    batches, release = [], threading.Event()
+    write = journal._write
+
+    def slow_write(batch):
+        # Hold the writer on its first batch so the rest queue up behind it
+        release.wait(5)
+        batches.append(len(batch))
+        write(batch)
+    journal._write = slow_write
+
+    for i in range(600):
+        journal.log(_event(i))
+    release.set()
+    journal.close()
+    assert sum(batches) == 600
+    assert max(batches) <= 256
+    assert len(batches) <= 4
+    assert journal.written == 600
+    assert len(journal.query()) == 600
+
+
+def test_files_rotate_by_size_and_day(tmp_path, clock):
+    journal = TradeJournal(str(tmp_path), max_bytes=1)
+    for group in range(3):
+        journal.log(_event(group))
+        journal.flush()
+    clock.value += 86400
+    journal.log(_event(3))
+    journal.close()
+
+    names = [os.path.basename(path) for path in journal.files()]
+    day = pd.Timestamp(DAY, unit='s').strftime('%Y%m%d')
+    next_day = pd.Timestamp(DAY + 86400, unit='s').strftime('%Y%m%d')
+    assert names == [f"trade_journal_{day}_000.sqlite", f"trade_journal_{day}_001.sqlite",
+                     f"trade_journal_{day}_002.sqlite", f"trade_journal_{next_day}_000.sqlite"]
+    assert journal.query()['trade_id'].tolist() == [0, 1, 2, 3]
+
+
+def test_query_filters(tmp_path, clock):
+    journal = TradeJournal(str(tmp_path))
+    journal.log(_event(1))
+    clock.value += 60
+    journal.log(_event(1, "TRADE_CLOSED", close_price=2010.0, pnl=95.5))
+    clock.value += 86400
+    journal.log(_event(2))
+    journal.log(_event(2, "SL_MODIFIED", reason_message="Breakeven"))
+
+    events = journal.query()
+    assert list(events.columns) == TRADE_LOG_COLUMNS
+    assert str(events['trade_id'].dtype) == 'Int64'
+    assert pd.api.types.is_datetime64_any_dtype(events['timestamp'])
+    assert events['pnl'].isna().tolist() == [True, False, True, True]
+
+    assert journal.query(trade_id=1)['event_type'].tolist() == ["ORDER_PLACED", "TRADE_CLOSED"]
+    assert journal.query(event_type=["TRADE_CLOSED", "SL_MODIFIED"])['trade_id'].tolist() == [1, 2]
+    day_start = pd.Timestamp(DAY, unit='s')
+    assert journal.query(start=day_start + pd.Timedelta(days=1))['trade_id'].tolist() == [2, 2]
+    assert journal.query(end=day_start + pd.Timedelta(hours=1, seconds=60))['event_type'].tolist() == ["ORDER_PLACED"]
+
+    empty = journal.query(trade_id=99)
+    assert empty.empty and list(empty.columns) == TRADE_LOG_COLUMNS
+    journal.close()
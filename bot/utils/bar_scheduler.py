@@ -0,0 +1,171 @@
+import asyncio
+import inspect
+import time
+from collections import deque, namedtuple
+import numpy as np
+from utils.logger import log
+from utils.metrics import event_loop_lag_seconds
+
+# Bar length of the supported timeframes, in seconds
+TIMEFRAME_SECONDS = {
+    "M1": 60,
+    "M5": 300,
+    "M15": 900,
+    "M30": 1800,
+    "H1": 3600,
+    "H4": 14400,
+    "D1": 86400,
+}
+# Broker servers run on whole-quarter-hour UTC offsets
+_OFFSET_STEP = 900
+
+# How often the event loop's wake-up lag is sampled, in seconds
+LAG_SAMPLE_INTERVAL = 0.5
+
+# Latencies of one entry cycle, in milliseconds after the bar closed
+CycleLatency = namedtuple('CycleLatency', ['bar_time', 'detected_ms', 'evaluated_ms', 'order_ms'])
+
+
+class BarCloseScheduler:
+    """
+    asyncio scheduler driven by the broker's clock instead of the local one.
+
+    The entry loop sleeps until just before the broker time of the next bar
+    open, then polls the terminal's newest bar and calls on_bar_close as soon
+    as it appears. The management loop calls on_manage on its own, shorter
+    interval. Callbacks run on the event loop thread, so terminal calls are
+    never made concurrently; an on_bar_close that returns an awaitable is
+    awaited, letting the management loop run while it waits.
+    """
+    def __init__(self, connector, symbol, timeframe, timeframe_seconds, on_bar_close, on_manage,
+                 management_interval=5.0, poll_interval=0.02, max_poll_interval=5.0, history=500):
+        """
+        :param timeframe: The MT5 timeframe enum passed to the connector.
+        :param timeframe_seconds: Bar length in seconds (see TIMEFRAME_SECONDS).
+        :param on_bar_close: Called with the broker open time (epoch seconds) of the
+                             new bar. Returns the local time.time() at which an order
+                             was sent, or None if none was.
+        :param on_manage: Called every management_interval seconds; None runs no
+                          management loop (e.g. when another scheduler has it).
+        :param poll_interval: Seconds between terminal polls around a bar close.
+        :param max_poll_interval: Poll interval once the bar is long overdue
+                                  (market closed, no ticks).
+        :param history: Number of CycleLatency records kept.
+        """
+        self.connector = connector
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.period = timeframe_seconds
+        self.on_bar_close = on_bar_close
+        self.on_manage = on_manage
+        self.management_interval = management_interval
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.latencies = deque(maxlen=history)
+        self.clock_offset = 0   # Broker time minus local time, in seconds
+        self.running = False
+
+    def broker_now(self):
+        return time.time() + self.clock_offset
+
+    def _sync_clock(self, broker_time, local_time):
+        # The last tick may be a few seconds old; the offset itself is whole quarter hours
+        self.clock_offset = round((broker_time - local_time) / _OFFSET_STEP) * _OFFSET_STEP
+
+    async def run(self):
+        """Runs both loops until stop() is called."""
+        self.running = True
+        tick = self.connector.get_last_tick(self.symbol)
+        if tick is not None:
+            self._sync_clock(tick.time, time.time())
+        log.info(f"Broker clock offset: {self.clock_offset / 3600:+.2f}h. "
+                 f"Entry on each {self.period}s bar close of {self.symbol}.")
+        loops = [self._entry_loop()]
+        if self.on_manage is not None:
+            # One lag sampler per loop is enough; it rides with the management loop
+            loops.extend([self._management_loop(), self._lag_loop()])
+        await asyncio.gather(*loops)
+
+    def stop(self):
+        self.running = False
+
+    async def _entry_loop(self):
+        last_bar = self.connector.get_last_bar_time(self.symbol, self.timeframe)
+        while self.running:
+            if last_bar is None:
+                await asyncio.sleep(self.max_poll_interval)
+                last_bar = self.connector.get_last_bar_time(self.symbol, self.timeframe)
+                continue
+
+            # Sleep until the expected close, then poll until the terminal shows the new bar
+            wait = last_bar + self.period - self.broker_now()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            bar_time = await self._wait_for_new_bar(last_bar)
+            if bar_time is None:
+                return
+            detected_at = time.time()
+            self._sync_clock(bar_time, detected_at)
+            last_bar = bar_time
+
+            try:
+                order_at = self.on_bar_close(bar_time)
+                if inspect.isawaitable(order_at):
+                    order_at = await order_at
+            except Exception as e:
+                log.exception(f"Entry cycle for bar {bar_time} failed: {e}")
+                continue
+            self._record(bar_time, detected_at, time.time(), order_at)
+
+    async def _wait_for_new_bar(self, last_bar):
+        delay = self.poll_interval
+        overdue_after = time.monotonic() + self.period
+        while self.running:
+            bar_time = self.connector.get_last_bar_time(self.symbol, self.timeframe)
+            if bar_time is not None and bar_time > last_bar:
+                return bar_time
+            if time.monotonic() > overdue_after:
+                # No new bar a whole period late: the market is closed, back off
+                delay = min(delay * 2, self.max_poll_interval)
+            await asyncio.sleep(delay)
+        return None
+
+    async def _management_loop(self):
+        while self.running:
+            started = time.monotonic()
+            try:
+                self.on_manage()
+            except Exception as e:
+                log.exception(f"Management cycle failed: {e}")
+            await asyncio.sleep(max(0.0, self.management_interval - (time.monotonic() - started)))
+
+    async def _lag_loop(self):
+        # A blocking callback delays every other coroutine; the oversleep measures it
+        while self.running:
+            started = time.perf_counter()
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+            event_loop_lag_seconds.observe(max(0.0, time.perf_counter() - started - LAG_SAMPLE_INTERVAL))
+
+    def _record(self, bar_time, detected_at, evaluated_at, order_at):
+        closed_at = bar_time - self.clock_offset
+        latency = CycleLatency(
+            bar_time=bar_time,
+            detected_ms=(detected_at - closed_at) * 1000,
+            evaluated_ms=(evaluated_at - closed_at) * 1000,
+            order_ms=(order_at - closed_at) * 1000 if order_at else None
+        )
+        self.latencies.append(latency)
+        order = f", order sent at +{latency.order_ms:.0f} ms" if order_at else ""
+        log.info(f"Bar close detected at +{latency.detected_ms:.0f} ms, "
+                 f"evaluated at +{latency.evaluated_ms:.0f} ms{order}.")
+
+    def latency_summary(self):
+        """Median, 95th percentile and max of each latency over the kept cycles, in ms."""
+        summary = {'cycles': len(self.latencies)}
+        for field in ('detected_ms', 'evaluated_ms', 'order_ms'):
+            values = np.array([getattr(c, field) for c in self.latencies if getattr(c, field) is not None])
+            if len(values):
+                summary[field] = {'p50': float(np.percentile(values, 50)),
+                                  'p95': float(np.percentile(values, 95)),
+                                  'max': float(values.max())}
+        return summary
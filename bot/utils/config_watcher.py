@@ -0,0 +1,199 @@
+import argparse
+import os
+import threading
+import time
+from utils.logger import log
+from utils.metrics import config_reloads
+from config import settings, load_config, compile_config, ConfigError
+
+# Default for the optional ConfigReload.IntervalSeconds: how often the file is checked
+DEFAULT_INTERVAL_SECONDS = 2.0
+# Settings a reload may change; anything else (broker, symbols, endpoints) needs a restart
+RELOADABLE = ('Strategy', 'CandlePatterns', 'RiskManagement', 'TradeManagement', 'Trading.MaxOpenTrades')
+
+
+def _get(data, path):
+    for key in path.split('.'):
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def _set(data, path, value):
+    *parents, key = path.split('.')
+    for parent in parents:
+        data = data.setdefault(parent, {})
+    if value is None:
+        data.pop(key, None)
+    else:
+        data[key] = value
+
+
+def _changed_paths(old, new, prefix=''):
+    paths = []
+    for key in sorted(set(old) | set(new)):
+        a, b = old.get(key), new.get(key)
+        if isinstance(a, dict) and isinstance(b, dict):
+            paths += _changed_paths(a, b, f"{prefix}{key}.")
+        elif a != b:
+            paths.append(f"{prefix}{key}")
+    return paths
+
+
+class ConfigWatcher:
+    """
+    Watches the config file and prepares a new settings snapshot whenever it
+    changes, for the trading loop to swap in between two cycles.
+
+    A background thread compares the file's modification time and size every
+    `interval` seconds. A changed file, once it has stayed the same for one
+    interval, is loaded and compiled off the trading thread; only the RELOADABLE settings are taken from it, the others keep
+    their running values (with a warning, as they need a restart). A file
+    that fails to load or validate is rejected and the current snapshot stays.
+
+    The new snapshot is only held as pending: take() hands it over, and the
+    caller rebinds its components at a bar boundary, so a cycle never sees a
+    mix of old and new values and nothing reconnects.
+    """
+    def __init__(self, path, snapshot, interval=DEFAULT_INTERVAL_SECONDS):
+        """
+        :param path: The config file.
+        :param snapshot: The compiled settings currently in use.
+        """
+        self.path = path
+        self.current = snapshot
+        self.interval = interval
+        self.version = 0
+        self.rejected = 0
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stamp = self._file_stamp()
+        self._settling = None
+
+    def _file_stamp(self):
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ConfigWatcher", daemon=True)
+            self._thread.start()
+            log.info(f"Watching {self.path} for settings changes every {self.interval}s.")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # A bad reload must never take the bot down
+                log.error(f"Config reload: unexpected error: {e}")
+
+    def check(self):
+        """
+        Looks at the file once; if it changed and has stayed the same since
+        the previous look, loads, validates and compiles it.
+
+        :return: True when a new snapshot is now pending.
+        """
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            self._settling = None
+            return False
+        if stamp != self._settling:
+            # Wait until the file stays the same for one interval, so one being written is read whole
+            self._settling = stamp
+            return False
+        self._stamp = stamp
+
+        config = load_config(self.path)
+        if config is None:
+            return self._reject("the file could not be loaded")
+        with self._lock:
+            base = self._pending or self.current
+        running, wanted = base.to_dict(), config.to_dict()
+
+        data = dict(running)
+        for path in RELOADABLE:
+            _set(data, path, _get(wanted, path))
+        ignored = [path for path in _changed_paths(running, wanted)
+                   if not any(path == r or path.startswith(r + '.') for r in RELOADABLE)]
+        if ignored:
+            log.warning(f"Config reload: {', '.join(ignored)} changed but only take effect on restart.")
+
+        try:
+            snapshot = compile_config(data)
+        except ConfigError as e:
+            return self._reject(str(e))
+        if snapshot == base:
+            config_reloads.labels(outcome="unchanged").inc()
+            return False
+
+        changes = _changed_paths(running, snapshot.to_dict())
+        with self._lock:
+            self._pending = snapshot
+        log.info(f"Config reload: new settings ready ({', '.join(changes)}); applied at the next bar.")
+        return True
+
+    def _reject(self, reason):
+        self.rejected += 1
+        config_reloads.labels(outcome="rejected").inc()
+        log.error(f"Config reload rejected, keeping the current settings: {reason}")
+        return False
+
+    def take(self):
+        """
+        The pending snapshot, which becomes the current one; None when the
+        settings have not changed. Called by the trading loop at a bar boundary.
+        """
+        with self._lock:
+            snapshot, self._pending = self._pending, None
+            if snapshot is None:
+                return None
+            self.current = snapshot
+            self.version += 1
+        config_reloads.labels(outcome="applied").inc()
+        log.info(f"Config reload: settings version {self.version} applied.")
+        return snapshot
+
+
+def watcher_from_config(snapshot, config=None):
+    """
+    Starts a ConfigWatcher on the settings file as described by the optional
+    ConfigReload section (Enabled, IntervalSeconds). Off when the section is absent.
+    """
+    section = getattr(config or snapshot, "ConfigReload", None)
+    if not getattr(section, "Enabled", False):
+        return None
+    interval = getattr(section, "IntervalSeconds", DEFAULT_INTERVAL_SECONDS)
+    return ConfigWatcher(settings.path, snapshot, interval).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a config file and show its compiled snapshot.")
+    parser.add_argument("path", nargs="?", default=settings.path)
+    args = parser.parse_args()
+
+    config = load_config(args.path)
+    if config is None:
+        raise SystemExit(1)
+    try:
+        snapshot = compile_config(config)
+    except ConfigError as e:
+        log.error(str(e))
+        raise SystemExit(1)
+    for section in ('Trading', 'Strategy', 'RiskManagement', 'TradeManagement', 'CandlePatterns'):
+        log.info(f"{section}: {getattr(snapshot, section)}")
+    log.info(f"{args.path} is valid.")
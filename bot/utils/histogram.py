@@ -0,0 +1,64 @@
+import bisect
+import math
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: observing a value is a bisect and an increment, so
+    it can sit on the trading path. Percentiles are interpolated inside the
+    bucket they fall in.
+    """
+    def __init__(self, bounds):
+        """
+        :param bounds: Increasing upper bounds of the buckets; values above the
+                       last one go to an overflow bucket.
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """Estimated q-th percentile (0-100), or None without observations."""
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else self.min
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def buckets(self):
+        """(upper bound, cumulative count) pairs, the last bound being inf."""
+        cumulative, out = 0, []
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += count
+            out.append((bound, cumulative))
+        return out
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'min': self.min,
+            'max': self.max,
+        }
@@ -3,6 +3,18 @@ import sys
 import os
 from datetime import datetime
 
+class _DeferredFileHandler(logging.FileHandler):
+    """
+    FileHandler that creates its directory and opens its file on the first
+    record instead of at construction, so importing the logger touches no disk.
+    """
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 def setup_logger():
     """
     Set up the main logger for the application.
@@ -27,13 +39,11 @@ def setup_logger():
     logger.addHandler(stream_handler)
 
     # --- File Handler ---
-    # Create logs directory if it doesn't exist
+    # Create a file handler that logs messages to a file named with the current date.
+    # Neither the logs directory nor the file exist until the first record is written
     log_dir = 'logs'
-    os.makedirs(log_dir, exist_ok=True)
-
-    # Create a file handler that logs messages to a file named with the current date
     log_file_name = f"{datetime.now().strftime('%Y%m%d')}_trading-bot.log"
-    file_handler = logging.FileHandler(os.path.join(log_dir, log_file_name))
+    file_handler = _DeferredFileHandler(os.path.join(log_dir, log_file_name))
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
         
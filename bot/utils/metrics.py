@@ -0,0 +1,291 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.logger import log
+from utils.histogram import Histogram
+from utils import profiling
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9108
+
+# Histogram buckets in seconds, from a cached terminal read to a slow order
+LATENCY_BOUNDS_SECONDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                          0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _Gauge:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Reads the value from function() at every scrape instead."""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class _Histogram(Histogram):
+    @contextmanager
+    def time(self):
+        """Observes the seconds spent inside the with block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class MetricFamily:
+    """
+    One named metric and its children, one per combination of label values.
+    Resolve a child once with labels() and keep it: recording is then a plain
+    attribute update with no lookup and no lock (the GIL is enough for the
+    single increments the bot does).
+    """
+    def __init__(self, name, help_text, kind, labelnames=(), bounds=LATENCY_BOUNDS_SECONDS):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.bounds = bounds
+        self.children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return _Counter()
+        if self.kind == "gauge":
+            return _Gauge()
+        return _Histogram(self.bounds)
+
+    def labels(self, **values):
+        key = tuple(str(values[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    # Shortcuts for metrics without labels
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self.children.items()):
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.labelnames, key))
+            if self.kind == "counter":
+                lines.append(f"{self.name}{_braces(labels)} {child.value}")
+            elif self.kind == "gauge":
+                try:
+                    value = child.get()
+                except Exception as e:
+                    log.debug(f"Metric {self.name}: gauge function failed: {e}")
+                    continue
+                lines.append(f"{self.name}{_braces(labels)} {value}")
+            else:
+                for bound, count in child.buckets():
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    bucket_labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+                    lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+                lines.append(f"{self.name}_sum{_braces(labels)} {child.total}")
+                lines.append(f"{self.name}_count{_braces(labels)} {child.count}")
+        return "\n".join(lines)
+
+
+def _braces(labels):
+    return f"{{{labels}}}" if labels else ""
+
+
+class MetricsRegistry:
+    """All metrics of the process, rendered together in the Prometheus text format."""
+    def __init__(self, prefix="tradebot_"):
+        self.prefix = prefix
+        self.families = {}
+
+    def _family(self, name, help_text, kind, labelnames, **kwargs):
+        name = self.prefix + name
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = MetricFamily(name, help_text, kind, labelnames, **kwargs)
+        return family
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._family(name, help_text, "counter", labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._family(name, help_text, "gauge", labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), bounds=LATENCY_BOUNDS_SECONDS):
+        return self._family(name, help_text, "histogram", labelnames, bounds=bounds)
+
+    def render(self):
+        return "\n".join(family.render() for family in list(self.families.values())) + "\n"
+
+
+# --- The bot's metrics ---
+registry = MetricsRegistry()
+
+terminal_call_seconds = registry.histogram(
+    "terminal_call_seconds", "Latency of MT5Connector methods.", ("method",))
+terminal_call_errors = registry.counter(
+    "terminal_call_errors_total", "MT5Connector calls that failed or returned nothing.", ("method",))
+terminal_cache_hit_ratio = registry.gauge(
+    "terminal_cache_hit_ratio", "Share of tick/account/position reads served by the per-tick snapshot.")
+cycle_seconds = registry.histogram(
+    "cycle_seconds", "Duration of one bot cycle.", ("cycle",))
+indicator_update_seconds = registry.histogram(
+    "indicator_update_seconds", "Time spent bringing the indicator state up to date.", ("mode",))
+signals_evaluated = registry.counter(
+    "signals_evaluated_total", "Signal candles evaluated by the strategy.", ("symbol",))
+signals_fired = registry.counter(
+    "signals_fired_total", "Entry signals produced by the strategy.", ("symbol", "direction"))
+market_data_bars = registry.counter(
+    "market_data_bars_total", "Bars transferred from the terminal by get_market_data, by fetch (delta, full).", ("fetch",))
+orders_sent = registry.counter(
+    "orders_sent_total", "Trade requests sent to the terminal.", ("action",))
+orders_failed = registry.counter(
+    "orders_failed_total", "Market orders that ended without a fill.")
+positions_modified = registry.counter(
+    "positions_modified_total", "Successful stop loss / take profit modifications.")
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds", "How late the asyncio event loop wakes up a sleeping task.")
+account_fill_seconds = registry.histogram(
+    "account_fill_seconds", "From signal dispatch to the fill, per account of the account pool.", ("account",))
+fill_spread_seconds = registry.histogram(
+    "fill_spread_seconds", "Time between the first and the last account fill of one signal.")
+config_reloads = registry.counter(
+    "config_reloads_total", "Changes of the config file, by outcome (applied, rejected, unchanged).", ("outcome",))
+# Closed-trade performance, per strategy and symbol ("all" for the totals); read from
+# the running aggregates of utils.trade_analytics at every scrape
+performance_trades = registry.gauge(
+    "performance_trades", "Closed trades.", ("strategy", "symbol"))
+performance_net_profit = registry.gauge(
+    "performance_net_profit", "Net profit of the closed trades, commission and swap included.", ("strategy", "symbol"))
+performance_drawdown = registry.gauge(
+    "performance_drawdown", "Current drawdown of the closed-trade equity from its peak.", ("strategy", "symbol"))
+performance_max_drawdown = registry.gauge(
+    "performance_max_drawdown", "Largest drawdown of the closed-trade equity.", ("strategy", "symbol"))
+performance_win_rate = registry.gauge(
+    "performance_win_rate", "Share of closed trades with a positive net profit.", ("strategy", "symbol"))
+performance_expectancy = registry.gauge(
+    "performance_expectancy", "Average net profit per closed trade.", ("strategy", "symbol"))
+performance_r_multiple = registry.gauge(
+    "performance_r_multiple", "Average R-multiple of the closed trades with an initial stop loss.", ("strategy", "symbol"))
+
+
+def instrument(method):
+    """
+    Decorator for MT5Connector methods: records their latency, and counts an
+    error whenever one raises or returns None (or False). While the profiler
+    is on, the call is timed there too.
+    """
+    latency = terminal_call_seconds.labels(method=method.__name__)
+    errors = terminal_call_errors.labels(method=method.__name__)
+    name = method.__qualname__
+    profiler = profiling.profiler
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            latency.observe(elapsed)
+            if profiler.enabled:
+                profiler.record(name, elapsed)
+        if result is None or result is False:
+            errors.inc()
+        return result
+    return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
+
+    def _respond(self, method):
+        path = self.path.split("?")[0]
+        if path.startswith("/profile"):
+            status, text = profiling.handle_request(path[len("/profile"):].strip("/"), method)
+        elif path in ("/metrics", "/") and method == "GET":
+            status, text = 200, registry.render()
+        else:
+            self.send_error(404 if method == "GET" else 405)
+            return
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the bot log
+        pass
+
+
+def start_metrics_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Serves the registry on http://host:port/metrics from a daemon thread,
+    and the profiler controls on /profile/{start,stop,dump} (POST) and
+    /profile/{report,collapsed} (GET).
+
+    :return: The server (call shutdown() to stop it), or None if the port is taken.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        log.error(f"Could not start the metrics endpoint on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    log.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
+
+
+def start_from_config(config):
+    """
+    Starts the endpoint described by the optional Metrics config section
+    (Enabled, Host, Port). On by default, bound to localhost.
+    """
+    section = getattr(config, "Metrics", None)
+    if not getattr(section, "Enabled", True):
+        return None
+    return start_metrics_server(getattr(section, "Host", DEFAULT_HOST), getattr(section, "Port", DEFAULT_PORT))
@@ -0,0 +1,307 @@
+import functools
+import heapq
+import itertools
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from utils.logger import log
+
+# Defaults for the optional Profiling config section
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+DEFAULT_TOP_TICKS = 10
+DEFAULT_OUTPUT_DIR = os.path.join("logs", "profiles")
+
+# Deeper stacks are cut at the root end; flamegraphs stay readable
+MAX_STACK_DEPTH = 64
+# Sampled leaf frames listed for each slow tick
+TICK_TOP_FRAMES = 5
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profiler:
+    """
+    Profiling that can be switched on and off while the bot runs. Two views:
+
+    - Sampling: a daemon thread snapshots the bot thread's stack every few
+      milliseconds and counts the collapsed stacks ("a;b;c count"), the input
+      format of flamegraph.pl and speedscope. It costs the bot thread nothing
+      but the GIL hand-overs.
+    - Deterministic timing: functions wrapped with section() (and the
+      connector calls, through metrics.instrument) are timed on every call,
+      overall and per tick, so the slowest ticks can be reported with the
+      calls that made them slow.
+
+    While disabled a wrapped call costs one attribute check.
+    """
+    def __init__(self, sample_interval=DEFAULT_SAMPLE_INTERVAL_MS / 1000.0, top_ticks=DEFAULT_TOP_TICKS,
+                 output_dir=DEFAULT_OUTPUT_DIR):
+        """
+        :param sample_interval: Seconds between two stack samples.
+        :param top_ticks: How many of the slowest ticks the report keeps.
+        """
+        self.sample_interval = sample_interval
+        self.top_ticks = top_ticks
+        self.output_dir = output_dir
+        self.enabled = False
+        self.thread_id = threading.main_thread().ident
+        self._lock = threading.RLock()   # Signal handlers may re-enter on the bot thread
+        self._sampler = None
+        self._stop = threading.Event()
+        self._sequence = itertools.count()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.calls = {}             # name -> [calls, total seconds, max seconds]
+            self.stacks = Counter()     # collapsed stack -> samples
+            self.samples = 0
+            self.ticks = 0
+            self.slow_ticks = []        # min-heap of (seconds, seq, report dict)
+            self._tick = None           # breakdown of the tick in progress
+
+    # --- Switching ---
+    def start(self, thread_id=None):
+        """Starts profiling the given thread (the main thread, where the bot loop runs, by default)."""
+        if self.enabled:
+            return
+        self.reset()
+        self.thread_id = thread_id or self.thread_id
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="ProfilerSampler", daemon=True)
+        self._sampler.start()
+        self.enabled = True
+        log.info(f"Profiler started (sampling every {self.sample_interval * 1000:.0f} ms).")
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        if self._sampler is not None and self._sampler is not threading.current_thread():
+            self._sampler.join(timeout=1.0)
+        self._sampler = None
+        log.info(f"Profiler stopped after {time.time() - self.started_at:.1f}s, "
+                 f"{self.samples} samples, {self.ticks} ticks.")
+
+    def toggle(self):
+        """Starts profiling, or stops it and dumps the results; returns the dumped paths."""
+        if not self.enabled:
+            self.start()
+            return None
+        self.stop()
+        return self.dump()
+
+    # --- Recording ---
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            del frame
+            stack = ";".join(reversed(labels))
+            with self._lock:
+                self.stacks[stack] += 1
+                self.samples += 1
+                if self._tick is not None:
+                    self._tick['frames'][labels[0]] += 1
+
+    def record(self, name, seconds):
+        """Adds one timed call of name, to the totals and to the tick in progress."""
+        with self._lock:
+            stats = self.calls.get(name)
+            if stats is None:
+                stats = self.calls[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+            tick = self._tick
+            if tick is not None:
+                breakdown = tick['calls'].setdefault(name, [0, 0.0])
+                breakdown[0] += 1
+                breakdown[1] += seconds
+
+    @contextmanager
+    def tick(self, name):
+        """
+        Times one bot cycle. The slowest ones are kept with the calls and the
+        sampled frames that happened inside them. A tick opened inside another
+        one is timed as a plain section of it.
+        """
+        if not self.enabled:
+            yield
+            return
+        if self._tick is not None:
+            with self.timed(name):
+                yield
+            return
+        tick = {'name': name, 'at': datetime.now(), 'calls': {}, 'frames': Counter()}
+        with self._lock:
+            self._tick = tick
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self._tick = None
+            self.record(name, seconds)
+            with self._lock:
+                self.ticks += 1
+                entry = (seconds, next(self._sequence), tick)
+                if len(self.slow_ticks) < self.top_ticks:
+                    heapq.heappush(self.slow_ticks, entry)
+                elif seconds > self.slow_ticks[0][0]:
+                    heapq.heapreplace(self.slow_ticks, entry)
+
+    @contextmanager
+    def timed(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    # --- Output ---
+    def collapsed(self):
+        """The sampled stacks in collapsed-stack format, one 'frame;frame;frame count' per line."""
+        with self._lock:
+            stacks = list(self.stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks))
+
+    def report(self, top_calls=20):
+        """Plain-text report: per-call timing, then the slowest ticks with their breakdown."""
+        # Copied under the lock: the report is served from the metrics thread while the bot records
+        with self._lock:
+            started_at, samples, ticks = self.started_at, self.samples, self.ticks
+            calls = [(name, tuple(stats)) for name, stats in self.calls.items()]
+            slow_ticks = [(seconds, {'at': tick['at'], 'name': tick['name'], 'calls': dict(tick['calls']),
+                                     'frames': tick['frames'].copy()})
+                          for seconds, _, tick in self.slow_ticks]
+        elapsed = time.time() - started_at
+        lines = [f"Profile started {datetime.fromtimestamp(started_at):%Y-%m-%d %H:%M:%S}, "
+                 f"{elapsed:.1f}s, {samples} samples, {ticks} ticks",
+                 "",
+                 f"{'Call':<50} {'calls':>7} {'total ms':>11} {'mean ms':>9} {'max ms':>9}"]
+        calls.sort(key=lambda item: item[1][1], reverse=True)
+        for name, (count, total, longest) in calls[:top_calls]:
+            lines.append(f"{name:<50} {count:>7} {total * 1000:>11.1f} "
+                         f"{total / count * 1000:>9.2f} {longest * 1000:>9.1f}")
+
+        lines += ["", f"Slowest {len(slow_ticks)} tick(s):"]
+        for rank, (seconds, tick) in enumerate(sorted(slow_ticks, key=lambda e: -e[0]), start=1):
+            lines.append(f"#{rank} {tick['at']:%Y-%m-%d %H:%M:%S} {tick['name']}: {seconds * 1000:.1f} ms")
+            for name, (count, total) in sorted(tick['calls'].items(), key=lambda item: -item[1][1]):
+                lines.append(f"    {name:<46} {count:>5}x {total * 1000:>9.1f} ms")
+            frames = tick['frames'].most_common(TICK_TOP_FRAMES)
+            if frames:
+                lines.append("    sampled: " + ", ".join(f"{label} ({n})" for label, n in frames))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, output_dir=None):
+        """
+        Writes the collapsed stacks and the report next to each other.
+
+        :return: (collapsed path, report path)
+        """
+        output_dir = output_dir or self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        stem = os.path.join(output_dir, f"profile_{datetime.now():%Y%m%d_%H%M%S}")
+        with open(f"{stem}.collapsed", "w") as f:
+            f.write(self.collapsed())
+        with open(f"{stem}.txt", "w") as f:
+            f.write(self.report())
+        log.info(f"Profile written to {stem}.collapsed and {stem}.txt")
+        return f"{stem}.collapsed", f"{stem}.txt"
+
+
+profiler = Profiler()
+
+
+def section(function):
+    """Decorator: times every call of function while the profiler is on."""
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return function(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.record(name, time.perf_counter() - started)
+    return wrapper
+
+
+def tick(function):
+    """Decorator: profiles every call of function as one tick."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return function(*args, **kwargs)
+        with profiler.tick(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+# Actions that change the profiler; a GET (a crawler, a browser prefetch) must not trigger them
+POST_ACTIONS = ("start", "stop", "dump")
+GET_ACTIONS = ("", "report", "collapsed")
+
+
+def handle_request(action, method="GET"):
+    """
+    Serves the metrics endpoint's /profile/<action> paths. start, stop and
+    dump require POST; report and collapsed are read with GET.
+
+    :return: (HTTP status, text body)
+    """
+    if action in POST_ACTIONS + GET_ACTIONS and (action in POST_ACTIONS) != (method == "POST"):
+        allowed = "POST" if action in POST_ACTIONS else "GET"
+        return 405, f"Use {allowed} for /profile/{action}.\n"
+    if action == "start":
+        profiler.start()
+        return 200, "Profiler started.\n"
+    if action == "stop":
+        profiler.stop()
+        return 200, "Profiler stopped.\n"
+    if action == "dump":
+        return 200, "Written: " + ", ".join(profiler.dump()) + "\n"
+    if action in ("", "report"):
+        return 200, profiler.report()
+    if action == "collapsed":
+        return 200, profiler.collapsed()
+    return 404, f"Unknown profile action '{action}'. Use start, stop, dump, report or collapsed.\n"
+
+
+def install_from_config(config):
+    """
+    Applies the optional Profiling config section (Enabled, SampleIntervalMs,
+    TopTicks, OutputDir) and, where the platform has them, binds SIGUSR1 to
+    start / stop-and-dump and SIGUSR2 to dump without stopping.
+    """
+    section_config = getattr(config, "Profiling", None)
+    profiler.sample_interval = getattr(section_config, "SampleIntervalMs", DEFAULT_SAMPLE_INTERVAL_MS) / 1000.0
+    profiler.top_ticks = getattr(section_config, "TopTicks", DEFAULT_TOP_TICKS)
+    profiler.output_dir = getattr(section_config, "OutputDir", DEFAULT_OUTPUT_DIR)
+
+    # Windows has neither signal; the metrics endpoint covers it there
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.toggle())
+        signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.dump())
+    if getattr(section_config, "Enabled", False):
+        profiler.start()
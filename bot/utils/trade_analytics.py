@@ -0,0 +1,450 @@
+import argparse
+import math
+import time
+from collections import namedtuple
+from utils.logger import log
+from utils import trade_logger
+from utils.metrics import (performance_trades, performance_net_profit, performance_drawdown,
+                           performance_max_drawdown, performance_win_rate, performance_expectancy,
+                           performance_r_multiple)
+import MetaTrader5 as mt5
+
+# Defaults for the optional Analytics config section
+DEFAULT_SYNC_INTERVAL_SECONDS = 30.0   # Between two reads of the broker's deal history
+DEFAULT_HISTORY_DAYS = 7               # Deal history read at startup, beyond the open trades of the journal
+# Deal times are broker server time, hours off UTC: history reads are widened by this much
+SERVER_TIME_SLACK_SECONDS = 86400
+# Below this, a trade's remaining volume counts as closed
+VOLUME_EPSILON = 1e-9
+# Label of the aggregates over every strategy or every symbol
+ALL = "all"
+
+# One trade once fully closed. pnl is net of commission, swap and fees; r_multiple
+# is the price move in units of the initial stop distance (None without an initial
+# stop); closed_at is the time of the closing deal (epoch seconds, UTC).
+ClosedTrade = namedtuple('ClosedTrade', [
+    'trade_id', 'magic', 'strategy', 'symbol', 'direction', 'volume', 'entry_price',
+    'initial_sl', 'close_price', 'pnl', 'r_multiple', 'closed_at'
+])
+
+
+class PerformanceAggregate:
+    """
+    Running statistics of a series of closed trades. add() updates every
+    figure from the one new trade, so reading them costs the same whether
+    ten trades were added or a million.
+    """
+    __slots__ = ('trades', 'wins', 'gross_profit', 'gross_loss', 'net_profit', 'peak',
+                 'max_drawdown', 'r_total', 'r_trades')
+
+    def __init__(self):
+        self.trades = 0
+        self.wins = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.net_profit = 0.0     # The equity curve, relative to its start
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.r_total = 0.0
+        self.r_trades = 0
+
+    def add(self, trade):
+        self.trades += 1
+        if trade.pnl > 0:
+            self.wins += 1
+            self.gross_profit += trade.pnl
+        else:
+            self.gross_loss -= trade.pnl
+        self.net_profit += trade.pnl
+        self.peak = max(self.peak, self.net_profit)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.net_profit)
+        if trade.r_multiple is not None:
+            self.r_total += trade.r_multiple
+            self.r_trades += 1
+
+    @property
+    def drawdown(self):
+        return self.peak - self.net_profit
+
+    @property
+    def win_rate(self):
+        return self.wins / self.trades if self.trades else 0.0
+
+    @property
+    def expectancy(self):
+        return self.net_profit / self.trades if self.trades else 0.0
+
+    @property
+    def average_r(self):
+        return self.r_total / self.r_trades if self.r_trades else 0.0
+
+    @property
+    def profit_factor(self):
+        if self.gross_loss > 0:
+            return self.gross_profit / self.gross_loss
+        return math.inf if self.gross_profit > 0 else 0.0
+
+    def summary(self):
+        return {
+            'trades': self.trades,
+            'wins': self.wins,
+            'losses': self.trades - self.wins,
+            'win_rate': self.win_rate,
+            'net_profit': self.net_profit,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            'profit_factor': self.profit_factor,
+            'expectancy': self.expectancy,
+            'average_r': self.average_r,
+            'r_trades': self.r_trades,
+            'drawdown': self.drawdown,
+            'max_drawdown': self.max_drawdown,
+        }
+
+
+class PerformanceTracker:
+    """
+    Closed-trade analytics kept up to date as trades happen, instead of
+    recomputed from the whole journal.
+
+    Entries come from the journal (ORDER_PLACED events, for the strategy and
+    the initial stop loss); closes come from the broker's deal history, read
+    incrementally by sync(). Every fully closed trade lands in the `trades`
+    index by trade id (the position ticket) and is added once to the running
+    aggregates of its strategy and symbol, of each alone, and of the whole
+    account. A query is then a dict lookup, whatever the size of the journal.
+
+    Closed trades are journaled as TRADE_CLOSED events, with their close price
+    and net P&L, and restore() rebuilds the tracker from them at startup.
+    """
+    def __init__(self, strategies=None, initial_balance=0.0, journal=None, history_days=DEFAULT_HISTORY_DAYS,
+                 sync_interval=DEFAULT_SYNC_INTERVAL_SECONDS):
+        """
+        :param strategies: {magic number: strategy name} of the trades to track;
+                           deals of other magic numbers are ignored. None tracks
+                           every deal, named after its magic number.
+        :param initial_balance: Start of the equity curve.
+        :param journal: TradeJournal the closed trades are written to, and that
+                        restore() reads; None for neither.
+        :param history_days: Days of deal history the first sync() reads.
+        :param sync_interval: Least seconds between two reads in maybe_sync().
+        """
+        self.strategies = dict(strategies) if strategies is not None else None
+        self.initial_balance = initial_balance
+        self.journal = journal
+        self.history_days = history_days
+        self.sync_interval = sync_interval
+        self.trades = {}        # trade_id -> ClosedTrade
+        self.entries = {}       # trade_id -> ORDER_PLACED event of a trade not closed yet
+        self.open = {}          # trade_id -> deals seen so far of a trade not fully closed
+        self.aggregates = {}    # (strategy, symbol) -> PerformanceAggregate, ALL for either
+        self.equity_curve = []  # (closed_at, equity) after every close
+        self.seen_deals = {}    # deal ticket -> deal time, for the deals of the current history window
+        self.synced_to = None   # Newest deal time read, broker time
+        self.last_sync = None
+        self.clock_offset = 0   # Broker time minus UTC, in seconds (see BarCloseScheduler.clock_offset)
+
+    # --- Events ---
+    def on_event(self, event):
+        """Journal listener: remembers each new order's strategy and initial stop."""
+        if event.get('event_type') != "ORDER_PLACED" or event.get('trade_id') is None:
+            return
+        trade_id = int(event['trade_id'])
+        if trade_id not in self.trades:
+            self.entries[trade_id] = event
+
+    def on_deal(self, deal):
+        """
+        Applies one deal of the broker's history; deals already seen are ignored.
+
+        :return: The ClosedTrade if the deal fully closed a trade, else None.
+        """
+        if deal.ticket in self.seen_deals:
+            return None
+        self.seen_deals[deal.ticket] = deal.time
+        # Balance, credit and commission operations are deals too
+        if deal.type not in (mt5.DEAL_TYPE_BUY, mt5.DEAL_TYPE_SELL):
+            return None
+        trade_id = deal.position_id
+        if trade_id in self.trades:
+            return None
+        trade = self.open.get(trade_id)
+        if trade is None:
+            if self.strategies is not None and deal.magic not in self.strategies and trade_id not in self.entries:
+                return None
+            trade = self.open[trade_id] = self._open_trade(trade_id, deal)
+
+        trade['pnl'] += deal.profit + deal.commission + deal.swap + getattr(deal, 'fee', 0.0)
+        trade['deals'] += 1
+        if deal.entry == mt5.DEAL_ENTRY_IN:
+            if trade['from_journal']:
+                # The fill itself replaces the journal's copy of it
+                trade['from_journal'] = False
+                trade['volume_in'] = trade['entry_value'] = 0.0
+            trade['direction'] = "BUY" if deal.type == mt5.DEAL_TYPE_BUY else "SELL"
+            trade['volume_in'] += deal.volume
+            trade['entry_value'] += deal.volume * deal.price
+            return None
+
+        trade['volume_out'] += deal.volume
+        trade['exit_value'] += deal.volume * deal.price
+        if trade['direction'] is None:
+            # Opened before the history window: the closing deal is the opposite side
+            trade['direction'] = "SELL" if deal.type == mt5.DEAL_TYPE_BUY else "BUY"
+        if trade['volume_in'] - trade['volume_out'] > VOLUME_EPSILON:
+            return None     # Partial close
+        return self._close(trade_id, self.open.pop(trade_id), deal)
+
+    def _open_trade(self, trade_id, deal):
+        entry = self.entries.get(trade_id, {})
+        volume = entry.get('lot_size') or 0.0
+        price = entry.get('entry_price') or 0.0
+        return {
+            'magic': entry.get('magic_number') or deal.magic,
+            'strategy': entry.get('strategy_name') or self._strategy_name(deal.magic),
+            'symbol': deal.symbol,
+            'direction': entry.get('direction'),
+            'initial_sl': float(entry['initial_sl']) if entry.get('initial_sl') else None,
+            'from_journal': bool(entry),
+            'volume_in': volume,
+            'entry_value': volume * price,
+            'volume_out': 0.0,
+            'exit_value': 0.0,
+            'pnl': 0.0,
+            'deals': 0,
+        }
+
+    def _strategy_name(self, magic):
+        if self.strategies is not None and magic in self.strategies:
+            return self.strategies[magic]
+        return f"magic_{magic}"
+
+    def _close(self, trade_id, trade, deal):
+        self.entries.pop(trade_id, None)
+        entry_price = trade['entry_value'] / trade['volume_in'] if trade['volume_in'] else None
+        close_price = trade['exit_value'] / trade['volume_out']
+        closed = ClosedTrade(
+            trade_id=trade_id,
+            magic=trade['magic'],
+            strategy=trade['strategy'],
+            symbol=trade['symbol'],
+            direction=trade['direction'],
+            volume=trade['volume_out'],
+            entry_price=entry_price,
+            initial_sl=trade['initial_sl'],
+            close_price=close_price,
+            pnl=trade['pnl'],
+            r_multiple=r_multiple(trade['direction'], entry_price, trade['initial_sl'], close_price),
+            closed_at=getattr(deal, 'time_msc', deal.time * 1000) / 1000.0 - self.clock_offset
+        )
+        self._add(closed)
+        if self.journal is not None:
+            self.journal.log({
+                "timestamp": closed.closed_at,
+                "trade_id": trade_id,
+                "magic_number": closed.magic,
+                "symbol": closed.symbol,
+                "strategy_name": closed.strategy,
+                "event_type": "TRADE_CLOSED",
+                "direction": closed.direction,
+                "lot_size": closed.volume,
+                "entry_price": closed.entry_price,
+                "initial_sl": closed.initial_sl,
+                "close_price": closed.close_price,
+                "pnl": closed.pnl,
+                "reason_message": f"Closed over {trade['deals']} deal(s)."
+            })
+        r_text = f"{closed.r_multiple:.2f}R" if closed.r_multiple is not None else "no initial SL"
+        log.info(f"Trade {trade_id} closed: {closed.direction} {closed.volume} {closed.symbol} "
+                 f"{_price(closed.entry_price)} -> {_price(closed.close_price)} | P&L {closed.pnl:.2f} ({r_text})")
+        return closed
+
+    def _add(self, closed):
+        self.trades[closed.trade_id] = closed
+        for key in ((closed.strategy, closed.symbol), (closed.strategy, ALL), (ALL, closed.symbol), (ALL, ALL)):
+            aggregate = self.aggregates.get(key)
+            if aggregate is None:
+                aggregate = self.aggregates[key] = PerformanceAggregate()
+                _export(aggregate, *key)
+            aggregate.add(closed)
+        self.equity_curve.append((closed.closed_at, self.initial_balance + self.aggregates[(ALL, ALL)].net_profit))
+
+    # --- Deal history ---
+    def sync(self, connector, now=None, clock_offset=None):
+        """
+        Reads the deals since the last sync and applies the new ones.
+
+        :param clock_offset: Broker time minus UTC, in seconds, to turn deal
+                             times into close times; the last one given by default.
+        :return: The trades closed by them.
+        """
+        now = time.time() if now is None else now
+        if clock_offset is not None:
+            self.clock_offset = clock_offset
+        self.last_sync = time.monotonic()
+        if self.synced_to is not None:
+            since = self.synced_to
+        else:
+            since = now - self.history_days * 86400
+            # Far enough back for the fills of every trade the journal still has open
+            opened = [entry['timestamp'] for entry in self.entries.values() if entry.get('timestamp')]
+            if opened:
+                since = min(since, min(opened))
+        window_start = since - SERVER_TIME_SLACK_SECONDS
+        deals = connector.get_deals(window_start, now + SERVER_TIME_SLACK_SECONDS)
+        if deals is None:
+            return []
+        closed = []
+        for deal in sorted(deals, key=lambda d: (d.time_msc, d.ticket)):
+            trade = self.on_deal(deal)
+            if trade is not None:
+                closed.append(trade)
+            if self.synced_to is None or deal.time > self.synced_to:
+                self.synced_to = deal.time
+        if self.synced_to is None:
+            self.synced_to = since
+        # Deals that fall out of the next window can never be read again
+        next_start = self.synced_to - SERVER_TIME_SLACK_SECONDS
+        self.seen_deals = {ticket: at for ticket, at in self.seen_deals.items() if at >= next_start}
+        return closed
+
+    def maybe_sync(self, connector, clock_offset=None):
+        """sync() if sync_interval has passed since the last one."""
+        if self.last_sync is not None and time.monotonic() - self.last_sync < self.sync_interval:
+            return []
+        return self.sync(connector, clock_offset=clock_offset)
+
+    def restore(self):
+        """
+        Rebuilds the index and the aggregates from the journal's TRADE_CLOSED
+        events, and picks up the ORDER_PLACED events of the trades still open.
+
+        :return: The number of closed trades restored.
+        """
+        if self.journal is None:
+            return 0
+        events = self.journal.query(event_type=["ORDER_PLACED", "TRADE_CLOSED"])
+        restored = 0
+        for event in events.to_dict('records'):
+            event = {key: _value(value) for key, value in event.items()}
+            if event['trade_id'] is None:
+                continue
+            trade_id = int(event['trade_id'])
+            event['timestamp'] = event['timestamp'].timestamp()
+            if event['event_type'] == "ORDER_PLACED":
+                self.on_event(event)
+            elif trade_id not in self.trades:
+                self.entries.pop(trade_id, None)
+                self._add(ClosedTrade(
+                    trade_id=trade_id,
+                    magic=event['magic_number'],
+                    strategy=event['strategy_name'],
+                    symbol=event['symbol'],
+                    direction=event['direction'],
+                    volume=event['lot_size'],
+                    entry_price=event['entry_price'],
+                    initial_sl=event['initial_sl'],
+                    close_price=event['close_price'],
+                    pnl=event['pnl'] or 0.0,
+                    r_multiple=r_multiple(event['direction'], event['entry_price'], event['initial_sl'],
+                                          event['close_price']),
+                    closed_at=event['timestamp']
+                ))
+                restored += 1
+        log.info(f"Performance: {restored} closed trade(s) restored from the journal, "
+                 f"{len(self.entries)} open.")
+        return restored
+
+    # --- Queries ---
+    def summary(self, strategy=ALL, symbol=ALL):
+        """
+        Statistics of the closed trades of one strategy and/or symbol (ALL for
+        any), read from the running aggregates.
+        """
+        aggregate = self.aggregates.get((strategy, symbol)) or PerformanceAggregate()
+        summary = aggregate.summary()
+        if strategy == ALL and symbol == ALL:
+            summary['equity'] = self.initial_balance + aggregate.net_profit
+            summary['open_trades'] = len(self.open.keys() | self.entries.keys())
+        return summary
+
+    def keys(self):
+        """The (strategy, symbol) pairs there are statistics for."""
+        return list(self.aggregates)
+
+
+def r_multiple(direction, entry_price, initial_sl, close_price):
+    """The price move of a trade in units of its initial stop distance, or None without one."""
+    if entry_price is None or close_price is None or not initial_sl:
+        return None
+    risk = entry_price - initial_sl if direction == "BUY" else initial_sl - entry_price
+    if risk <= 0:
+        return None
+    move = close_price - entry_price if direction == "BUY" else entry_price - close_price
+    return float(move / risk)
+
+
+def _price(value):
+    return f"{value:.5f}" if value is not None else "n/a"
+
+
+def _value(value):
+    # Journal rows come back with NaN / <NA> for the empty columns
+    try:
+        if value is None or value != value:
+            return None
+    except TypeError:   # pd.NA
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _export(aggregate, strategy, symbol):
+    labels = {'strategy': strategy, 'symbol': symbol}
+    performance_trades.labels(**labels).set_function(lambda: aggregate.trades)
+    performance_net_profit.labels(**labels).set_function(lambda: aggregate.net_profit)
+    performance_drawdown.labels(**labels).set_function(lambda: aggregate.drawdown)
+    performance_max_drawdown.labels(**labels).set_function(lambda: aggregate.max_drawdown)
+    performance_win_rate.labels(**labels).set_function(lambda: aggregate.win_rate)
+    performance_expectancy.labels(**labels).set_function(lambda: aggregate.expectancy)
+    performance_r_multiple.labels(**labels).set_function(lambda: aggregate.average_r)
+
+
+def tracker_from_config(config, strategy_name, journal=None):
+    """
+    Builds the tracker described by the optional Analytics config section
+    (Enabled, SyncIntervalSeconds, HistoryDays), on by default, subscribed to
+    the journal's events and restored from it.
+
+    :param strategy_name: Name of the trades carrying the bot's magic number.
+    :param journal: The TradeJournal; the bot's own by default.
+    :return: The PerformanceTracker, or None when disabled.
+    """
+    section = getattr(config, "Analytics", None)
+    if not getattr(section, "Enabled", True):
+        return None
+    journal = journal or trade_logger.trade_journal
+    tracker = PerformanceTracker(
+        strategies={config.Trading.MagicNumber: strategy_name},
+        journal=journal,
+        history_days=getattr(section, "HistoryDays", DEFAULT_HISTORY_DAYS),
+        sync_interval=getattr(section, "SyncIntervalSeconds", DEFAULT_SYNC_INTERVAL_SECONDS)
+    )
+    tracker.restore()
+    journal.subscribe(tracker.on_event)
+    return tracker
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Closed-trade statistics from the trade journal.")
+    parser.add_argument("--dir", default=trade_logger.DEFAULT_DIRECTORY, help="Journal directory.")
+    parser.add_argument("--balance", type=float, default=0.0, help="Start of the equity curve.")
+    args = parser.parse_args()
+
+    tracker = PerformanceTracker(initial_balance=args.balance, journal=trade_logger.TradeJournal(args.dir))
+    tracker.restore()
+    for strategy, symbol in sorted(tracker.keys()):
+        s = tracker.summary(strategy, symbol)
+        log.info(f"{strategy} / {symbol}: {s['trades']} trades | Win rate {s['win_rate'] * 100:.1f}% | "
+                 f"Net {s['net_profit']:,.2f} | Expectancy {s['expectancy']:,.2f} | "
+                 f"Avg R {s['average_r']:.2f} ({s['r_trades']} with SL) | "
+                 f"DD {s['drawdown']:,.2f} (max {s['max_drawdown']:,.2f})")
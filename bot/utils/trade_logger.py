@@ -1,70 +1,310 @@
-import logging
+import argparse
+import atexit
+import glob
+import itertools
 import os
-from datetime import datetime
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+import pandas as pd
+from utils.logger import log
 
-# --- Define CSV Columns ---
+# --- Journal columns and their storage types ---
 TRADE_LOG_COLUMNS = [
-    'timestamp', 'trade_id', 'magic_number', 'symbol', 'strategy_name', 
-    'event_type', 'direction', 'lot_size', 'entry_price', 'initial_sl', 
+    'timestamp', 'trade_id', 'magic_number', 'symbol', 'strategy_name',
+    'event_type', 'direction', 'lot_size', 'entry_price', 'initial_sl',
     'initial_tp', 'close_price', 'pnl', 'reason_message'
 ]
+COLUMN_TYPES = {
+    'timestamp': 'REAL',        # Epoch seconds (UTC)
+    'trade_id': 'INTEGER',
+    'magic_number': 'INTEGER',
+    'symbol': 'TEXT',
+    'strategy_name': 'TEXT',
+    'event_type': 'TEXT',
+    'direction': 'TEXT',
+    'lot_size': 'REAL',
+    'entry_price': 'REAL',
+    'initial_sl': 'REAL',
+    'initial_tp': 'REAL',
+    'close_price': 'REAL',
+    'pnl': 'REAL',
+    'reason_message': 'TEXT',
+}
+_CASTS = {'REAL': float, 'INTEGER': int, 'TEXT': str}
 
-class CsvFormatter(logging.Formatter):
-    """Custom formatter to output log records into a CSV format."""
-    def __init__(self):
-        super().__init__()
-        self.output_delimiter = ','
-
-    def format(self, record):
-        # Create a dictionary from the log record's extra data
-        log_data = record.__dict__.get('log_data', {})
-        
-        # Ensure all columns are present, fill with empty string if not
-        csv_row = [str(log_data.get(col, '')) for col in TRADE_LOG_COLUMNS]
-        
-        return self.output_delimiter.join(csv_row)
-
-def setup_trade_logger():
+DEFAULT_DIRECTORY = 'logs'
+FILE_PREFIX = 'trade_journal_'
+
+
+class TradeJournal:
     """
-    Sets up a logger to record trade events into a CSV file.
+    Trade event journal stored as SQLite files with typed columns.
+
+    log() only stamps the event and puts it on a queue; a background thread
+    writes the queued events in batches, one transaction per batch. A new file
+    is started every UTC day and whenever the current one reaches max_bytes.
     """
-    logger = logging.getLogger("TradeJournal")
-    logger.setLevel(logging.INFO)
-
-    # --- Avoid adding handlers multiple times ---
-    if logger.handlers:
-        return logger
-        
-    log_dir = 'logs'
-    os.makedirs(log_dir, exist_ok=True)
-    
-    # --- File Handler for CSV ---
-    log_file_path = os.path.join(log_dir, "trade_journal.csv")
-    
-    # Check if file exists to write header
-    write_header = not os.path.exists(log_file_path)
-
-    file_handler = logging.FileHandler(log_file_path, mode='a')
-    file_handler.setFormatter(CsvFormatter())
-    logger.addHandler(file_handler)
-
-    # Write header if the file is new
-    if write_header:
-        file_handler.stream.write(','.join(TRADE_LOG_COLUMNS) + '\n')
-        file_handler.stream.flush()
-
-    return logger
-
-# Initialize and export the trade logger
-trade_log = setup_trade_logger()
+    def __init__(self, directory=DEFAULT_DIRECTORY, batch_size=256, flush_interval=1.0,
+                 fsync=True, max_bytes=64 * 1024 * 1024):
+        """
+        :param directory: Where the journal files are kept.
+        :param batch_size: Most events written per transaction.
+        :param flush_interval: Seconds a queued event may wait before being written.
+        :param fsync: Whether every batch is fsynced to disk before the next one.
+                      Off trades durability on power loss for less I/O.
+        :param max_bytes: Size at which the current file is rotated.
+        """
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.events = queue.SimpleQueue()
+        self.listeners = []
+        self.written = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self._path = None
+        self._day = None
+
+    # --- Trading thread side ---
+    def log(self, event_data):
+        """
+        Queues one event (a dict keyed by TRADE_LOG_COLUMNS) for writing.
+        The timestamp is set here, so it is the time of the event, not of the
+        write, unless the event brings its own (e.g. a close read from the
+        broker's deal history).
+        """
+        if event_data.get('timestamp') is None:
+            event_data['timestamp'] = time.time()
+        if self._thread is None:
+            self._start()
+        self.events.put(event_data)
+        for listener in self.listeners:
+            try:
+                listener(event_data)
+            except Exception as e:
+                log.error(f"Trade journal: listener {listener} failed on a {event_data.get('event_type')} event: {e}")
+
+    def subscribe(self, listener):
+        """
+        Calls listener(event) with every event logged from now on, on the
+        logging thread, right after it is queued. Listeners must be quick:
+        they run on the trading path.
+        """
+        self.listeners.append(listener)
+
+    def flush(self, timeout=None):
+        """Blocks until every event queued so far is written."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self.events.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Writes what is still queued and stops the writer thread."""
+        if self._thread is None:
+            return
+        self.events.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="TradeJournalWriter", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    # --- Writer thread side ---
+    def _run(self):
+        while True:
+            try:
+                item = self.events.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, markers, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.events.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    # Losing journal rows must never take the bot down
+                    log.error(f"Trade journal: failed to write {len(batch)} event(s): {e}")
+            for marker in markers:
+                marker.set()
+            if stop:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                return
+
+    def _write(self, batch):
+        # Rotation is decided per run of same-day events: query() skips files by their day
+        for day, events in itertools.groupby(batch, key=lambda event: _utc_day(event['timestamp'])):
+            rows = [tuple(_cast(event.get(col), COLUMN_TYPES[col]) for col in TRADE_LOG_COLUMNS)
+                    for event in events]
+            conn = self._connection(day)
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO events ({', '.join(TRADE_LOG_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(TRADE_LOG_COLUMNS))})", rows)
+            self.written += len(rows)
+
+    def _connection(self, day):
+        if self._conn is not None and day == self._day and os.path.getsize(self._path) < self.max_bytes:
+            return self._conn
+        if self._conn is not None:
+            self._conn.close()
+        self._day = day
+        self._path = self._next_path(day)
+        self._conn = sqlite3.connect(self._path)
+        # WAL lets query() read while the writer appends; FULL fsyncs every commit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if self.fsync else 'OFF'}")
+        _create_schema(self._conn)
+        return self._conn
+
+    def _next_path(self, day):
+        # Reuse the day's newest file while it has room, otherwise start the next part
+        parts = sorted(glob.glob(os.path.join(self.directory, f"{FILE_PREFIX}{day}_*.sqlite")),
+                       key=_part_number)
+        if parts and os.path.getsize(parts[-1]) < self.max_bytes:
+            return parts[-1]
+        number = _part_number(parts[-1]) + 1 if parts else 0
+        return os.path.join(self.directory, f"{FILE_PREFIX}{day}_{number:03d}.sqlite")
+
+    # --- Queries ---
+    def files(self):
+        """The journal files, oldest first."""
+        paths = glob.glob(os.path.join(self.directory, f"{FILE_PREFIX}*.sqlite"))
+        return sorted(paths, key=lambda p: (os.path.basename(p)[len(FILE_PREFIX):][:8], _part_number(p)))
+
+    def query(self, trade_id=None, event_type=None, start=None, end=None):
+        """
+        Journal events matching every given filter, oldest first. Events still
+        queued are written first, so a query always sees everything logged before it.
+
+        :param trade_id: Only events of this trade (order ticket).
+        :param event_type: One type (e.g. "ORDER_PLACED") or a list of types.
+        :param start: Inclusive lower time bound, anything pd.Timestamp accepts (UTC).
+        :param end: Exclusive upper time bound, same types as start.
+        :return: DataFrame with TRADE_LOG_COLUMNS; 'timestamp' as datetime (UTC).
+        """
+        self.flush()
+        where, params = [], []
+        if trade_id is not None:
+            where.append("trade_id = ?")
+            params.append(int(trade_id))
+        if event_type is not None:
+            types = [event_type] if isinstance(event_type, str) else list(event_type)
+            where.append(f"event_type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+        start_ts = pd.Timestamp(start).timestamp() if start is not None else None
+        end_ts = pd.Timestamp(end).timestamp() if end is not None else None
+        if start_ts is not None:
+            where.append("timestamp >= ?")
+            params.append(start_ts)
+        if end_ts is not None:
+            where.append("timestamp < ?")
+            params.append(end_ts)
+        sql = f"SELECT {', '.join(TRADE_LOG_COLUMNS)} FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp"
+
+        frames = []
+        for path in self.files():
+            # Files are per UTC day, so whole days outside the range are skipped unopened
+            day = os.path.basename(path)[len(FILE_PREFIX):][:8]
+            day_start = datetime.strptime(day, '%Y%m%d').replace(tzinfo=timezone.utc).timestamp()
+            if (end_ts is not None and day_start >= end_ts) or \
+                    (start_ts is not None and day_start + 86400 <= start_ts):
+                continue
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                frames.append(pd.read_sql_query(sql, conn, params=params))
+            finally:
+                conn.close()
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return pd.DataFrame(columns=TRADE_LOG_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        # SQLite gives all-NULL columns no type; restore the declared ones
+        for col, sql_type in COLUMN_TYPES.items():
+            if sql_type == 'REAL':
+                df[col] = df[col].astype('float64')
+            elif sql_type == 'INTEGER':
+                df[col] = df[col].astype('Int64')
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+        return df
+
+
+def _create_schema(conn):
+    columns = ", ".join(f"{col} {COLUMN_TYPES[col]}" for col in TRADE_LOG_COLUMNS)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS events ({columns})")
+    conn.execute("CREATE INDEX IF NOT EXISTS events_trade_id ON events (trade_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS events_event_type ON events (event_type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp)")
+    conn.commit()
+
+
+def _utc_day(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y%m%d')
+
+
+def _cast(value, sql_type):
+    if value is None or value == '':
+        return None
+    return _CASTS[sql_type](value)
+
+
+def _part_number(path):
+    return int(os.path.splitext(os.path.basename(path))[0].rsplit('_', 1)[1])
+
+
+# Initialize and export the trade journal; its writer thread starts with the first event
+trade_journal = TradeJournal()
 
 def log_trade_event(event_data):
     """
     Helper function to log a trade event.
-    The 'extra' dict is used to pass data to the CsvFormatter.
+    Only queues the event: the write happens on the journal's writer thread.
     """
-    # Add timestamp automatically
-    event_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    # We pass the data dictionary in the 'extra' parameter.
-    trade_log.info("", extra={'log_data': event_data}) 
\ No newline at end of file
+    trade_journal.log(event_data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the trade journal.")
+    parser.add_argument("--dir", default=DEFAULT_DIRECTORY, help="Journal directory.")
+    parser.add_argument("--trade-id", type=int)
+    parser.add_argument("--event-type", action="append", help="Repeat for several types.")
+    parser.add_argument("--start", help="Inclusive start time (UTC).")
+    parser.add_argument("--end", help="Exclusive end time (UTC).")
+    parser.add_argument("--csv", help="Write the matching events to this CSV file.")
+    args = parser.parse_args()
+
+    events = TradeJournal(args.dir).query(args.trade_id, args.event_type, args.start, args.end)
+    if args.csv:
+        events.to_csv(args.csv, index=False)
+        log.info(f"{len(events)} event(s) written to {args.csv}")
+    else:
+        log.info(f"{len(events)} event(s):\n{events.to_string(index=False)}")